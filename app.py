@@ -3,10 +3,11 @@ FastAPI app for Vercel deployment.
 Handles auth and read-log API only. Static files served from public/ by Vercel.
 """
 
+import asyncio
 import os
 
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 
 from auth import (
     SESSION_COOKIE,
@@ -14,8 +15,10 @@ from auth import (
     get_link_lists,
     get_link_posts,
     get_log,
+    get_log_stats,
     get_presets,
     get_user_links,
+    is_admin,
     login as auth_login,
     logout as auth_logout,
     register as auth_register,
@@ -25,10 +28,27 @@ from auth import (
     save_log,
     save_presets,
     save_user_links,
+    search,
     verify_session,
 )
+from lib import metrics, search_index, timing
+from lib.http import JSONResponse, install as install_http, read_json
+from lib.link_metadata import enrich_urls
+from lib.sync import collection_version, event_stream
 
-app = FastAPI(title="Random Technical Wiki API", version="1.0.0")
+app = FastAPI(
+    title="Random Technical Wiki API", version="1.0.0", default_response_class=JSONResponse
+)
+install_http(app)
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+def _can_profile(scope) -> bool:
+    """?profile=1 is honoured for users listed in ADMIN_USERS."""
+    return is_admin(verify_session(Request(scope).cookies.get(SESSION_COOKIE)))
+
+
+app.add_middleware(timing.ServerTimingMiddleware, can_profile=_can_profile)
 
 
 @app.get("/")
@@ -36,6 +56,14 @@ async def root():
     return RedirectResponse("/index.html")
 
 
+@app.get("/metrics")
+async def metrics_endpoint(request: Request):
+    """Prometheus metrics for this instance (bearer METRICS_TOKEN if set)."""
+    if not metrics.metrics_authorized(request.headers.get("authorization")):
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    return Response(metrics.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/api/redis-status")
 async def redis_status():
     """Debug: show which Redis env vars are available (keys only, no values)."""
@@ -57,8 +85,8 @@ async def redis_status():
 
 @app.post("/api/register")
 async def api_register(request: Request):
+    body = await read_json(request)
     try:
-        body = await request.json()
         username = (body.get("username") or "").strip()
         password = body.get("password") or ""
         err = auth_register(username, password)
@@ -73,8 +101,8 @@ async def api_register(request: Request):
 
 @app.post("/api/login")
 async def api_login(request: Request):
+    body = await read_json(request)
     try:
-        body = await request.json()
         username = (body.get("username") or "").strip()
         password = body.get("password") or ""
         session_id = auth_login(username, password)
@@ -117,8 +145,9 @@ async def api_get_read_log(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
+    version = collection_version(username, "read-log")
     log = get_log(username)
-    return JSONResponse({"log": log})
+    return JSONResponse({"log": log, "version": version})
 
 
 @app.post("/api/read-log")
@@ -127,22 +156,94 @@ async def api_save_read_log(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
-    body = await request.json()
+    body = await read_json(request)
     log = body.get("log", [])
     if not isinstance(log, list):
         return JSONResponse({"error": "Invalid log"}, status_code=400)
-    save_log(username, log)
-    return JSONResponse({"ok": True})
+    version = save_log(username, log)
+    return JSONResponse({"ok": True, "version": version})
+
+
+@app.get("/api/read-log/stats")
+async def api_read_log_stats(request: Request):
+    """
+    Reads per month and category, streaks and totals, without the log itself.
+    Months, days and streaks are counted in UTC (the read log's ISO dates),
+    not in the reader's local time zone; the response says so in "timezone".
+    """
+    session_id = request.cookies.get(SESSION_COOKIE)
+    username = verify_session(session_id)
+    if not username:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    return JSONResponse(get_log_stats(username))
+
+
+SEARCH_MAX_LIMIT = 50
+
+
+@app.get("/api/search")
+async def api_search(request: Request, q: str = "", kind: str | None = None, offset: int = 0, limit: int = 20):
+    """Ranked matches for q in the user's links, link lists and read log; kind=link|list|log to filter."""
+    session_id = request.cookies.get(SESSION_COOKIE)
+    username = verify_session(session_id)
+    if not username:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    if kind is not None and kind not in search_index.KINDS:
+        return JSONResponse(
+            {"error": f"kind must be one of {', '.join(search_index.KINDS)}"}, status_code=400
+        )
+    offset = max(0, offset)
+    limit = min(max(1, limit), SEARCH_MAX_LIMIT)
+    result = search(username, q, kind, offset, limit)
+    return JSONResponse({"query": q, "offset": offset, "limit": limit, **result})
+
+
+@app.get("/api/events")
+async def api_events(request: Request):
+    """Server-Sent Events stream of the user's collection versions (see lib/sync.py)."""
+    session_id = request.cookies.get(SESSION_COOKIE)
+    username = verify_session(session_id)
+    if not username:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    return StreamingResponse(
+        event_stream(username),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Most URLs one /api/enrich request may ask about
+ENRICH_MAX_URLS = 500
+
+
+@app.post("/api/enrich")
+async def api_enrich(request: Request):
+    """Title, description and thumbnail for each Wikipedia article URL in {"urls": [...]}."""
+    session_id = request.cookies.get(SESSION_COOKIE)
+    username = verify_session(session_id)
+    if not username:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    body = await read_json(request)
+    urls = body.get("urls", [])
+    if not isinstance(urls, list) or len(urls) > ENRICH_MAX_URLS:
+        return JSONResponse({"error": f"urls must be a list of at most {ENRICH_MAX_URLS}"}, status_code=400)
+    return JSONResponse({"meta": await asyncio.to_thread(enrich_urls, urls)})
 
 
 @app.get("/api/user-links")
-async def api_get_user_links(request: Request):
+async def api_get_user_links(request: Request, enrich: bool = False):
+    """The user's links; enrich=1 adds "meta" ({url: title, description, thumbnail})."""
     session_id = request.cookies.get(SESSION_COOKIE)
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
+    version = collection_version(username, "user-links")
     links = get_user_links(username)
-    return JSONResponse({"links": links})
+    if not enrich:
+        return JSONResponse({"links": links, "version": version})
+    urls = [link.get("url") for link in links if isinstance(link, dict)]
+    meta = await asyncio.to_thread(enrich_urls, urls)
+    return JSONResponse({"links": links, "version": version, "meta": meta})
 
 
 @app.post("/api/user-links")
@@ -151,22 +252,30 @@ async def api_save_user_links(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
-    body = await request.json()
+    body = await read_json(request)
     links = body.get("links", [])
     if not isinstance(links, list):
         return JSONResponse({"error": "Invalid links"}, status_code=400)
-    save_user_links(username, links)
-    return JSONResponse({"ok": True})
+    version = save_user_links(username, links)
+    return JSONResponse({"ok": True, "version": version})
 
 
 @app.get("/api/link-lists")
-async def api_get_link_lists(request: Request):
+async def api_get_link_lists(request: Request, enrich: bool = False):
+    """The user's link lists; enrich=1 adds "meta" for every URL in them, as for /api/user-links."""
     session_id = request.cookies.get(SESSION_COOKIE)
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
+    version = collection_version(username, "link-lists")
     link_lists = get_link_lists(username)
-    return JSONResponse({"linkLists": link_lists})
+    if not enrich:
+        return JSONResponse({"linkLists": link_lists, "version": version})
+    urls = [
+        url for item in link_lists if isinstance(item, dict) for url in item.get("urls") or []
+    ]
+    meta = await asyncio.to_thread(enrich_urls, urls)
+    return JSONResponse({"linkLists": link_lists, "version": version, "meta": meta})
 
 
 @app.post("/api/link-lists")
@@ -175,12 +284,12 @@ async def api_save_link_lists(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
-    body = await request.json()
+    body = await read_json(request)
     link_lists = body.get("linkLists", [])
     if not isinstance(link_lists, list):
         return JSONResponse({"error": "Invalid link lists"}, status_code=400)
-    save_link_lists(username, link_lists)
-    return JSONResponse({"ok": True})
+    version = save_link_lists(username, link_lists)
+    return JSONResponse({"ok": True, "version": version})
 
 
 @app.get("/api/presets")
@@ -189,8 +298,9 @@ async def api_get_presets(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
+    version = collection_version(username, "presets")
     presets = get_presets(username)
-    return JSONResponse({"presets": presets})
+    return JSONResponse({"presets": presets, "version": version})
 
 
 @app.post("/api/presets")
@@ -199,12 +309,12 @@ async def api_save_presets(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
-    body = await request.json()
+    body = await read_json(request)
     presets = body.get("presets", [])
     if not isinstance(presets, list):
         return JSONResponse({"error": "Invalid presets"}, status_code=400)
-    save_presets(username, presets)
-    return JSONResponse({"ok": True})
+    version = save_presets(username, presets)
+    return JSONResponse({"ok": True, "version": version})
 
 
 @app.get("/api/currently-reading")
@@ -213,8 +323,9 @@ async def api_get_currently_reading(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
+    version = collection_version(username, "currently-reading")
     items = get_currently_reading(username)
-    return JSONResponse({"items": items})
+    return JSONResponse({"items": items, "version": version})
 
 
 @app.post("/api/currently-reading")
@@ -223,12 +334,12 @@ async def api_save_currently_reading(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
-    body = await request.json()
+    body = await read_json(request)
     items = body.get("items", [])
     if not isinstance(items, list):
         return JSONResponse({"error": "Invalid items"}, status_code=400)
-    save_currently_reading(username, items)
-    return JSONResponse({"ok": True})
+    version = save_currently_reading(username, items)
+    return JSONResponse({"ok": True, "version": version})
 
 
 @app.get("/api/link-posts")
@@ -237,8 +348,9 @@ async def api_get_link_posts(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
+    version = collection_version(username, "link-posts")
     items = get_link_posts(username)
-    return JSONResponse({"items": items})
+    return JSONResponse({"items": items, "version": version})
 
 
 @app.post("/api/link-posts")
@@ -247,9 +359,9 @@ async def api_save_link_posts(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
-    body = await request.json()
+    body = await read_json(request)
     items = body.get("items", [])
     if not isinstance(items, list):
         return JSONResponse({"error": "Invalid items"}, status_code=400)
-    save_link_posts(username, items)
-    return JSONResponse({"ok": True})
+    version = save_link_posts(username, items)
+    return JSONResponse({"ok": True, "version": version})
@@ -4,9 +4,14 @@ Uses pluggable storage backend (JSON files or Redis).
 """
 
 import hashlib
+import os
 import secrets
+from datetime import datetime, timezone
 
+from lib import search_index, timing
+from lib.read_stats import STATS_VERSION, build_stats, stats_view, update_stats
 from lib.storage import get_storage
+from lib.sync import collection_changed, get_versions
 
 SESSION_COOKIE = "wiki_session"
 
@@ -50,7 +55,14 @@ def verify_session(session_id: str | None) -> str | None:
     """Verify session. Returns username if valid, else None."""
     if not session_id:
         return None
-    return get_storage().get_session(session_id)
+    with timing.phase("auth"):
+        return get_storage().get_session(session_id)
+
+
+def is_admin(username: str | None) -> bool:
+    """True if username is listed in ADMIN_USERS (comma-separated)."""
+    admins = {u.strip() for u in (os.environ.get("ADMIN_USERS") or "").split(",")}
+    return bool(username) and username in admins - {""}
 
 
 def logout(session_id: str | None):
@@ -65,11 +77,41 @@ def get_log(username: str) -> list:
     return get_storage().get_log(username)
 
 
-def save_log(username: str, log: list):
-    """Save article log for user."""
+def save_log(username: str, log: list) -> int | None:
+    """
+    Save article log for user, updating its aggregates from the entries that
+    changed. Returns the log's new version (see lib/sync.py).
+    """
     if not isinstance(log, list):
-        return
-    get_storage().save_log(username, log)
+        return None
+    storage = get_storage()
+    old_log = storage.get_log(username)
+    storage.save_log(username, log)
+    version = collection_changed(username, "read-log")
+    try:
+        stats = update_stats(storage.get_read_log_stats(username), old_log, log)
+        stats["logVersion"] = version
+        storage.save_read_log_stats(username, stats)
+    except Exception as e:
+        # The log is saved; get_log_stats rebuilds the stats it no longer matches
+        print(f"Error updating read-log stats for {username}: {e}")
+    _reindex(username, "log", old_log, log, version)
+    return version
+
+
+def get_log_stats(username: str) -> dict:
+    """
+    Read-log aggregates for user, rebuilt from the log the first time they
+    are asked for and whenever they are not for the log's current version.
+    """
+    storage = get_storage()
+    stats = storage.get_read_log_stats(username)
+    version = get_versions(username)["read-log"]
+    if not stats or stats.get("version") != STATS_VERSION or stats.get("logVersion") != version:
+        stats = build_stats(storage.get_log(username))
+        stats["logVersion"] = version
+        storage.save_read_log_stats(username, stats)
+    return stats_view(stats, datetime.now(timezone.utc).date())
 
 
 def get_user_links(username: str) -> list:
@@ -77,11 +119,16 @@ def get_user_links(username: str) -> list:
     return get_storage().get_user_links(username)
 
 
-def save_user_links(username: str, links: list):
-    """Save user's custom links for user."""
+def save_user_links(username: str, links: list) -> int | None:
+    """Save user's custom links for user. Returns their new version."""
     if not isinstance(links, list):
-        return
-    get_storage().save_user_links(username, links)
+        return None
+    storage = get_storage()
+    old_links = storage.get_user_links(username)
+    storage.save_user_links(username, links)
+    version = collection_changed(username, "user-links")
+    _reindex(username, "link", old_links, links, version)
+    return version
 
 
 def get_link_lists(username: str) -> list:
@@ -89,11 +136,46 @@ def get_link_lists(username: str) -> list:
     return get_storage().get_link_lists(username)
 
 
-def save_link_lists(username: str, link_lists: list):
-    """Save user's link lists."""
+def save_link_lists(username: str, link_lists: list) -> int | None:
+    """Save user's link lists. Returns their new version."""
     if not isinstance(link_lists, list):
-        return
-    get_storage().save_link_lists(username, link_lists)
+        return None
+    storage = get_storage()
+    old_lists = storage.get_link_lists(username)
+    storage.save_link_lists(username, link_lists)
+    version = collection_changed(username, "link-lists")
+    _reindex(username, "list", old_lists, link_lists, version)
+    return version
+
+
+def _reindex(username: str, kind: str, old_items: list, new_items: list, version: int | None) -> None:
+    """
+    Update the search index after a save; a failure here must not fail the
+    save (the next search sees the index is behind and rebuilds it).
+    """
+    try:
+        search_index.update_index(get_storage(), username, kind, old_items, new_items, version)
+    except Exception as e:
+        print(f"Error updating search index for {username}: {e}")
+
+
+def search(username: str, query: str, kind: str | None = None, offset: int = 0, limit: int = 20) -> dict:
+    """Search the user's links, link lists and read log (see lib/search_index.py)."""
+    storage = get_storage()
+    meta = storage.get_search_docs(username, [search_index.META_ID]).get(search_index.META_ID)
+    versions = get_versions(username)
+    if not search_index.is_current(meta, versions):
+        search_index.build_index(
+            storage,
+            username,
+            {
+                "link": storage.get_user_links(username),
+                "list": storage.get_link_lists(username),
+                "log": storage.get_log(username),
+            },
+            versions,
+        )
+    return search_index.search(storage, username, query, kind, offset, limit)
 
 
 def get_presets(username: str) -> list:
@@ -101,11 +183,12 @@ def get_presets(username: str) -> list:
     return get_storage().get_presets(username)
 
 
-def save_presets(username: str, presets: list):
-    """Save user's presets."""
+def save_presets(username: str, presets: list) -> int | None:
+    """Save user's presets. Returns its new version."""
     if not isinstance(presets, list):
-        return
+        return None
     get_storage().save_presets(username, presets)
+    return collection_changed(username, "presets")
 
 
 def get_currently_reading(username: str) -> list:
@@ -113,11 +196,12 @@ def get_currently_reading(username: str) -> list:
     return get_storage().get_currently_reading(username)
 
 
-def save_currently_reading(username: str, items: list):
-    """Save user's currently reading list."""
+def save_currently_reading(username: str, items: list) -> int | None:
+    """Save user's currently reading list. Returns its new version."""
     if not isinstance(items, list):
-        return
+        return None
     get_storage().save_currently_reading(username, items)
+    return collection_changed(username, "currently-reading")
 
 
 def get_link_posts(username: str) -> list:
@@ -125,8 +209,9 @@ def get_link_posts(username: str) -> list:
     return get_storage().get_link_posts(username)
 
 
-def save_link_posts(username: str, items: list):
-    """Save user's link posts queue."""
+def save_link_posts(username: str, items: list) -> int | None:
+    """Save user's link posts queue. Returns its new version."""
     if not isinstance(items, list):
-        return
+        return None
     get_storage().save_link_posts(username, items)
+    return collection_changed(username, "link-posts")
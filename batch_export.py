@@ -0,0 +1,131 @@
+"""
+Bulk export of many Wikipedia articles as a streamed ZIP archive.
+Articles are fetched and rendered concurrently; each finished entry is written
+to the archive and flushed to the client before the next one is awaited.
+"""
+
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator
+
+from lib.pdf_pool import get_pdf_pool
+from wiki_content import fetch_article, iter_plain_text_with_references, safe_filename
+
+_COPY_CHUNK = 256 * 1024
+
+
+class _ZipSink:
+    """Write-only, unseekable file object that collects bytes for the response stream."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _render_entry(url: str, format: str) -> tuple[str, bytes | Path]:
+    """Fetch and render one article; returns (title, text bytes or PDF file path) or raises."""
+    article = fetch_article(url)
+    if article is None:
+        raise ValueError("Failed to fetch article content")
+    if format == "pdf":
+        # Wait for room in the render queue: shedding load is for interactive requests
+        return article.title, get_pdf_pool().render(article, wait=True)
+    text = "".join(
+        iter_plain_text_with_references(article.title, article.iter_block_dicts(), article.references)
+    )
+    return article.title, text.encode("utf-8")
+
+
+def _discard_rendered(fut: Future) -> None:
+    if fut.cancelled() or fut.exception() is not None:
+        return
+    data = fut.result()[1]
+    if isinstance(data, Path):
+        try:
+            os.unlink(data)
+        except OSError:
+            pass
+
+
+def iter_article_zip(
+    urls: list[str], format: str = "txt", concurrency: int = 4, skipped: list[str] | None = None
+) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive of the given articles as it is built. At most
+    `concurrency` articles are fetched and rendered at once, and at most twice
+    that many are submitted ahead, so memory stays bounded by the window
+    rather than the batch. Failures, after any `skipped` lines the caller
+    passes in, are listed in errors.txt.
+    """
+    ext = "pdf" if format == "pdf" else "txt"
+    # PDFs are already compressed; text shrinks well
+    compress_type = zipfile.ZIP_STORED if ext == "pdf" else zipfile.ZIP_DEFLATED
+    concurrency = max(1, concurrency)
+    window = concurrency * 2
+    sink = _ZipSink()
+    names: set[str] = set()
+    errors: list[str] = list(skipped or [])
+    pending: dict[Future, str] = {}
+    remaining = iter(urls)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+    try:
+        with zipfile.ZipFile(sink, "w") as zf:
+            while True:
+                while len(pending) < window:
+                    url = next(remaining, None)
+                    if url is None:
+                        break
+                    pending[executor.submit(_render_entry, url, format)] = url
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    url = pending.pop(fut)
+                    try:
+                        title, data = fut.result()
+                    except Exception as e:
+                        errors.append(f"{url}: {e}")
+                        continue
+                    stem = safe_filename(title) or "article"
+                    name = f"{stem}.{ext}"
+                    n = 1
+                    while name in names:
+                        n += 1
+                        name = f"{stem} ({n}).{ext}"
+                    names.add(name)
+                    if isinstance(data, Path):
+                        # Copied into the archive chunk by chunk so a large PDF
+                        # is never held in memory whole
+                        info = zipfile.ZipInfo.from_file(data, name)
+                        info.compress_type = compress_type
+                        with open(data, "rb") as src, zf.open(info, "w") as dest:
+                            os.unlink(data)
+                            while chunk := src.read(_COPY_CHUNK):
+                                dest.write(chunk)
+                                yield sink.drain()
+                    else:
+                        zf.writestr(name, data, compress_type=compress_type)
+                    yield sink.drain()
+            if errors:
+                zf.writestr("errors.txt", "\n".join(errors) + "\n", compress_type=zipfile.ZIP_DEFLATED)
+        yield sink.drain()
+    finally:
+        # Also reached when the client disconnects: drop work that has not started
+        # and delete PDFs rendered for entries that will never be written
+        for fut in pending:
+            fut.add_done_callback(_discard_rendered)
+        executor.shutdown(wait=False, cancel_futures=True)
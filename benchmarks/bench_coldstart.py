@@ -0,0 +1,111 @@
+"""
+Cold-start profile of the app entry points.
+Each entry module is imported in fresh interpreters: once under
+`-X importtime` to break the cost down per top-level package and per
+directly imported module, and --repeat more times to time the import itself.
+
+The run fails (exit status 1) when the median import time exceeds the
+budget or when a dependency that should only load on first use (reportlab,
+bs4, requests, ...) is imported at startup. tests/test_coldstart.py makes the
+same two checks as part of the test suite.
+
+Usage:
+    python benchmarks/bench_coldstart.py [module ...] [--repeat N] [--top N]
+        [--budget-ms MODULE=MS ...]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Median import time allowed per entry point, in milliseconds
+BUDGETS_MS = {"app": 500, "vital_article": 700}
+
+# Loaded on first use; importing any of these at startup is a regression
+LAZY_PACKAGES = ("reportlab", "bs4", "requests", "redis", "upstash_redis", "uvicorn")
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def import_profile(module: str) -> list[tuple[int, int, int, str]]:
+    """
+    (self us, cumulative us, depth, module name) for every module that
+    importing module pulls in, leaving out interpreter startup (site etc.).
+    """
+    stderr = _run(f"import {module}", "-X", "importtime").stderr
+    rows = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+    # importtime lists children before their parent, so the entry module's
+    # subtree is everything after the previous top-level row
+    end = next(i for i, r in enumerate(rows) if r[2] == 0 and r[3] == module)
+    start = max((i + 1 for i, r in enumerate(rows[:end]) if r[2] == 0), default=0)
+    return rows[start : end + 1]
+
+
+def import_wall_ms(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    return float(_run(code).stdout.strip()) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS_MS), help="entry modules to profile")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", action="append", default=[], metavar="MODULE=MS")
+    args = parser.parse_args()
+
+    budgets = dict(BUDGETS_MS)
+    for item in args.budget_ms:
+        name, _, ms = item.partition("=")
+        budgets[name] = float(ms)
+
+    ok = True
+    for module in args.modules:
+        rows = import_profile(module)
+        by_package: dict[str, int] = defaultdict(int)
+        for self_us, _, _, name in rows:
+            by_package[name.split(".")[0]] += self_us
+        direct = sorted((r for r in rows if r[2] == 1), key=lambda r: -r[1])
+        times = [import_wall_ms(module) for _ in range(args.repeat)]
+        median = statistics.median(times)
+        budget = budgets.get(module)
+
+        print(f"{module}: {len(rows)} modules, median import {median:.0f} ms over {args.repeat} runs"
+              + (f" (budget {budget:.0f} ms)" if budget else ""))
+        print("  by package (self time):")
+        for name, us in sorted(by_package.items(), key=lambda kv: -kv[1])[: args.top]:
+            print(f"    {us / 1000:8.1f} ms  {name}")
+        print(f"  imported directly by {module} (cumulative):")
+        for _, cum_us, _, name in direct[: args.top]:
+            print(f"    {cum_us / 1000:8.1f} ms  {name}")
+
+        eager = sorted(p for p in LAZY_PACKAGES if p in by_package)
+        if eager:
+            ok = False
+            print(f"  FAIL: imported at startup: {', '.join(eager)}")
+        if budget and median > budget:
+            ok = False
+            print(f"  FAIL: {median:.0f} ms is over the {budget:.0f} ms budget")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Benchmark article HTML extraction: the single-pass extractor in wiki_content
+against the previous BeautifulSoup tree walk, on saved pages or a synthetic one.
+Reports parse time and peak traced memory, and checks both produce identical
+body blocks and references, and that they match a page's expected output
+(page.json next to page.html) when there is one.
+
+Usage:
+    python benchmarks/bench_extract.py [page.html ...] [--sections N] [--repeat N] [--record]
+
+tests/pages holds saved article pages with their expected output, checked by
+tests/test_extract_pages.py. --record (re)writes page.json for the given pages
+from the BeautifulSoup extraction; review the diff before committing it.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from wiki_content import _body_stops_at_heading, _clean_reference_text, extract_article  # noqa: E402
+
+
+def extract_with_soup(html: str):
+    """The original three-walk BeautifulSoup extraction, kept as the reference output."""
+    soup = BeautifulSoup(html, "html.parser")
+    title_el = soup.find(id="firstHeading")
+    title = title_el.get_text(strip=True) if title_el else "Untitled"
+    content_div = soup.find(id="mw-content-text")
+    if not content_div:
+        return title, [], []
+    for tag in content_div.find_all(["script", "style", "nav", "table", "figure"]):
+        tag.decompose()
+    body_blocks = []
+    for el in content_div.find_all(["h2", "h3", "p"]):
+        text = el.get_text(separator=" ", strip=True)
+        if el.name in ("h2", "h3"):
+            if text and _body_stops_at_heading(text):
+                break
+            if text:
+                body_blocks.append({"type": el.name, "text": text})
+            continue
+        if text:
+            body_blocks.append({"type": "p", "text": text})
+    refs = []
+    for li in content_div.find_all("li", id=lambda x: x and x.startswith("cite_note-")):
+        text = _clean_reference_text(li.get_text(separator=" ", strip=True))
+        if text:
+            refs.append(f"[{len(refs) + 1}] {text}")
+    return title, body_blocks, refs
+
+
+def synthetic_page(sections: int) -> str:
+    """Build a skin-like article page with the given number of sections."""
+    parts = [
+        "<html><head><script>var RLCONF={};</script><style>.a{}</style></head><body>",
+        '<nav><a href="/wiki/Main_Page">Main page</a></nav>',
+        '<h1 id="firstHeading"><span class="mw-page-title-main">Synthetic article</span></h1>',
+        '<div id="mw-content-text"><div class="mw-parser-output">',
+        '<table class="infobox"><tr><td><p>Infobox</p></td></tr></table>',
+    ]
+    ref = 0
+    for s in range(sections):
+        parts.append(f'<div class="mw-heading mw-heading2"><h2 id="S{s}">Section {s}</h2>'
+                     '<span class="mw-editsection">[<a href="#">edit</a>]</span></div>')
+        for p in range(6):
+            ref += 1
+            parts.append(
+                f"<p>Paragraph {p} of section {s} with <b>bold</b>, <i>italic</i> and "
+                f'<a href="/wiki/Link_{p}">links</a> &amp; entities.'
+                f'<sup id="cite_ref-{ref}"><a href="#cite_note-{ref}">[{ref}]</a></sup> '
+                + "Filler text for a realistic paragraph length. " * 8
+                + "</p>"
+            )
+        parts.append(f"<figure><img src=\"x.png\"><figcaption>Figure {s}</figcaption></figure>")
+        parts.append(f'<h3 id="S{s}_sub">Subsection {s}</h3><p>Short paragraph.</p>')
+    parts.append('<div class="mw-heading mw-heading2"><h2 id="References">References</h2></div>')
+    parts.append('<div class="reflist"><ol class="references">')
+    for r in range(1, ref + 1):
+        parts.append(
+            f'<li id="cite_note-{r}"><span class="mw-cite-backlink"><a href="#cite_ref-{r}">^</a></span> '
+            f'<span class="reference-text">Author {r} (2001). <i>Title {r}</i>. Publisher.</span></li>'
+        )
+    parts.append("</ol></div></div></div></body></html>")
+    return "".join(parts)
+
+
+def expected_path(page: str) -> Path:
+    return Path(page).with_suffix(".json")
+
+
+def as_expected(result) -> dict:
+    title, blocks, refs = result
+    return {"title": title, "blocks": blocks, "references": refs}
+
+
+def measure(fn, html: str, repeat: int) -> tuple[float, int, object]:
+    """Return (best seconds, peak traced bytes, result) for fn(html)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(html)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="saved article HTML files")
+    parser.add_argument("--sections", type=int, default=200, help="sections in the synthetic page")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--record", action="store_true", help="write each page's expected output")
+    args = parser.parse_args()
+
+    if args.record:
+        for page in args.pages:
+            html = Path(page).read_text(encoding="utf-8")
+            text = json.dumps(as_expected(extract_with_soup(html)), ensure_ascii=False, indent=1)
+            expected_path(page).write_text(text + "\n", encoding="utf-8")
+            print(f"wrote {expected_path(page)}")
+        return 0
+
+    inputs = [(p, Path(p).read_text(encoding="utf-8")) for p in args.pages]
+    if not inputs:
+        inputs = [(f"synthetic ({args.sections} sections)", synthetic_page(args.sections))]
+
+    ok = True
+    for name, html in inputs:
+        old_t, old_mem, old = measure(extract_with_soup, html, args.repeat)
+        new_t, new_mem, new = measure(extract_article, html, args.repeat)
+        same = old == new
+        expected = expected_path(name)
+        if name in args.pages and expected.exists():
+            same = same and as_expected(new) == json.loads(expected.read_text(encoding="utf-8"))
+        ok = ok and same
+        print(f"{name}: {len(html) / 1024:.0f} KiB, {len(new[1])} blocks, {len(new[2])} refs")
+        print(f"  soup        {old_t * 1000:8.1f} ms  peak {old_mem / 1024 / 1024:7.1f} MiB")
+        print(f"  single-pass {new_t * 1000:8.1f} ms  peak {new_mem / 1024 / 1024:7.1f} MiB")
+        print(f"  speedup {old_t / new_t:.1f}x, output {'as expected' if same else 'DIFFERS'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
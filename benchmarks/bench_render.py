@@ -0,0 +1,164 @@
+"""
+Benchmark article rendering over a synthetic corpus: every PDF renderer in
+pdf_builder plus the plain-text renderer, on articles that vary in length,
+heading density and reference count (and on saved article pages if given).
+Reports wall time, CPU time, peak traced memory and output size.
+
+Results can be saved as JSON and compared against an earlier run; the
+comparison fails (exit status 1) when wall time or peak memory of any case
+grows by more than the tolerance.
+
+Usage:
+    python benchmarks/bench_render.py [page.html ...] [--repeat N] [--only CASE]
+        [--save results.json] [--compare baseline.json] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pdf_builder import RENDERERS, build_pdf  # noqa: E402
+from wiki_content import extract_article, format_plain_text_with_references  # noqa: E402
+
+_WORDS = (
+    "the of and in a to is was for as by with on that from at an which are "
+    "energy field particle wave theory quantum relativity mass charge light "
+    "velocity momentum experiment observation equation Schrödinger Planck"
+).split()
+
+# name: (paragraphs, paragraphs per heading, references)
+CORPUS = {
+    "small": (20, 8, 10),
+    "medium": (150, 8, 80),
+    "large": (600, 8, 400),
+    "heading-heavy": (150, 1, 80),
+    "reference-heavy": (60, 8, 1500),
+}
+
+# Memory and time above baseline * (1 + tolerance) count as a regression;
+# cases faster than this are too noisy to compare on wall time.
+MIN_COMPARABLE_MS = 5.0
+
+
+def synthetic_article(
+    paragraphs: int, heading_every: int, references: int, seed: int = 1
+) -> tuple[str, list[dict], list[str]]:
+    """Title, body blocks and references of realistic lengths, reproducible for a given seed."""
+    rng = random.Random(seed)
+    blocks: list[dict] = []
+    for i in range(paragraphs):
+        if i % heading_every == 0:
+            kind = "h2" if i % (heading_every * 3) == 0 else "h3"
+            blocks.append(
+                {"type": kind, "text": f"Section {i // heading_every}: " + " ".join(rng.choices(_WORDS, k=3))}
+            )
+        blocks.append({"type": "p", "text": " ".join(rng.choices(_WORDS, k=rng.randint(30, 180)))})
+    refs = [
+        f"[{r}] Author {r} ({1950 + r % 70}). " + " ".join(rng.choices(_WORDS, k=rng.randint(5, 20))) + "."
+        for r in range(1, references + 1)
+    ]
+    return "Synthetic article", blocks, refs
+
+
+def page_count(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b", pdf))
+
+
+def measure(fn, repeat: int) -> dict:
+    """Best wall and CPU time over repeat runs, then peak traced memory of one more run."""
+    wall = cpu = float("inf")
+    result = None
+    for _ in range(repeat):
+        w, c = time.perf_counter(), time.process_time()
+        result = fn()
+        wall = min(wall, time.perf_counter() - w)
+        cpu = min(cpu, time.process_time() - c)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = len(result.encode("utf-8")) if isinstance(result, str) else len(result)
+    return {
+        "wall_ms": round(wall * 1000, 2),
+        "cpu_ms": round(cpu * 1000, 2),
+        "peak_kib": round(peak / 1024, 1),
+        "size_kib": round(size / 1024, 1),
+        **({"pages": page_count(result)} if isinstance(result, bytes) else {}),
+    }
+
+
+def run_case(title: str, blocks: list[dict], refs: list[str], repeat: int) -> dict:
+    targets = {
+        f"pdf-{name}": (lambda name=name: build_pdf(title, blocks, refs, renderer=name)) for name in RENDERERS
+    }
+    targets["txt"] = lambda: format_plain_text_with_references(title, blocks, refs)
+    return {target: measure(fn, repeat) for target, fn in targets.items()}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return one line per metric that regressed beyond tolerance."""
+    regressions = []
+    for case, targets in results["cases"].items():
+        for target, now in targets.items():
+            before = baseline.get("cases", {}).get(case, {}).get(target)
+            if before is None:
+                continue
+            if before["wall_ms"] >= MIN_COMPARABLE_MS and now["wall_ms"] > before["wall_ms"] * (1 + tolerance):
+                regressions.append(f"{case}/{target}: wall {before['wall_ms']} -> {now['wall_ms']} ms")
+            if now["peak_kib"] > before["peak_kib"] * (1 + tolerance):
+                regressions.append(f"{case}/{target}: peak {before['peak_kib']} -> {now['peak_kib']} KiB")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="saved article HTML files to include")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", action="append", help="run only these corpus cases")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed growth, as a fraction")
+    args = parser.parse_args()
+
+    articles = {
+        name: synthetic_article(*spec) for name, spec in CORPUS.items() if not args.only or name in args.only
+    }
+    for page in args.pages:
+        title, blocks, refs = extract_article(Path(page).read_text(encoding="utf-8"))
+        articles[Path(page).stem] = (title, blocks, refs)
+
+    results = {"python": platform.python_version(), "machine": platform.machine(), "cases": {}}
+    for name, (title, blocks, refs) in articles.items():
+        print(f"{name}: {len(blocks)} blocks, {len(refs)} refs")
+        case = results["cases"][name] = run_case(title, blocks, refs, args.repeat)
+        for target, m in case.items():
+            pages = f"  {m['pages']} pages" if "pages" in m else ""
+            print(
+                f"  {target:13} {m['wall_ms']:9.1f} ms wall {m['cpu_ms']:9.1f} ms cpu"
+                f"  peak {m['peak_kib']:9.1f} KiB  out {m['size_kib']:8.1f} KiB{pages}"
+            )
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Saved {args.save}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""
+Ingest a local Wikipedia dump into the offline article store (lib/article_store.py).
+
+Supports Wikimedia Enterprise HTML dumps (NDJSON, optionally inside a .tar.gz)
+and MediaWiki XML dumps (.xml, .xml.bz2, .xml.gz). Pages are converted to
+articles in parallel worker processes and written to a SQLite store; serve it
+with LOCAL_ARTICLE_STORE=<path> (and WIKI_OFFLINE=1 to forbid outbound traffic).
+Vital Articles list pages found in the dump are compiled into catalogs, so
+/random works from the same data.
+
+HTML dumps go through the same extractor as live pages. XML dumps carry
+wikitext, which is converted with a deliberately simple markup stripper.
+
+Usage:
+    python ingest_dump.py DUMP --store data/articles.sqlite [--workers N]
+"""
+
+import argparse
+import bz2
+import gzip
+import html
+import json
+import multiprocessing
+import re
+import sys
+import tarfile
+import time
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import quote, unquote
+
+from lib.article_ir import Article
+from lib.article_store import ArticleStore
+from lib.catalog import SOURCES, is_article_href, publish_catalog
+from wiki_content import _body_stops_at_heading, _clean_reference_text, extract_article
+
+# (kind, title, revid, namespace, payload, redirect titles)
+# kind is "html", "wikitext" or "redirect" (payload is then the target title)
+Record = tuple[str, str, int | None, int, str, list[str]]
+
+# Vital Articles page title -> catalog category
+_VITAL_PAGES = {
+    unquote(url.split("/wiki/", 1)[1]).replace("_", " "): category
+    for category, url in SOURCES.items()
+}
+
+
+# --- Reading dumps ---
+
+
+def _iter_ndjson_lines(path: Path) -> Iterator[bytes]:
+    if path.name.endswith((".tar.gz", ".tgz")):
+        with tarfile.open(path, "r|gz") as tar:
+            for member in tar:
+                f = tar.extractfile(member)
+                if f is not None:
+                    yield from f
+    else:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rb") as f:
+            yield from f
+
+
+def _iter_html_records(path: Path) -> Iterator[Record]:
+    """Records from a Wikimedia Enterprise HTML dump (one JSON object per line)."""
+    for line in _iter_ndjson_lines(path):
+        line = line.strip()
+        if not line:
+            continue
+        obj = json.loads(line)
+        body = (obj.get("article_body") or {}).get("html")
+        if not body:
+            continue
+        revid = (obj.get("version") or {}).get("identifier")
+        ns = (obj.get("namespace") or {}).get("identifier") or 0
+        redirects = [r["name"] for r in obj.get("redirects") or [] if r.get("name")]
+        yield "html", obj["name"], revid, ns, body, redirects
+
+
+def _iter_xml_records(path: Path) -> Iterator[Record]:
+    """Records from a MediaWiki XML export, parsed incrementally."""
+    if path.suffix == ".bz2":
+        opener = bz2.open
+    elif path.suffix == ".gz":
+        opener = gzip.open
+    else:
+        opener = open
+    with opener(path, "rb") as f:
+        root = None
+        for event, el in ET.iterparse(f, events=("start", "end")):
+            if root is None:
+                root = el
+            if event != "end" or not el.tag.endswith("page"):
+                continue
+            title = el.findtext("{*}title") or ""
+            ns = int(el.findtext("{*}ns") or 0)
+            redirect = el.find("{*}redirect")
+            rev = el.find("{*}revision")
+            revid = rev.findtext("{*}id") if rev is not None else None
+            text = (rev.findtext("{*}text") if rev is not None else None) or ""
+            root.clear()
+            if redirect is not None:
+                yield "redirect", title, None, ns, redirect.get("title") or "", []
+            else:
+                yield "wikitext", title, int(revid) if revid else None, ns, text, []
+
+
+def iter_dump_records(path: Path) -> Iterator[Record]:
+    name = path.name
+    if ".xml" in name:
+        return _iter_xml_records(path)
+    return _iter_html_records(path)
+
+
+# --- Wikitext conversion ---
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+_REF_RE = re.compile(r"<ref(\s[^>]*?)?(?:/>|>(.*?)</ref\s*>)", re.S | re.I)
+_DROP_TAGS_RE = re.compile(r"<(gallery|math|score|timeline|syntaxhighlight)\b.*?</\1\s*>", re.S | re.I)
+_TAG_RE = re.compile(r"</?[a-zA-Z][^>]*>")
+_HEADING_RE = re.compile(r"^(={2,6})\s*(.*?)\s*\1\s*$")
+_EXT_LINK_RE = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+_FORMAT_RE = re.compile(r"'{2,}")
+_SPACES_RE = re.compile(r"\s+")
+_SKIPPED_LINK_NAMESPACES = ("file:", "image:", "category:", "media:")
+_CITE_FIELDS = (("last", "author", "first"), ("title",), ("journal", "website", "work", "publisher"), ("date", "year"))
+
+
+def _replace_balanced(text: str, open_tok: str, close_tok: str, replace) -> str:
+    """Replace each outermost open_tok...close_tok span with replace(inner)."""
+    out: list[str] = []
+    depth = 0
+    pos = 0
+    start = 0
+    while True:
+        nxt_open = text.find(open_tok, pos)
+        nxt_close = text.find(close_tok, pos)
+        if nxt_close < 0 and (nxt_open < 0 or depth == 0):
+            break
+        if nxt_open >= 0 and (nxt_close < 0 or nxt_open < nxt_close):
+            if depth == 0:
+                out.append(text[start:nxt_open])
+                start = nxt_open
+            depth += 1
+            pos = nxt_open + len(open_tok)
+        else:
+            if depth == 0:
+                pos = nxt_close + len(close_tok)
+                continue
+            depth -= 1
+            pos = nxt_close + len(close_tok)
+            if depth == 0:
+                out.append(replace(text[start + len(open_tok):nxt_close]))
+                start = pos
+    if depth:
+        # Unbalanced: drop the unterminated span
+        return "".join(out)
+    out.append(text[start:])
+    return "".join(out)
+
+
+def _format_template(inner: str) -> str:
+    """Render citation templates as plain text; drop every other template."""
+    name, _, rest = inner.partition("|")
+    if not name.strip().lower().startswith("cite"):
+        return ""
+    params: dict[str, str] = {}
+    for part in rest.split("|"):
+        key, sep, value = part.partition("=")
+        if sep:
+            params[key.strip().lower()] = _inline_text(value)
+    fields = []
+    for names in _CITE_FIELDS:
+        values = [params[n] for n in names if params.get(n)]
+        if values:
+            fields.append(", ".join(values).rstrip("."))
+    return ". ".join(fields) + "." if fields else ""
+
+
+def _format_link(inner: str) -> str:
+    target, _, label = inner.partition("|")
+    if target.strip().lower().startswith(_SKIPPED_LINK_NAMESPACES):
+        return ""
+    # Labels may contain nested links
+    return _replace_balanced(label or target, "[[", "]]", _format_link)
+
+
+def _inline_text(text: str) -> str:
+    text = _replace_balanced(text, "{{", "}}", _format_template)
+    text = _replace_balanced(text, "[[", "]]", _format_link)
+    text = _EXT_LINK_RE.sub(r"\1", text)
+    text = _FORMAT_RE.sub("", text)
+    text = _TAG_RE.sub("", text)
+    return _SPACES_RE.sub(" ", html.unescape(text)).strip()
+
+
+def wikitext_to_blocks(text: str) -> tuple[list[dict], list[str]]:
+    """Convert article wikitext to (body_blocks, references) with simple markup stripping."""
+    text = _COMMENT_RE.sub("", text)
+    refs: list[str] = []
+
+    def take_ref(match: re.Match) -> str:
+        if match.group(2):
+            cleaned = _clean_reference_text(_inline_text(match.group(2)))
+            if cleaned:
+                refs.append(f"[{len(refs) + 1}] {cleaned}")
+        return ""
+
+    text = _REF_RE.sub(take_ref, text)
+    text = _DROP_TAGS_RE.sub("", text)
+    text = _replace_balanced(text, "{{", "}}", lambda inner: "")
+    text = _replace_balanced(text, "{|", "|}", lambda inner: "")
+
+    blocks: list[dict] = []
+    paragraph: list[str] = []
+
+    def flush() -> None:
+        if paragraph:
+            para = _inline_text(" ".join(paragraph))
+            if para:
+                blocks.append({"type": "p", "text": para})
+            paragraph.clear()
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        heading = _HEADING_RE.match(stripped)
+        if heading:
+            flush()
+            heading_text = _inline_text(heading.group(2))
+            if heading_text and _body_stops_at_heading(heading_text):
+                break
+            level = len(heading.group(1))
+            if heading_text and level in (2, 3):
+                blocks.append({"type": f"h{level}", "text": heading_text})
+            continue
+        if not stripped or stripped[0] in "*#:;|!" or stripped.startswith("__"):
+            flush()
+            continue
+        paragraph.append(stripped)
+    flush()
+    return blocks, refs
+
+
+# --- Link extraction for catalogs ---
+
+
+class _LinkCollector(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hrefs: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == "a":
+            href = dict(attrs).get("href") or ""
+            # Parsoid HTML links relative to the page ("./Physics")
+            if href.startswith("./"):
+                href = "/wiki/" + href[2:]
+            if is_article_href(href):
+                self.hrefs.append(href.split("#", 1)[0])
+
+
+_WIKILINK_RE = re.compile(r"\[\[([^\[\]|#]+)")
+
+
+def _catalog_titles(kind: str, payload: str) -> list[str]:
+    """Article hrefs (minus /wiki/) linked from a Vital Articles page."""
+    if kind == "html":
+        collector = _LinkCollector()
+        collector.feed(payload)
+        collector.close()
+        hrefs = collector.hrefs
+    else:
+        hrefs = [
+            "/wiki/" + quote(m.strip().replace(" ", "_"), safe="/:;@$!*(),~'")
+            for m in _WIKILINK_RE.findall(payload)
+        ]
+        hrefs = [h for h in hrefs if is_article_href(h)]
+    return [h[len("/wiki/"):] for h in dict.fromkeys(hrefs)]
+
+
+# --- Worker ---
+
+
+def _convert(record: Record) -> tuple[str, str, int | None, object]:
+    """
+    Convert one dump record in a worker process. Returns (action, title, revid, value)
+    where action is "article" (value: serialized Article), "catalog" (value:
+    (category, titles)) or "skip".
+    """
+    kind, title, revid, ns, payload, _ = record
+    category = _VITAL_PAGES.get(title)
+    if category is not None:
+        return "catalog", title, revid, (category, _catalog_titles(kind, payload))
+    if ns != 0:
+        return "skip", title, revid, None
+    try:
+        if kind == "html":
+            page_title, body_blocks, references = extract_article(
+                f'<h1 id="firstHeading">{html.escape(title)}</h1>{payload}', content_id=None
+            )
+            # Parsoid backlinks render as arrows instead of "^"
+            references = [re.sub(r"^(\[\d+\] )↑\s*", r"\1", r) for r in references]
+        else:
+            page_title = title
+            body_blocks, references = wikitext_to_blocks(payload)
+    except Exception as e:
+        print(f"Error converting {title}: {e}", file=sys.stderr)
+        return "skip", title, revid, None
+    article = Article.from_blocks(page_title, body_blocks, references, revid)
+    return "article", title, revid, article.to_bytes()
+
+
+def _records_for_workers(path: Path, store: ArticleStore, batch_size: int) -> Iterator[Record]:
+    """Pass page records through, writing redirects straight to the store."""
+    redirects: list[tuple[str, str]] = []
+    for record in iter_dump_records(path):
+        kind, title, _, ns, payload, aliases = record
+        if kind == "redirect":
+            if ns == 0 and payload:
+                redirects.append((title, payload))
+        else:
+            redirects.extend((alias, title) for alias in aliases)
+            yield record
+        if len(redirects) >= batch_size:
+            store.put_redirects(redirects)
+            redirects.clear()
+    if redirects:
+        store.put_redirects(redirects)
+
+
+def ingest(path: Path, store_path: Path, workers: int, batch_size: int = 500) -> int:
+    """Convert every page in the dump and write it to the store. Returns the article count."""
+    store = ArticleStore(store_path, writable=True)
+    rows: list[tuple[str, int | None, bytes]] = []
+    count = 0
+    started = time.time()
+    with multiprocessing.Pool(workers) as pool:
+        records = _records_for_workers(path, store, batch_size)
+        for action, title, revid, value in pool.imap_unordered(_convert, records, chunksize=16):
+            if action == "catalog":
+                category, titles = value
+                publish_catalog(category, titles)
+                print(f"Published catalog '{category}' with {len(titles)} articles from {title}")
+            elif action == "article":
+                rows.append((title, revid, value))
+                if len(rows) >= batch_size:
+                    store.put_many(rows)
+                    count += len(rows)
+                    rows.clear()
+                    print(f"{count} articles ({count / (time.time() - started):.0f}/s)")
+    if rows:
+        store.put_many(rows)
+        count += len(rows)
+    store.close()
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dump", type=Path, help="Enterprise HTML (.ndjson[.gz], .tar.gz) or XML (.xml[.bz2|.gz]) dump")
+    parser.add_argument("--store", type=Path, default=Path("data/articles.sqlite"))
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    count = ingest(args.dump, args.store, max(1, args.workers), args.batch_size)
+    print(f"Ingested {count} articles into {args.store}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Cache of parsed Wikipedia articles keyed by canonical title and revision id.
+Articles are held in their serialized form (lib/article_ir.py) in a
+byte-bounded in-memory LRU, with an optional on-disk tier
+(ARTICLE_CACHE_DIR) that survives restarts and is shared by local workers.
+The disk tier is bounded by ARTICLE_CACHE_DISK_MAX_BYTES and evicts the
+files least recently written or revalidated.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from lib.article_ir import Article
+
+
+class CachedArticle:
+    """One serialized article plus the revision it was parsed from."""
+
+    __slots__ = ("blob", "revid", "checked_at")
+
+    def __init__(self, blob: bytes, revid: int | None, checked_at: float | None = None):
+        self.blob = blob
+        self.revid = revid
+        self.checked_at = time.time() if checked_at is None else checked_at
+
+    @property
+    def size(self) -> int:
+        return len(self.blob)
+
+    def article(self) -> Article:
+        return Article.from_bytes(self.blob)
+
+
+class ArticleCache:
+    """Byte-bounded LRU of parsed articles with an optional, also bounded, disk tier."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        disk_dir: Path | None = None,
+        revalidate_after: float = 300,
+        disk_max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.revalidate_after = revalidate_after
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: OrderedDict[str, CachedArticle] = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir is not None:
+            disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(p.stat().st_size for p in disk_dir.glob("*.bin"))
+
+    def is_fresh(self, entry: CachedArticle) -> bool:
+        """True if the entry was revision-checked recently enough to serve without a check."""
+        return time.time() - entry.checked_at < self.revalidate_after
+
+    def get(self, key: str) -> CachedArticle | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._load_from_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, article: Article) -> CachedArticle:
+        entry = CachedArticle(article.to_bytes(), article.revid)
+        self._remember(key, entry)
+        self._save_to_disk(key, entry)
+        return entry
+
+    def stale_entries(self, limit: int) -> list[tuple[str, int | None]]:
+        """
+        Return up to `limit` (key, revid) pairs for in-memory entries due for a
+        revision check, most recently used first.
+        """
+        now = time.time()
+        result: list[tuple[str, int | None]] = []
+        with self._lock:
+            for key in reversed(self._entries):
+                entry = self._entries[key]
+                if now - entry.checked_at >= self.revalidate_after:
+                    result.append((key, entry.revid))
+                    if len(result) >= limit:
+                        break
+        return result
+
+    def mark_checked(self, key: str) -> None:
+        """Record that the cached revision for key is still current."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.checked_at = time.time()
+        path = self._disk_path(key)
+        if path is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def discard(self, key: str) -> None:
+        """Drop key from memory and disk."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+        path = self._disk_path(key)
+        if path is not None:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                return
+            with self._lock:
+                self._disk_bytes -= size
+
+    def _remember(self, key: str, entry: CachedArticle) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def _disk_path(self, key: str) -> Path | None:
+        if self.disk_dir is None:
+            return None
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.disk_dir / f"{digest}.bin"
+
+    def _load_from_disk(self, key: str) -> CachedArticle | None:
+        """
+        Read and fully decode the disk entry for key. A corrupt or truncated
+        file is deleted, so the article is fetched again instead of failing
+        later when the entry is served.
+        """
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            checked_at = path.stat().st_mtime
+        except OSError:
+            return None
+        try:
+            revid = Article.from_bytes(blob).revid
+        except ValueError as e:
+            print(f"Discarding corrupt article cache entry for '{key}': {e}")
+            self.discard(key)
+            return None
+        return CachedArticle(blob, revid, checked_at=checked_at)
+
+    def _save_to_disk(self, key: str, entry: CachedArticle) -> None:
+        path = self._disk_path(key)
+        if path is None:
+            return
+        tmp_name = None
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(entry.blob)
+            # Rewriting a key (e.g. after a revalidation) replaces its file
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_name, path)
+        except OSError as e:
+            print(f"Error writing article cache entry for '{key}': {e}")
+            if tmp_name is not None:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+            return
+        with self._lock:
+            self._disk_bytes += entry.size - replaced
+            over = self._disk_bytes > self.disk_max_bytes
+        if over:
+            self._evict_disk(keep=path)
+
+    def _evict_disk(self, keep: Path) -> None:
+        """
+        Delete the least recently written or revalidated files until the disk
+        tier fits in disk_max_bytes, along with temp files left by crashed
+        writes. The byte count is re-measured here, so writes by other local
+        workers are accounted for.
+        """
+        files = []
+        stale_tmp = time.time() - 3600
+        for p in self.disk_dir.iterdir():
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            if p.suffix == ".tmp":
+                if st.st_mtime < stale_tmp:
+                    try:
+                        p.unlink()
+                    except OSError:
+                        pass
+                continue
+            if p.suffix == ".bin":
+                files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, p in files:
+            if total <= self.disk_max_bytes:
+                break
+            if p == keep:
+                continue
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+
+_CACHE: ArticleCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_article_cache() -> ArticleCache:
+    """Return the process-wide article cache, configured from the environment."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            disk_dir = (os.environ.get("ARTICLE_CACHE_DIR") or "").strip()
+            _CACHE = ArticleCache(
+                max_bytes=int(os.environ.get("ARTICLE_CACHE_MAX_BYTES") or 64 * 1024 * 1024),
+                disk_dir=Path(disk_dir) if disk_dir else None,
+                revalidate_after=float(os.environ.get("ARTICLE_CACHE_REVALIDATE_SECONDS") or 300),
+                disk_max_bytes=int(os.environ.get("ARTICLE_CACHE_DISK_MAX_BYTES") or 512 * 1024 * 1024),
+            )
+        return _CACHE
@@ -0,0 +1,151 @@
+"""
+Compact intermediate representation for parsed articles.
+An Article keeps block kinds in a bytes array and texts in tuples, and
+serializes to a small zlib-compressed binary blob that can be stored in Redis
+or on disk and handed to the text and PDF renderers without reparsing HTML.
+"""
+
+import struct
+import zlib
+from typing import Iterator
+
+MAGIC = b"WART"
+VERSION = 1
+
+# Block kinds, indexed by their one-byte code in Article.kinds
+BLOCK_TYPES = ("h2", "h3", "p")
+_KIND_CODES = {name: code for code, name in enumerate(BLOCK_TYPES)}
+
+# magic, format version, flags, revision id (-1 if unknown), block count, reference count
+_HEADER = struct.Struct("<4sBBqII")
+_FLAG_COMPRESSED = 1
+
+
+class Article:
+    """A parsed article: title, revision id, body blocks and references."""
+
+    __slots__ = ("title", "revid", "kinds", "texts", "references")
+
+    def __init__(
+        self,
+        title: str,
+        kinds: bytes,
+        texts: tuple[str, ...],
+        references: tuple[str, ...],
+        revid: int | None = None,
+    ):
+        if len(kinds) != len(texts):
+            raise ValueError("kinds and texts must have the same length")
+        self.title = title
+        self.revid = revid
+        self.kinds = bytes(kinds)
+        self.texts = tuple(texts)
+        self.references = tuple(references)
+
+    @classmethod
+    def from_blocks(
+        cls,
+        title: str,
+        body_blocks: list[dict],
+        references: list[str],
+        revid: int | None = None,
+    ) -> "Article":
+        """Build from the {"type", "text"} dicts produced by wiki_content."""
+        kinds = bytes(_KIND_CODES[b["type"]] for b in body_blocks)
+        return cls(title, kinds, tuple(b["text"] for b in body_blocks), tuple(references), revid)
+
+    @property
+    def body_blocks(self) -> list[dict]:
+        """Body as the list of {"type": "h2"|"h3"|"p", "text": str} dicts the renderers take."""
+        return [{"type": BLOCK_TYPES[k], "text": t} for k, t in zip(self.kinds, self.texts)]
+
+    def iter_block_dicts(self) -> Iterator[dict]:
+        """Yield body blocks as dicts one at a time, for streaming renderers."""
+        for k, t in zip(self.kinds, self.texts):
+            yield {"type": BLOCK_TYPES[k], "text": t}
+
+    def iter_blocks(self) -> Iterator[tuple[str, str]]:
+        """Yield (type, text) for each body block without building dicts."""
+        for k, t in zip(self.kinds, self.texts):
+            yield BLOCK_TYPES[k], t
+
+    def to_bytes(self, compress: bool = True) -> bytes:
+        """
+        Serialize as header + payload, where the payload is the kinds array,
+        a u32 byte length for every string (title, blocks, references) and
+        the concatenated UTF-8 strings.
+        """
+        strings = [s.encode("utf-8") for s in (self.title, *self.texts, *self.references)]
+        payload = b"".join(
+            [self.kinds, struct.pack(f"<{len(strings)}I", *map(len, strings)), *strings]
+        )
+        flags = 0
+        if compress:
+            payload = zlib.compress(payload, 6)
+            flags |= _FLAG_COMPRESSED
+        revid = -1 if self.revid is None else self.revid
+        header = _HEADER.pack(MAGIC, VERSION, flags, revid, len(self.kinds), len(self.references))
+        return header + payload
+
+    @staticmethod
+    def _read_header(data: bytes) -> tuple[int, int, int, int]:
+        """(flags, revid, block count, reference count); raises ValueError for anything else."""
+        if len(data) < _HEADER.size:
+            raise ValueError("Serialized article is truncated")
+        magic, version, flags, revid, n_blocks, n_refs = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a serialized article")
+        return flags, revid, n_blocks, n_refs
+
+    @staticmethod
+    def read_revid(data: bytes) -> int | None:
+        """Read the revision id from a serialized article's header without decoding it."""
+        revid = Article._read_header(data)[1]
+        return None if revid < 0 else revid
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Article":
+        """Decode a blob from to_bytes; raises ValueError if it is corrupt or truncated."""
+        flags, revid, n_blocks, n_refs = cls._read_header(data)
+        payload = memoryview(data)[_HEADER.size:]
+        if flags & _FLAG_COMPRESSED:
+            try:
+                payload = memoryview(zlib.decompress(payload))
+            except zlib.error as e:
+                raise ValueError(f"Corrupt article payload: {e}") from e
+        n_strings = 1 + n_blocks + n_refs
+        kinds = bytes(payload[:n_blocks])
+        pos = n_blocks + 4 * n_strings
+        if len(payload) < pos or any(k >= len(BLOCK_TYPES) for k in kinds):
+            raise ValueError("Corrupt article payload")
+        lengths = struct.unpack_from(f"<{n_strings}I", payload, n_blocks)
+        if pos + sum(lengths) != len(payload):
+            raise ValueError("Corrupt article payload: string lengths do not match")
+        strings = []
+        try:
+            for length in lengths:
+                strings.append(str(payload[pos:pos + length], "utf-8"))
+                pos += length
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Corrupt article payload: {e}") from e
+        return cls(
+            strings[0],
+            kinds,
+            tuple(strings[1:1 + n_blocks]),
+            tuple(strings[1 + n_blocks:]),
+            None if revid < 0 else revid,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Article):
+            return NotImplemented
+        return (
+            self.title == other.title
+            and self.revid == other.revid
+            and self.kinds == other.kinds
+            and self.texts == other.texts
+            and self.references == other.references
+        )
+
+    def __repr__(self) -> str:
+        return f"Article({self.title!r}, revid={self.revid}, blocks={len(self.kinds)}, refs={len(self.references)})"
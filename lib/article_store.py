@@ -0,0 +1,105 @@
+"""
+Local article store built from a Wikipedia dump (see ingest_dump.py).
+A single SQLite file maps canonical titles to serialized articles
+(lib/article_ir.py) and redirect titles to their targets, so content can be
+served without any outbound traffic.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable
+
+from lib.article_ir import Article
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    title TEXT PRIMARY KEY,
+    revid INTEGER,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS redirects (
+    title TEXT PRIMARY KEY,
+    target TEXT NOT NULL
+);
+"""
+
+
+class ArticleStore:
+    """SQLite-backed article store. Opened read-only unless writable=True."""
+
+    def __init__(self, path: Path, writable: bool = False):
+        self.path = Path(path)
+        if writable:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        else:
+            self._conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+        self._lock = threading.Lock()
+
+    def get(self, title: str) -> Article | None:
+        """Return the article for title (following one redirect), or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM articles WHERE title = ?", (title,)).fetchone()
+            if row is None:
+                redirect = self._conn.execute(
+                    "SELECT target FROM redirects WHERE title = ?", (title,)
+                ).fetchone()
+                if redirect is not None:
+                    row = self._conn.execute(
+                        "SELECT data FROM articles WHERE title = ?", (redirect[0],)
+                    ).fetchone()
+        return Article.from_bytes(row[0]) if row is not None else None
+
+    def put_many(self, rows: Iterable[tuple[str, int | None, bytes]]) -> None:
+        """Insert or replace (title, revid, serialized article) rows in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO articles (title, revid, data) VALUES (?, ?, ?)", rows
+            )
+
+    def put_redirects(self, rows: Iterable[tuple[str, str]]) -> None:
+        """Insert or replace (title, target) redirect rows in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO redirects (title, target) VALUES (?, ?)", rows
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_STORE: ArticleStore | None = None
+_STORE_LOADED = False
+_STORE_LOCK = threading.Lock()
+
+
+def get_article_store() -> ArticleStore | None:
+    """Return the store named by LOCAL_ARTICLE_STORE, or None if not configured."""
+    global _STORE, _STORE_LOADED
+    with _STORE_LOCK:
+        if not _STORE_LOADED:
+            _STORE_LOADED = True
+            path = (os.environ.get("LOCAL_ARTICLE_STORE") or "").strip()
+            if path:
+                try:
+                    _STORE = ArticleStore(Path(path))
+                except sqlite3.Error as e:
+                    print(f"Error opening local article store {path}: {e}")
+        return _STORE
+
+
+def is_offline() -> bool:
+    """True when WIKI_OFFLINE is set: never contact Wikipedia, serve only local data."""
+    return (os.environ.get("WIKI_OFFLINE") or "").strip() not in ("", "0")
@@ -0,0 +1,146 @@
+"""
+Compiled article catalogs shared across worker processes.
+Each category is stored on disk as a header, an offset table and packed UTF-8
+titles, mapped read-only with mmap so all uvicorn workers share one copy.
+Refreshed catalogs are published with an atomic rename.
+"""
+
+import mmap
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Configuration: Map categories to their Vital Article URLs
+SOURCES = {
+    "physics": "https://en.wikipedia.org/wiki/Wikipedia:Vital_articles/Level/4/Physical_sciences",
+    "technology": "https://en.wikipedia.org/wiki/Wikipedia:Vital_articles/Level/4/Technology",
+    "economics": "https://en.wikipedia.org/wiki/Wikipedia:Vital_articles/Level/4/Society_and_social_sciences"
+}
+
+MAGIC = b"VCAT"
+VERSION = 1
+
+# magic, format version, reserved, entry count
+_HEADER = struct.Struct("<4sHHI")
+_OFFSET = struct.Struct("<I")
+
+
+def is_article_href(href: str) -> bool:
+    """Standard Wikipedia filters: keep plain article links, drop namespaces and Main_Page."""
+    return href.startswith("/wiki/") and ":" not in href and "Main_Page" not in href
+
+
+def _catalog_dir() -> Path:
+    configured = (os.environ.get("CATALOG_DIR") or "").strip()
+    if configured:
+        return Path(configured)
+    return Path(__file__).resolve().parent.parent / "data" / "catalog"
+
+
+def _catalog_path(category: str) -> Path:
+    return _catalog_dir() / f"{category}.vcat"
+
+
+def compile_catalog(titles: list[str]) -> bytes:
+    """Pack titles into the catalog format: header, (count + 1) offsets, UTF-8 data."""
+    encoded = [t.encode("utf-8") for t in titles]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    return b"".join(
+        [
+            _HEADER.pack(MAGIC, VERSION, 0, len(encoded)),
+            struct.pack(f"<{len(offsets)}I", *offsets),
+            *encoded,
+        ]
+    )
+
+
+def publish_catalog(category: str, titles: list[str]) -> Path:
+    """
+    Write a compiled catalog for category and atomically swap it into place.
+    Workers that already mapped the previous file keep reading it until they
+    notice the new one on their next lookup.
+    """
+    path = _catalog_path(category)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{category}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(compile_catalog(titles))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+class MappedCatalog:
+    """Read-only view of a compiled catalog file."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self.published_at = st.st_mtime
+        magic, version, _, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unsupported catalog file: {path}")
+        self._count = count
+        self._offsets_at = _HEADER.size
+        self._data_at = _HEADER.size + (count + 1) * _OFFSET.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        start, end = struct.unpack_from("<2I", self._mm, self._offsets_at + index * _OFFSET.size)
+        return self._mm[self._data_at + start : self._data_at + end].decode("utf-8")
+
+    def random_title(self) -> str:
+        return self[random.randrange(self._count)]
+
+    def age_seconds(self) -> float:
+        return time.time() - self.published_at
+
+
+_MAPPED: dict[str, MappedCatalog] = {}
+_LOCK = threading.Lock()
+
+
+def get_catalog(category: str) -> MappedCatalog | None:
+    """
+    Return the mapped catalog for category, or None if none has been published.
+    Remaps when another process has swapped in a newer file.
+    """
+    path = _catalog_path(category)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+    with _LOCK:
+        current = _MAPPED.get(category)
+        if current is not None and current.identity == identity:
+            return current
+        try:
+            # The old mapping is left to the garbage collector so readers
+            # holding a reference are never cut off mid-lookup.
+            current = MappedCatalog(path)
+        except (OSError, ValueError) as e:
+            print(f"Error mapping catalog for '{category}': {e}")
+            return None
+        _MAPPED[category] = current
+        return current
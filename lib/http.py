@@ -0,0 +1,220 @@
+"""
+HTTP helpers shared by app.py and vital_article.py: a JSON response class
+backed by orjson (when installed), a request-body reader that enforces a
+size limit while the body streams in, and gzip/brotli response compression.
+Call install(app) once per FastAPI app.
+"""
+
+import json
+import os
+import zlib
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse as _StarletteJSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is the fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+# Largest JSON request body accepted, in bytes
+MAX_JSON_BODY_BYTES = int(os.environ.get("MAX_JSON_BODY_BYTES") or 1024 * 1024)
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES") or 1024)
+
+# Already compressed, or streamed to clients that read it as it arrives
+_UNCOMPRESSED_TYPES = (
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/octet-stream",
+    "text/event-stream",
+    "image/",
+    "audio/",
+    "video/",
+    "font/woff",
+)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JSONResponse(_StarletteJSONResponse):
+    """JSONResponse rendered with orjson when available."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RequestTooLarge(Exception):
+    """The request body is over the allowed size (answered with 413)."""
+
+
+class InvalidJSON(ValueError):
+    """The request body is not a JSON object (answered with 400)."""
+
+
+async def read_json(request: Request, max_bytes: int | None = None) -> dict:
+    """
+    Read and parse a JSON object body, refusing it as soon as it is known to
+    exceed max_bytes (from Content-Length, or while streaming when the length
+    is not declared). Raises RequestTooLarge or InvalidJSON.
+    """
+    limit = max_bytes or MAX_JSON_BODY_BYTES
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise RequestTooLarge(f"Request body is over {limit} bytes")
+    chunks: list[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise RequestTooLarge(f"Request body is over {limit} bytes")
+        chunks.append(chunk)
+    try:
+        body = loads(b"".join(chunks))
+    except ValueError as e:
+        raise InvalidJSON(f"Invalid JSON: {e}") from None
+    if not isinstance(body, dict):
+        raise InvalidJSON("Expected a JSON object")
+    return body
+
+
+class _Gzip:
+    encoding = "gzip"
+
+    def __init__(self):
+        self._z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _Brotli:
+    encoding = "br"
+
+    def __init__(self):
+        self._c = brotli.Compressor(quality=5)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if final else self._c.flush())
+
+
+def _pick_encoder(accept_encoding: str):
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return _Brotli
+    if "gzip" in accepted:
+        return _Gzip
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compress responses of at least minimum_size bytes with brotli or gzip,
+    whichever the client accepts (brotli only if the package is installed).
+    Streaming responses are compressed chunk by chunk. Partial content,
+    bodies that already have a Content-Encoding and compressed media types
+    pass through untouched. Strong ETags are weakened on compressed
+    responses, since the bytes no longer match the identity representation.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoder = None
+        if scope["type"] == "http":
+            encoder = _pick_encoder(Headers(scope=scope).get("accept-encoding", ""))
+        if encoder is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            kind = message["type"]
+            if kind == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+                passthrough = (
+                    message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or media_type.startswith(_UNCOMPRESSED_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or kind != "http.response.body":
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                if len(body) < self.minimum_size and not more_body:
+                    await send(start)
+                    start = None
+                    passthrough = True
+                    await send(message)
+                    return
+                compressor = encoder()
+                body = compressor.compress(body, final=not more_body)
+                headers["Content-Encoding"] = compressor.encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = "W/" + etag
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                start = None
+            else:
+                body = compressor.compress(body, final=not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def install(app) -> None:
+    """Add response compression and the 413/400 handlers for read_json to a FastAPI app."""
+
+    async def too_large(request: Request, exc: RequestTooLarge):
+        return JSONResponse({"error": str(exc)}, status_code=413)
+
+    async def invalid_json(request: Request, exc: InvalidJSON):
+        return JSONResponse({"error": str(exc)}, status_code=400)
+
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESS_MIN_BYTES)
+    app.add_exception_handler(RequestTooLarge, too_large)
+    app.add_exception_handler(InvalidJSON, invalid_json)
@@ -0,0 +1,158 @@
+"""
+Titles, short descriptions and thumbnails for saved links, so the client can
+show a whole link collection from one response instead of one Wikipedia call
+per link. Lookups go to the MediaWiki API in batches (fetch_page_metadata)
+and results, including "page does not exist", are kept for
+LINK_METADATA_TTL_SECONDS in the storage backend, shared by every instance,
+with an in-process LRU in front of it.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from lib import metrics
+
+METADATA_LOOKUPS = metrics.counter(
+    "link_metadata_lookups_total", "Link metadata lookups by outcome.", ("result",)
+)
+
+
+class MetadataCache:
+    """
+    Page metadata keyed by canonical title, with a TTL: an entry-bounded LRU
+    in front of blobs in the storage backend (if shared), so an instance
+    that starts cold reads what other instances already looked up.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, shared: bool = False):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, titles: list[str]) -> dict[str, dict]:
+        """Unexpired entries for titles; expired ones are dropped."""
+        now = time.time()
+        found = {}
+        with self._lock:
+            for title in titles:
+                entry = self._entries.get(title)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[title]
+                    continue
+                self._entries.move_to_end(title)
+                found[title] = entry[1]
+        missing = [t for t in titles if t not in found]
+        if self.shared and missing:
+            shared = self._get_shared(missing, now)
+            self._remember(shared)
+            found.update({t: meta for t, (_, meta) in shared.items()})
+        return found
+
+    def put_many(self, items: dict[str, dict]) -> None:
+        expires = time.time() + self.ttl
+        self._remember({title: (expires, meta) for title, meta in items.items()})
+        if self.shared and items:
+            self._put_shared(items, expires)
+
+    def _remember(self, entries: dict[str, tuple[float, dict]]) -> None:
+        with self._lock:
+            for title, entry in entries.items():
+                self._entries[title] = entry
+                self._entries.move_to_end(title)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_shared(self, titles: list[str], now: float) -> dict[str, tuple[float, dict]]:
+        from lib.storage import get_storage
+
+        try:
+            blobs = get_storage().get_blobs([f"linkmeta:{t}" for t in titles])
+        except Exception as e:
+            print(f"Error reading shared link metadata: {e}")
+            return {}
+        found = {}
+        for title in titles:
+            try:
+                # Stored with its expiry, so the LRU copy expires with the shared one
+                entry = json.loads(blobs[f"linkmeta:{title}"])
+                expires, meta = float(entry["expires"]), entry["meta"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            if expires > now and isinstance(meta, dict):
+                found[title] = (expires, meta)
+        return found
+
+    def _put_shared(self, items: dict[str, dict], expires: float) -> None:
+        from lib.storage import get_storage
+
+        blobs = {f"linkmeta:{t}": json.dumps({"expires": expires, "meta": meta}) for t, meta in items.items()}
+        try:
+            get_storage().set_blobs(blobs, math.ceil(self.ttl))
+        except Exception as e:
+            print(f"Error sharing link metadata: {e}")
+
+
+# Titles are looked up on English Wikipedia, so only its links can be enriched
+ARTICLE_HOSTS = frozenset({"en.wikipedia.org", "en.m.wikipedia.org"})
+
+
+def _is_article_url(url: str) -> bool:
+    parsed = urlparse(url)
+    return (
+        parsed.scheme in ("http", "https")
+        and parsed.hostname in ARTICLE_HOSTS
+        and parsed.path.startswith("/wiki/")
+    )
+
+
+def enrich_urls(urls: list[str]) -> dict[str, dict]:
+    """
+    Metadata for each Wikipedia article URL in urls ({url: metadata}, see
+    fetch_page_metadata); other URLs are skipped. Uncached titles are looked
+    up in batches; offline, or when a lookup fails, they are left out.
+    """
+    from lib.article_store import is_offline
+    from wiki_content import canonical_title, fetch_page_metadata
+
+    titles = {
+        url: canonical_title(url)
+        for url in dict.fromkeys(urls)
+        if isinstance(url, str) and _is_article_url(url)
+    }
+    cache = get_metadata_cache()
+    known = cache.get_many(list(set(titles.values())))
+    missing = sorted(set(titles.values()) - known.keys())
+    METADATA_LOOKUPS.inc("hit", amount=len(known))
+    if missing and not is_offline():
+        fetched = fetch_page_metadata(missing)
+        cache.put_many(fetched)
+        known.update(fetched)
+        METADATA_LOOKUPS.inc("fetched", amount=len(fetched))
+        METADATA_LOOKUPS.inc("failed", amount=len(missing) - len(fetched))
+    return {url: known[title] for url, title in titles.items() if title in known}
+
+
+_CACHE: MetadataCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """Return the process-wide link metadata cache, configured from the environment."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = MetadataCache(
+                ttl=float(os.environ.get("LINK_METADATA_TTL_SECONDS") or 86400),
+                max_entries=int(os.environ.get("LINK_METADATA_MAX_ENTRIES") or 20000),
+                shared=True,
+            )
+        return _CACHE
@@ -0,0 +1,197 @@
+"""
+Minimal in-process metrics registry with Prometheus text exposition.
+Counters, gauges and histograms are plain dicts of label values guarded by
+a lock, so recording costs a dict update and nothing is formatted until
+/metrics is scraped. Each worker process keeps its own registry.
+"""
+
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Iterable
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Seconds; covers cache hits (sub-millisecond) through slow PDF renders
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_text(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_label_text(self.label_names, k)} {v:g}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """A value read from a callback at scrape time."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self._read = read
+
+    def render(self) -> list[str]:
+        return [f"{self.name} {self._read():g}"]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += seconds
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for labels, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), row):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.label_names, labels, le)} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_label_text(self.label_names, labels)} {row[-1]:g}")
+            lines.append(f"{self.name}_count{_label_text(self.label_names, labels)} {cumulative:g}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: Histogram, labels: tuple[str, ...]):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._histogram.observe(time.perf_counter() - self._start, *self._labels)
+
+
+_REGISTRY: dict[str, _Metric] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _REGISTRY_LOCK:
+        return _REGISTRY.setdefault(metric.name, metric)
+
+
+def counter(name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+    return _register(Counter(name, help, labels))
+
+
+def histogram(name: str, help: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labels, buckets))
+
+
+def gauge(name: str, help: str, read: Callable[[], float]) -> Gauge:
+    """Register (or replace) a gauge read from read() at scrape time."""
+    metric = Gauge(name, help, read)
+    with _REGISTRY_LOCK:
+        _REGISTRY[name] = metric
+    return metric
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text format."""
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY.values())
+    lines: list[str] = []
+    for metric in metrics:
+        lines.extend(metric.header())
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_authorized(authorization: str | None) -> bool:
+    """True when METRICS_TOKEN is unset or the request carries it as a bearer token."""
+    token = (os.environ.get("METRICS_TOKEN") or "").strip()
+    return not token or authorization == f"Bearer {token}"
+
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds", "Time to handle a request, by route template.", ("method", "route", "status")
+)
+
+
+class MetricsMiddleware:
+    """Observe request latency per route template (not raw path, to bound label count)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = "500"
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or ("/" if route is not None else "unmatched")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], template, status)
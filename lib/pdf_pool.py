@@ -0,0 +1,360 @@
+"""
+PDF rendering off the request path.
+ReportLab layout is CPU-bound and holds the GIL, so PDFs are rendered in a
+process pool (PDF_WORKERS). Jobs beyond the workers wait in a bounded queue
+(PDF_MAX_QUEUE); when it is full new jobs are rejected so the caller can shed
+load, and each job has a timeout (PDF_TIMEOUT_SECONDS): a job still rendering
+when it expires has its workers stopped and replaced, so pathological articles
+cannot hold the pool.
+Workers write each PDF to a temporary file and hand back its path, so the
+document never travels through the result pipe or sits in server memory.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from lib import metrics
+from lib.article_ir import Article
+
+
+# Renderer names accepted by pdf_builder.RENDERERS
+PDF_RENDERERS = ("platypus", "fast")
+
+
+class RenderQueueFull(Exception):
+    """Raised when the render queue has no room for another job."""
+
+
+class RenderTimeout(Exception):
+    """Raised when a render job did not finish within the timeout."""
+
+
+def _render(blob: bytes, directory: str | None, renderer: str) -> tuple[str, float, float]:
+    """
+    Worker entry point: render a serialized article into a new temporary file
+    in directory. Returns (path, started_at, render seconds); the caller owns
+    the file.
+    """
+    from pdf_builder import RENDERERS
+
+    started_at = time.time()
+    article = Article.from_bytes(blob)
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".pdf.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            RENDERERS[renderer](f, article.title, article.body_blocks, article.references)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, started_at, time.time() - started_at
+
+
+def _terminate_workers(executor: ProcessPoolExecutor) -> None:
+    """Kill an executor's worker processes; its pending jobs fail with BrokenProcessPool."""
+    terminate = getattr(executor, "terminate_workers", None)  # Python 3.14+
+    if terminate is not None:
+        terminate()
+        return
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+
+
+def _unlink(path: str | Path) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+QUEUE_WAIT_SECONDS = metrics.histogram("pdf_queue_wait_seconds", "Time PDF jobs waited for a worker.")
+RENDER_SECONDS = metrics.histogram("pdf_render_seconds", "Time to render a PDF in a worker.")
+JOB_OUTCOMES = metrics.counter(
+    "pdf_jobs_failed_total", "PDF jobs that did not complete: failed, rejected or timed_out.", ("outcome",)
+)
+
+
+class RenderStats:
+    """Counters for queue wait and render time, updated from job callbacks."""
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.render_total = 0.0
+        self.render_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, queue_wait: float, render_seconds: float) -> None:
+        QUEUE_WAIT_SECONDS.observe(queue_wait)
+        RENDER_SECONDS.observe(render_seconds)
+        with self._lock:
+            self.completed += 1
+            self.queue_wait_total += queue_wait
+            self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+            self.render_total += render_seconds
+            self.render_max = max(self.render_max, render_seconds)
+
+    def count(self, field: str) -> None:
+        JOB_OUTCOMES.inc(field)
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timedOut": self.timed_out,
+                "queueWaitAvgMs": round(self.queue_wait_total / done * 1000, 1),
+                "queueWaitMaxMs": round(self.queue_wait_max * 1000, 1),
+                "renderAvgMs": round(self.render_total / done * 1000, 1),
+                "renderMaxMs": round(self.render_max * 1000, 1),
+            }
+
+
+class PdfRenderPool:
+    """
+    Renders articles to PDF on `workers` processes, with at most `max_queue`
+    jobs waiting behind them. With workers=0 PDFs are rendered in the calling
+    thread (for environments that cannot fork, such as serverless functions).
+    """
+
+    def __init__(self, workers: int, max_queue: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self.stats = RenderStats()
+        self._slots = threading.BoundedSemaphore(max(1, workers) + max_queue)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = self._new_executor() if workers > 0 else None
+        # Running jobs by the future handed to the caller: (job, executor)
+        self._jobs: dict[Future, tuple[Future, ProcessPoolExecutor | None]] = {}
+        # Executors whose workers were stopped because of a timed-out job
+        self._recycled: weakref.WeakSet = weakref.WeakSet()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: the server process runs threads, which fork does not copy safely
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _replace(self, old: ProcessPoolExecutor, reason: str) -> bool:
+        """Swap in a fresh executor for old; False if that already happened."""
+        with self._lock:
+            if self._executor is not old:
+                return False
+            print(f"PDF render pool {reason}; starting new workers")
+            self._executor = self._new_executor()
+        return True
+
+    def _replace_broken(self, broken: ProcessPoolExecutor) -> None:
+        """Swap in a fresh executor after a worker died (e.g. killed for memory)."""
+        self._replace(broken, "broke")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _recycle(self, stuck: ProcessPoolExecutor) -> None:
+        """
+        Stop the workers of stuck, which is still running a job that timed
+        out, so the job cannot keep holding a worker and its slot. Other jobs
+        on it are started again on the new executor.
+        """
+        if not self._replace(stuck, "has a job past its timeout"):
+            return
+        self._recycled.add(stuck)
+        _terminate_workers(stuck)
+        stuck.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def in_flight(self) -> int:
+        """Jobs currently rendering or waiting for a worker."""
+        return self._in_flight
+
+    def close(self) -> None:
+        """Cancel queued jobs and stop the workers."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _start(
+        self, blob: bytes, out_dir: str | None, renderer: str
+    ) -> tuple[Future, ProcessPoolExecutor | None]:
+        """Start a render job; returns it with the executor it runs on (None: rendered inline)."""
+        executor = self._executor
+        if executor is None:
+            job: Future = Future()
+            try:
+                job.set_result(_render(blob, out_dir, renderer))
+            except Exception as e:
+                job.set_exception(e)
+            return job, None
+        try:
+            return executor.submit(_render, blob, out_dir, renderer), executor
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+        except RuntimeError:
+            # Shut down by _recycle between reading self._executor and submitting
+            if executor not in self._recycled:
+                raise
+        executor = self._executor
+        return executor.submit(_render, blob, out_dir, renderer), executor
+
+    def submit(
+        self, article: Article, directory: Path | None = None, renderer: str = "platypus", wait: bool = False
+    ) -> Future:
+        """
+        Queue article for rendering into a temporary file in directory (the
+        system temp dir by default). The future resolves to the file's Path,
+        which the caller must move or delete. Raises RenderQueueFull, unless
+        wait is set: then it blocks until the queue has room (for background
+        work such as batch exports, which should not be shed like requests).
+        """
+        if not self._slots.acquire(blocking=wait):
+            self.stats.count("rejected")
+            raise RenderQueueFull(f"{self._in_flight} PDF jobs already queued")
+        with self._lock:
+            self._in_flight += 1
+        submitted_at = time.time()
+        blob = article.to_bytes(compress=False)
+        out_dir = str(directory) if directory is not None else None
+        try:
+            job, executor = self._start(blob, out_dir, renderer)
+        except BaseException:
+            self._release()
+            raise
+        result: Future = Future()
+        self._jobs[result] = (job, executor)
+
+        def done(job: Future) -> None:
+            nonlocal executor
+            error = None if job.cancelled() else job.exception()
+            if (
+                isinstance(error, BrokenProcessPool)
+                and executor in self._recycled
+                and not result.cancelled()
+            ):
+                # Stopped along with a timed-out job on the same workers: run it again
+                try:
+                    retry, executor = self._start(blob, out_dir, renderer)
+                except Exception as e:
+                    error = e
+                else:
+                    self._jobs[result] = (retry, executor)
+                    retry.add_done_callback(done)
+                    return
+            self._jobs.pop(result, None)
+            self._release()
+            if job.cancelled():
+                result.cancel()
+                return
+            if error is not None:
+                if not result.cancelled():
+                    self.stats.count("failed")
+                if isinstance(error, BrokenProcessPool) and executor is not None:
+                    self._replace_broken(executor)
+                if result.set_running_or_notify_cancel():
+                    result.set_exception(error)
+                return
+            path, started_at, render_seconds = job.result()
+            self.stats.record(max(0.0, started_at - submitted_at), render_seconds)
+            if result.set_running_or_notify_cancel():
+                result.set_result(Path(path))
+            else:
+                # Nobody is waiting for it any more
+                _unlink(path)
+
+        # A job keeps its slot until its worker is done with it; jobs still
+        # rendering past the timeout have their workers stopped (see _timed_out).
+        def cancelled(result: Future) -> None:
+            if result.cancelled():
+                self._jobs.get(result, (job,))[0].cancel()
+
+        job.add_done_callback(done)
+        result.add_done_callback(cancelled)
+        return result
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _timed_out(self, future: Future) -> RenderTimeout:
+        """Give up on a job; if it is still rendering, stop its worker."""
+        job, executor = self._jobs.get(future, (None, None))
+        future.cancel()
+        self.stats.count("timed_out")
+        if job is not None and executor is not None and not job.done():
+            self._recycle(executor)
+        return RenderTimeout(f"PDF render exceeded {self.timeout:g}s")
+
+    def render(
+        self, article: Article, directory: Path | None = None, renderer: str = "platypus", wait: bool = False
+    ) -> Path:
+        """
+        Render and wait for the PDF file. Raises RenderQueueFull (unless wait
+        is set, see submit) or RenderTimeout; the timeout starts once queued.
+        """
+        future = self.submit(article, directory, renderer, wait)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise self._timed_out(future) from None
+
+    async def render_async(
+        self, article: Article, directory: Path | None = None, renderer: str = "platypus"
+    ) -> Path:
+        """Like render() but awaits the job instead of blocking the event loop."""
+        if self._executor is None:
+            return await asyncio.to_thread(self.render, article, directory, renderer)
+        future = self.submit(article, directory, renderer)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out(future) from None
+
+
+_POOL: PdfRenderPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pdf_pool() -> PdfRenderPool:
+    """Return the process-wide render pool, configured from the environment."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            workers = os.environ.get("PDF_WORKERS")
+            _POOL = PdfRenderPool(
+                workers=int(workers) if workers else min(2, os.cpu_count() or 1),
+                max_queue=int(os.environ.get("PDF_MAX_QUEUE") or 8),
+                timeout=float(os.environ.get("PDF_TIMEOUT_SECONDS") or 30),
+            )
+            pool = _POOL
+            metrics.gauge(
+                "pdf_queue_depth", "PDF jobs rendering or waiting for a worker.", lambda: pool.in_flight
+            )
+        return _POOL
+
+
+def shutdown_pdf_pool() -> None:
+    """
+    Stop the render workers, if any were started. Call on server shutdown:
+    uvicorn exits by re-raising SIGTERM, which skips the executor's atexit
+    cleanup and would leave spawned workers running.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
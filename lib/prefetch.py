@@ -0,0 +1,94 @@
+"""
+Predictive prefetch for random article picks.
+For each (session, category) a few upcoming picks are chosen ahead of time and
+fetched in the background, so the article cache already holds them when the
+next /random request asks for one.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from lib.ratelimit import background
+
+
+class _Picks:
+    """Pre-selected picks for one (session, category): fetched ones plus a count in flight."""
+
+    __slots__ = ("ready", "pending")
+
+    def __init__(self):
+        self.ready: deque[str] = deque()
+        self.pending = 0
+
+
+class Prefetcher:
+    """
+    Keeps up to `depth` pre-selected picks per (session, category) and fetches
+    them on a small thread pool. At most `max_inflight` fetches run or wait at
+    once; when the budget is spent, refills are skipped rather than queued.
+    """
+
+    def __init__(
+        self,
+        pick: Callable[[str], str | None],
+        fetch: Callable[[str], object],
+        depth: int = 2,
+        max_inflight: int = 2,
+        max_sessions: int = 1000,
+    ):
+        self._pick = pick
+        self._fetch = fetch
+        self.depth = depth
+        self.max_sessions = max_sessions
+        self._budget = threading.BoundedSemaphore(max_inflight)
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="prefetch")
+        self._queues: OrderedDict[tuple[str, str], _Picks] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def next_pick(self, session_key: str, category: str) -> str | None:
+        """Return the next pick for this session and category, then top up its queue."""
+        key = (session_key, category)
+        with self._lock:
+            picks = self._queues.get(key)
+            url = picks.ready.popleft() if picks and picks.ready else None
+        if url is None:
+            url = self._pick(category)
+        if url is not None:
+            self._refill(key)
+        return url
+
+    def _refill(self, key: tuple[str, str]) -> None:
+        with self._lock:
+            picks = self._queues.get(key)
+            if picks is None:
+                picks = self._queues[key] = _Picks()
+            self._queues.move_to_end(key)
+            while len(self._queues) > self.max_sessions:
+                self._queues.popitem(last=False)
+            missing = self.depth - len(picks.ready) - picks.pending
+            submitted = 0
+            while submitted < missing and self._budget.acquire(blocking=False):
+                picks.pending += 1
+                submitted += 1
+        for _ in range(submitted):
+            self._executor.submit(self._prefetch_one, key, picks)
+
+    def _prefetch_one(self, key: tuple[str, str], picks: _Picks) -> None:
+        url = None
+        try:
+            # Wikipedia requests made here yield to user-facing ones
+            with background():
+                url = self._pick(key[1])
+                if url is not None:
+                    self._fetch(url)
+        except Exception as e:
+            print(f"Prefetch failed for {key[1]}: {e}")
+            url = None
+        finally:
+            with self._lock:
+                picks.pending -= 1
+                if url is not None:
+                    picks.ready.append(url)
+            self._budget.release()
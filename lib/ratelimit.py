@@ -0,0 +1,171 @@
+"""
+Outbound rate limit for requests to Wikipedia, shared by every worker and
+instance through the storage backend, so catalog scrapes and article fetches
+under load stay below the rate at which Wikipedia starts answering 429.
+
+Calls are user-facing unless made inside `with background():` (prefetch and
+revalidation). Background calls may only use part of each second's budget,
+so user requests still get through when background work is saturating it,
+and they give up sooner. A 429 pauses every caller for its Retry-After.
+"""
+
+import math
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from lib import metrics, timing
+
+RATELIMIT_WAIT_SECONDS = metrics.histogram(
+    "outbound_ratelimit_wait_seconds", "Time outbound requests waited for a rate-limit slot.", ("priority",)
+)
+RATELIMIT_REJECTED = metrics.counter(
+    "outbound_ratelimit_rejected_total", "Outbound requests that gave up waiting for a slot.", ("priority",)
+)
+RATELIMIT_THROTTLED = metrics.counter("outbound_throttled_total", "429 responses received from upstream.")
+
+
+class RateLimited(Exception):
+    """No outbound request slot came free within the caller's wait limit."""
+
+
+_BACKGROUND: ContextVar[bool] = ContextVar("outbound_background", default=False)
+
+
+class background:
+    """Context manager marking outbound requests made in its block as background work."""
+
+    __slots__ = ("_token",)
+
+    def __enter__(self):
+        self._token = _BACKGROUND.set(True)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _BACKGROUND.reset(self._token)
+
+
+class OutboundLimiter:
+    """
+    Token bucket of `rate` requests per second across all instances, kept as
+    a per-second counter in storage (incr_counter): a request takes a token
+    by incrementing the current second's counter, and when that puts the
+    count over its limit it gives the token back and waits for the next
+    second, so only granted requests count. Background requests are limited
+    to `background_share` of each second's tokens.
+    """
+
+    def __init__(
+        self, name: str, rate: int, background_share: float, max_wait: float, background_max_wait: float
+    ):
+        self.name = name
+        self.rate = rate
+        self.background_rate = max(1, int(rate * background_share))
+        self.max_wait = max_wait
+        self.background_max_wait = background_max_wait
+        self._cooldown_until = 0.0
+        self._cooldown_checked = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Wait for a request slot; raises RateLimited after the caller's maximum wait."""
+        is_background = _BACKGROUND.get()
+        priority = "background" if is_background else "user"
+        limit = self.background_rate if is_background else self.rate
+        start = time.time()
+        deadline = start + (self.background_max_wait if is_background else self.max_wait)
+        while True:
+            now = time.time()
+            wait_until = self._cooldown(now)
+            if wait_until <= now:
+                window = int(now)
+                if self._take(window, limit):
+                    break
+                wait_until = window + 1
+            if wait_until > deadline:
+                RATELIMIT_REJECTED.inc(priority)
+                raise RateLimited(f"No {self.name} request slot within {deadline - start:.0f}s")
+            # Jitter so waiting workers do not all retry at the same instant
+            time.sleep(wait_until - now + random.uniform(0, 0.05))
+        waited = time.time() - start
+        if waited > 0.001:
+            RATELIMIT_WAIT_SECONDS.observe(waited, priority)
+            timing.record("ratelimit", waited)
+
+    def throttled(self, retry_after: str | None) -> None:
+        """Record a 429 from upstream: pause all callers for Retry-After seconds (default 5)."""
+        RATELIMIT_THROTTLED.inc()
+        seconds = float(retry_after) if retry_after and retry_after.isdigit() else 5.0
+        until = time.time() + seconds
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, until)
+        from lib.storage import get_storage
+
+        try:
+            get_storage().set_blob(f"ratelimit:{self.name}:cooldown", str(until), math.ceil(seconds) + 1)
+        except Exception as e:
+            print(f"Error sharing {self.name} cooldown: {e}")
+
+    def _cooldown(self, now: float) -> float:
+        """When requests may resume after a 429 seen by any instance (checked once a second)."""
+        with self._lock:
+            if now - self._cooldown_checked < 1:
+                return self._cooldown_until
+            self._cooldown_checked = now
+        from lib.storage import get_storage
+
+        try:
+            shared = get_storage().get_blob(f"ratelimit:{self.name}:cooldown")
+        except Exception:
+            shared = None
+        with self._lock:
+            if shared:
+                self._cooldown_until = max(self._cooldown_until, float(shared))
+            return self._cooldown_until
+
+    def _take(self, window: int, limit: int) -> bool:
+        """
+        Take a token from one-second window if fewer than limit are taken;
+        a refused attempt is undone so it does not use up the window. Grants
+        when storage fails (fail open).
+        """
+        from lib.storage import get_storage
+
+        key = f"ratelimit:{self.name}:{window}"
+        try:
+            storage = get_storage()
+            if storage.incr_counter(key, 2) <= limit:
+                return True
+            storage.incr_counter(key, 2, amount=-1)
+            return False
+        except Exception as e:
+            print(f"Error counting {self.name} requests, not rate limiting: {e}")
+            return True
+
+
+_LIMITER: OutboundLimiter | None = None
+_LOADED = False
+_LOCK = threading.Lock()
+
+
+def get_wikipedia_limiter() -> OutboundLimiter | None:
+    """
+    Return the process-wide limiter for Wikipedia requests, configured from
+    the environment, or None when WIKIPEDIA_RATE_LIMIT=0.
+    """
+    global _LIMITER, _LOADED
+    with _LOCK:
+        if not _LOADED:
+            _LOADED = True
+            rate = int(os.environ.get("WIKIPEDIA_RATE_LIMIT") or 10)
+            if rate > 0:
+                _LIMITER = OutboundLimiter(
+                    "wikipedia",
+                    rate,
+                    background_share=float(os.environ.get("WIKIPEDIA_BACKGROUND_SHARE") or 0.5),
+                    max_wait=float(os.environ.get("WIKIPEDIA_MAX_WAIT_SECONDS") or 5),
+                    background_max_wait=float(os.environ.get("WIKIPEDIA_BACKGROUND_MAX_WAIT_SECONDS") or 60),
+                )
+        return _LIMITER
@@ -0,0 +1,132 @@
+"""
+Read-log aggregates (totals, reads per month and category, reading streaks)
+kept up to date as the log is saved, so /api/read-log/stats answers without
+loading the log. Saves replace the whole log, so each save is diffed against
+the previous log and only the added and removed entries are applied.
+Months and days are taken from the entries' ISO dates, i.e. in UTC.
+"""
+
+from collections import Counter
+from datetime import date, timedelta
+
+STATS_VERSION = 1
+
+
+def empty_stats() -> dict:
+    return {
+        "version": STATS_VERSION,
+        "total": 0,
+        "byMonth": {},
+        "byCategory": {},
+        "byDay": {},
+        "firstRead": None,
+        "lastRead": None,
+        "longestStreak": 0,
+        "streakEnd": None,
+        "streakLength": 0,
+        # Version of the read log these are for (lib/sync.py), set by the caller
+        "logVersion": None,
+    }
+
+
+def _entry_key(entry) -> tuple[str, str, str] | None:
+    """What the aggregates depend on: (day, month, category), or None for malformed entries."""
+    if not isinstance(entry, dict):
+        return None
+    when = entry.get("date")
+    if not isinstance(when, str):
+        return None
+    try:
+        date.fromisoformat(when[:10])
+    except ValueError:
+        return None
+    category = entry.get("category")
+    return when[:10], when[:7], category if isinstance(category, str) and category else "Other"
+
+
+def _bump(counts: dict, key: str, amount: int) -> None:
+    value = counts.get(key, 0) + amount
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+def _apply(stats: dict, keys: Counter, sign: int) -> None:
+    for (day, month, category), n in keys.items():
+        stats["total"] += sign * n
+        _bump(stats["byDay"], day, sign * n)
+        _bump(stats["byMonth"], month, sign * n)
+        _bump(stats["byCategory"], category, sign * n)
+
+
+def _update_streaks(stats: dict) -> None:
+    """Recompute the day-based fields from byDay (one entry per day read, not per read)."""
+    days = sorted(stats["byDay"])
+    stats["firstRead"] = days[0] if days else None
+    stats["lastRead"] = days[-1] if days else None
+    longest = run = 0
+    previous = None
+    for day in days:
+        try:
+            current = date.fromisoformat(day)
+        except ValueError:
+            continue
+        run = run + 1 if previous is not None and current - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = current
+    stats["longestStreak"] = longest
+    stats["streakEnd"] = previous.isoformat() if previous else None
+    stats["streakLength"] = run
+
+
+def build_stats(log: list) -> dict:
+    """Aggregates for a whole log, from scratch."""
+    stats = empty_stats()
+    _apply(stats, Counter(k for k in map(_entry_key, log) if k is not None), 1)
+    _update_streaks(stats)
+    return stats
+
+
+def update_stats(stats: dict | None, old_log: list, new_log: list) -> dict:
+    """
+    Aggregates for new_log, given stats for old_log. Falls back to a full
+    rebuild when stats are missing, from an older version or out of step with
+    old_log (e.g. after two concurrent saves).
+    """
+    old = Counter(k for k in map(_entry_key, old_log) if k is not None)
+    if not stats or stats.get("version") != STATS_VERSION or stats.get("total") != sum(old.values()):
+        return build_stats(new_log)
+    new = Counter(k for k in map(_entry_key, new_log) if k is not None)
+    removed, added = old - new, new - old
+    if not removed and not added:
+        return stats
+    days_before = set(stats["byDay"])
+    _apply(stats, removed, -1)
+    _apply(stats, added, 1)
+    if stats["byDay"].keys() != days_before:
+        _update_streaks(stats)
+    return stats
+
+
+def stats_view(stats: dict, today: date) -> dict:
+    """
+    The API representation: the streak only counts as current if it reaches
+    today or yesterday (today is a UTC date, like the days counted).
+    """
+    current = 0
+    if stats["streakEnd"]:
+        end = date.fromisoformat(stats["streakEnd"])
+        if today - end <= timedelta(days=1):
+            current = stats["streakLength"]
+    return {
+        "total": stats["total"],
+        "byMonth": dict(sorted(stats["byMonth"].items(), reverse=True)),
+        "byCategory": dict(sorted(stats["byCategory"].items(), key=lambda kv: (-kv[1], kv[0]))),
+        "daysRead": len(stats["byDay"]),
+        "firstRead": stats["firstRead"],
+        "lastRead": stats["lastRead"],
+        "currentStreak": current,
+        "longestStreak": stats["longestStreak"],
+        "timezone": "UTC",
+    }
@@ -0,0 +1,217 @@
+"""
+Content-addressed cache of rendered downloads (PDF and plain text).
+Files are keyed by a hash of the serialized article plus the renderer version
+and format, so an unchanged article is never rendered twice and the key
+doubles as a strong ETag. The disk tier (RENDER_CACHE_DIR) is bounded by
+RENDER_CACHE_MAX_BYTES and evicts least recently served files; with
+RENDER_CACHE_SHARED set, renders are also shared between instances through
+the storage backend's blob methods.
+"""
+
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+from lib.article_ir import Article
+
+# Bump when pdf_builder or the plain-text renderer changes their output,
+# so previously cached renders stop matching.
+RENDERER_VERSIONS = {"pdf": "2", "pdf-fast": "3", "txt": "1"}
+
+# Files used this recently are never evicted, so a path just returned by get()
+# or put() is still there when the response opens it
+EVICT_GRACE_SECONDS = 60
+# Temp files older than this are left over from a crashed render or write
+STALE_TEMP_SECONDS = 3600
+
+
+def render_key(article: Article, format: str) -> str:
+    """Hex digest identifying the rendering of article in format ("pdf", "pdf-fast" or "txt")."""
+    h = hashlib.sha256()
+    h.update(f"{format}:{RENDERER_VERSIONS[format]}\0".encode("ascii"))
+    h.update(article.to_bytes(compress=False))
+    return h.hexdigest()
+
+
+class RenderCache:
+    """Size-bounded directory of rendered files named by their render key."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+        self._bytes = sum(p.stat().st_size for p in directory.glob("*/*.bin"))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.bin"
+
+    def get(self, key: str) -> Path | None:
+        """Return the cached file for key, marking it recently used, or None."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, chunks: Iterable[bytes]) -> Path:
+        """Write chunks to the cache under key and return the file path."""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+        self._added(size, path)
+        return path
+
+    def adopt(self, key: str, file_path: Path) -> Path:
+        """
+        Move an already rendered file into the cache under key and return its
+        new path. file_path should be on the same filesystem (see temp_dir).
+        """
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        os.replace(file_path, path)
+        self._added(path.stat().st_size, path)
+        return path
+
+    @property
+    def temp_dir(self) -> Path:
+        """Where to create files that will be adopted, so the move is a rename."""
+        return self.directory
+
+    def _added(self, size: int, path: Path) -> None:
+        with self._lock:
+            self._bytes += size
+            over = self._bytes > self.max_bytes
+        if over:
+            self._evict(keep=path)
+
+    def _evict(self, keep: Path) -> None:
+        """
+        Delete least recently used files until the cache fits in max_bytes,
+        sparing files used in the last EVICT_GRACE_SECONDS, and remove temp
+        files left behind by crashed renders.
+        """
+        now = time.time()
+        for p in [*self.directory.glob("*.tmp"), *self.directory.glob("*/*.tmp")]:
+            try:
+                if p.stat().st_mtime < now - STALE_TEMP_SECONDS:
+                    p.unlink()
+            except OSError:
+                continue
+        files = []
+        for p in self.directory.glob("*/*.bin"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for mtime, size, p in files:
+            if total <= self.max_bytes or mtime > now - EVICT_GRACE_SECONDS:
+                break
+            if p == keep:
+                continue
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._bytes = total
+
+
+class SharedRenders:
+    """Renders shared between instances as base64 blobs in the storage backend."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: int):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> bytes | None:
+        from lib.storage import get_storage
+
+        try:
+            value = get_storage().get_blob(f"render:{key}")
+            return base64.b64decode(value) if value else None
+        except Exception as e:
+            print(f"Error reading shared render {key}: {e}")
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        from lib.storage import get_storage
+
+        try:
+            get_storage().set_blob(
+                f"render:{key}", base64.b64encode(data).decode("ascii"), self.ttl_seconds
+            )
+        except Exception as e:
+            print(f"Error sharing render {key}: {e}")
+
+    def put_file(self, key: str, path: Path) -> None:
+        """Share a rendered file, unless it is over the size limit."""
+        try:
+            if path.stat().st_size > self.max_bytes:
+                return
+            data = path.read_bytes()
+        except OSError as e:
+            print(f"Error reading render {path}: {e}")
+            return
+        self.put(key, data)
+
+
+_CACHE: RenderCache | None = None
+_SHARED: SharedRenders | None = None
+_LOADED = False
+_LOCK = threading.Lock()
+
+
+def get_render_cache() -> tuple[RenderCache | None, SharedRenders | None]:
+    """
+    Return the process-wide (disk cache, shared tier), configured from the
+    environment. Either is None when disabled (RENDER_CACHE_MAX_BYTES=0,
+    RENDER_CACHE_SHARED unset).
+    """
+    global _CACHE, _SHARED, _LOADED
+    with _LOCK:
+        if not _LOADED:
+            _LOADED = True
+            max_bytes = int(os.environ.get("RENDER_CACHE_MAX_BYTES") or 512 * 1024 * 1024)
+            configured = (os.environ.get("RENDER_CACHE_DIR") or "").strip()
+            directory = (
+                Path(configured)
+                if configured
+                else Path(__file__).resolve().parent.parent / "data" / "render_cache"
+            )
+            if max_bytes > 0:
+                try:
+                    _CACHE = RenderCache(directory, max_bytes)
+                except OSError as e:
+                    print(f"Error opening render cache {directory}: {e}")
+            if (os.environ.get("RENDER_CACHE_SHARED") or "").strip() not in ("", "0"):
+                _SHARED = SharedRenders(
+                    max_bytes=int(os.environ.get("RENDER_CACHE_SHARED_MAX_BYTES") or 2 * 1024 * 1024),
+                    ttl_seconds=int(os.environ.get("RENDER_CACHE_SHARED_TTL_SECONDS") or 7 * 24 * 3600),
+                )
+        return _CACHE, _SHARED
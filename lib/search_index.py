@@ -0,0 +1,157 @@
+"""
+Per-user inverted index over My Links, link lists and the read log, kept in
+the storage backend with plain hashes (no RediSearch), so /api/search works
+on Upstash, Redis and the JSON store alike.
+
+Each link, log entry and list is a document. Its title, URL and notes are
+split into tokens, plus the leading 3+ characters of longer words, so
+partial words match as the user types. Saves replace a whole collection, so
+each save is diffed against the previous one and only documents that
+changed are re-indexed. An index is built in full on a user's first search,
+and rebuilt on a search that finds it is not for the collections' current
+versions (lib/sync.py), e.g. after a save whose re-indexing failed.
+"""
+
+import math
+import re
+from urllib.parse import unquote, urlparse
+
+INDEX_VERSION = 1
+KINDS = ("link", "list", "log")
+# The synced collection (lib/sync.py) each kind of document comes from
+COLLECTIONS = {"link": "user-links", "list": "link-lists", "log": "read-log"}
+
+# Document recording the index format and the collection versions it holds
+META_ID = "@meta"
+
+# Field weights: a match in the title counts most
+_TITLE, _URL, _NOTES = 3.0, 2.0, 1.0
+_PREFIX_FACTOR = 0.5
+_MIN_PREFIX = 3
+_NOTES_PREVIEW = 200
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if len(w) > 1]
+
+
+def _url_words(url: str) -> str:
+    """The readable part of an article URL: its title, with underscores as spaces."""
+    path = unquote(urlparse(url).path)
+    return path.rsplit("/", 1)[-1].replace("_", " ")
+
+
+def _weigh(fields: list[tuple[str, float]]) -> dict[str, float]:
+    weights: dict[str, float] = {}
+    for text, weight in fields:
+        for word in tokenize(text):
+            weights[word] = weights.get(word, 0.0) + weight
+            for end in range(_MIN_PREFIX, len(word)):
+                prefix = word[:end]
+                weights[prefix] = max(weights.get(prefix, 0.0), weight * _PREFIX_FACTOR)
+    return {token: round(w, 2) for token, w in weights.items()}
+
+
+def documents(kind: str, items: list) -> dict[str, tuple[dict, dict[str, float]]]:
+    """{doc id: (stored document, token weights)} for one collection."""
+    docs: dict[str, tuple[dict, dict[str, float]]] = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        if kind == "list":
+            list_id, name = item.get("id"), item.get("name") or ""
+            urls = [u for u in item.get("urls") or [] if isinstance(u, str)]
+            if not list_id:
+                continue
+            doc = {"kind": kind, "id": list_id, "title": name, "count": len(urls)}
+            fields = [(name, _TITLE)] + [(_url_words(u), _NOTES) for u in urls]
+            docs[f"list:{list_id}"] = (doc, _weigh(fields))
+            continue
+        url = item.get("url")
+        if not isinstance(url, str) or not url:
+            continue
+        title = item.get("title") if isinstance(item.get("title"), str) else ""
+        notes = item.get("notes") if isinstance(item.get("notes"), str) else ""
+        doc = {"kind": kind, "url": url, "title": title or _url_words(url), "notes": notes[:_NOTES_PREVIEW]}
+        if isinstance(item.get("date"), str):
+            doc["date"] = item["date"]
+        if kind == "log" and isinstance(item.get("category"), str):
+            doc["category"] = item["category"]
+        docs[f"{kind}:{url}"] = (doc, _weigh([(title, _TITLE), (_url_words(url), _URL), (notes, _NOTES)]))
+    return docs
+
+
+def update_index(
+    storage, username: str, kind: str, old_items: list, new_items: list, version: int | None
+) -> None:
+    """
+    Re-index the documents that differ between two versions of a collection
+    and record version as the one indexed (None if it is unknown).
+    """
+    meta = storage.get_search_docs(username, [META_ID]).get(META_ID)
+    if not meta:
+        return  # not built yet; the first search builds it from the saved collections
+    old, new = documents(kind, old_items), documents(kind, new_items)
+    removed = {doc_id: list(tokens) for doc_id, (_, tokens) in old.items() if new.get(doc_id) != old[doc_id]}
+    added = {doc_id: entry for doc_id, entry in new.items() if old.get(doc_id) != entry}
+    # Stamped in the same update, so the last writer's version matches its documents
+    versions = {**(meta.get("collections") or {}), COLLECTIONS[kind]: version}
+    added[META_ID] = ({**meta, "collections": versions}, {})
+    storage.update_search_index(username, removed, added)
+
+
+def is_current(meta: dict | None, versions: dict[str, int]) -> bool:
+    """True if an index's meta document says it holds these collection versions."""
+    if not meta or meta.get("version") != INDEX_VERSION:
+        return False
+    indexed = meta.get("collections") or {}
+    return all(indexed.get(name) == versions.get(name) for name in COLLECTIONS.values())
+
+
+def build_index(storage, username: str, collections: dict[str, list], versions: dict[str, int]) -> None:
+    """
+    Replace the user's index with every document of collections ({kind:
+    items}), recorded as their versions ({collection: version}, read before
+    the collections so a save racing the build leaves the index out of date
+    rather than wrongly current).
+    """
+    storage.clear_search_index(username)
+    added: dict[str, tuple[dict, dict[str, float]]] = {}
+    for kind, items in collections.items():
+        added.update(documents(kind, items))
+    indexed = {name: versions.get(name) for name in COLLECTIONS.values()}
+    added[META_ID] = ({"version": INDEX_VERSION, "collections": indexed}, {})
+    storage.update_search_index(username, {}, added)
+
+
+def search(storage, username: str, query: str, kind: str | None, offset: int, limit: int) -> dict:
+    """
+    Documents matching every word of query, best first. A document scores
+    the sum of its token weights, each scaled down by how many documents
+    share the token, so rare words count for more.
+    """
+    words = list(dict.fromkeys(tokenize(query)))
+    if not words:
+        return {"total": 0, "results": []}
+    postings = storage.get_search_postings(username, words)
+    scores: dict[str, float] | None = None
+    for word in words:
+        matches = postings.get(word) or {}
+        if kind:
+            matches = {d: w for d, w in matches.items() if d.startswith(f"{kind}:")}
+        rarity = 1 / math.log2(1 + len(matches)) if matches else 0
+        if scores is None:
+            scores = {d: w * rarity for d, w in matches.items()}
+        else:
+            scores = {d: s + matches[d] * rarity for d, s in scores.items() if d in matches}
+        if not scores:
+            return {"total": 0, "results": []}
+    ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+    page = ranked[offset : offset + limit]
+    docs = storage.get_search_docs(username, [doc_id for doc_id, _ in page])
+    results = [
+        {**docs[doc_id], "score": round(score, 3)} for doc_id, score in page if doc_id in docs
+    ]
+    return {"total": len(ranked), "results": results}
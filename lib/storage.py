@@ -5,9 +5,33 @@ Supports JSON files (local dev) and Upstash Redis (Vercel deployment).
 
 import json
 import os
+import threading
+import time
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
+
+from lib import metrics, timing
+
+
+# key -> (count, expiry on the monotonic clock), for StorageBackend.incr_counter
+_LOCAL_COUNTERS: dict[str, tuple[int, float]] = {}
+_LOCAL_COUNTERS_LOCK = threading.Lock()
+
+
+def _search_keys_pattern(username: str) -> str:
+    """SCAN pattern for a user's search index keys (it can match other users' too)."""
+    escaped = "".join(f"\\{c}" if c in "*?[]\\" else c for c in username)
+    return f"wiki:search:{escaped}:*"
+
+
+def _is_search_key(key: str, username: str) -> bool:
+    """True for the user's document hash and token hashes (tokens never contain ":")."""
+    prefix = f"wiki:search:{username}:"
+    if not key.startswith(prefix):
+        return False
+    rest = key[len(prefix):]
+    return rest == "docs" or (rest.startswith("t:") and ":" not in rest[2:])
 
 
 class StorageBackend(ABC):
@@ -58,6 +82,51 @@ class StorageBackend(ABC):
         """Save article log for user."""
         pass
 
+    @abstractmethod
+    def get_read_log_stats(self, username: str) -> dict | None:
+        """Get the user's read-log aggregates (lib/read_stats.py), or None if never computed."""
+        pass
+
+    @abstractmethod
+    def save_read_log_stats(self, username: str, stats: dict) -> None:
+        """Save the user's read-log aggregates."""
+        pass
+
+    @abstractmethod
+    def get_search_postings(self, username: str, tokens: list[str]) -> dict[str, dict[str, float]]:
+        """Get {token: {doc id: weight}} from the user's search index for the tokens present."""
+        pass
+
+    @abstractmethod
+    def get_search_docs(self, username: str, doc_ids: list[str]) -> dict[str, dict]:
+        """Get the stored search documents for the ids present in the user's index."""
+        pass
+
+    @abstractmethod
+    def update_search_index(
+        self, username: str, removed: dict[str, list[str]], added: dict[str, tuple[dict, dict[str, float]]]
+    ) -> None:
+        """
+        Remove documents ({doc id: their tokens}) from the user's search index,
+        then add documents ({doc id: (document, {token: weight})}).
+        """
+        pass
+
+    @abstractmethod
+    def clear_search_index(self, username: str) -> None:
+        """Delete the user's whole search index."""
+        pass
+
+    @abstractmethod
+    def get_collection_versions(self, username: str) -> dict[str, int]:
+        """Get {collection: version} for the user's synced collections (see lib/sync.py)."""
+        pass
+
+    @abstractmethod
+    def bump_collection_version(self, username: str, collection: str) -> int:
+        """Increment the version of one of the user's collections and return the new version."""
+        pass
+
     @abstractmethod
     def get_user_links(self, username: str) -> list:
         """Get user's custom links."""
@@ -108,16 +177,69 @@ class StorageBackend(ABC):
         """Save user's link posts queue."""
         pass
 
+    def get_blob(self, key: str) -> str | None:
+        """Get a text blob shared between instances, or None. Local backends share nothing."""
+        return None
+
+    def set_blob(self, key: str, value: str, ttl_seconds: int) -> None:
+        """Store a text blob shared between instances, expiring after ttl_seconds."""
+        pass
+
+    def get_blobs(self, keys: list[str]) -> dict[str, str]:
+        """The shared blobs that exist among keys ({key: value}), fetched together where the backend can."""
+        found = {}
+        for key in keys:
+            value = self.get_blob(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_blobs(self, items: dict[str, str], ttl_seconds: int) -> None:
+        """Store several shared blobs ({key: value}), each expiring after ttl_seconds."""
+        for key, value in items.items():
+            self.set_blob(key, value, ttl_seconds)
+
+    def incr_counter(self, key: str, ttl_seconds: int, amount: int = 1) -> int:
+        """
+        Atomically add amount (which may be negative) to a counter shared
+        between instances and return the new value; the counter expires
+        ttl_seconds after it is created. Local backends count per process.
+        """
+        now = time.monotonic()
+        with _LOCAL_COUNTERS_LOCK:
+            if len(_LOCAL_COUNTERS) > 1000:
+                for k in [k for k, (_, expires) in _LOCAL_COUNTERS.items() if expires <= now]:
+                    del _LOCAL_COUNTERS[k]
+            value, expires = _LOCAL_COUNTERS.get(key, (0, 0.0))
+            if expires <= now:
+                value, expires = 0, now + ttl_seconds
+            _LOCAL_COUNTERS[key] = (value + amount, expires)
+            return value + amount
+
+    def publish_event(self, channel: str, message: str) -> None:
+        """Send message to every instance listening on channel. Local backends have no other instances."""
+        pass
+
+    def listen_events(self, channel: str) -> Iterator[str] | None:
+        """
+        Subscribe to channel and return a blocking iterator over its messages,
+        or None if the backend cannot push messages and callers must poll.
+        """
+        return None
+
 
 class JsonStorage(StorageBackend):
     """File-based JSON storage for local development."""
 
     def __init__(self):
-        base = Path(__file__).resolve().parent.parent
-        self._data_dir = base / "data"
+        configured = (os.environ.get("JSON_STORAGE_DIR") or "").strip()
+        self._data_dir = Path(configured) if configured else Path(__file__).resolve().parent.parent / "data"
         self._users_file = self._data_dir / "users.json"
         self._sessions_file = self._data_dir / "sessions.json"
         self._logs_dir = self._data_dir / "logs"
+        self._log_stats_dir = self._data_dir / "log_stats"
+        self._search_dir = self._data_dir / "search"
+        self._versions_dir = self._data_dir / "versions"
         self._links_dir = self._data_dir / "links"
         self._link_lists_dir = self._data_dir / "link_lists"
         self._presets_dir = self._data_dir / "presets"
@@ -128,6 +250,9 @@ class JsonStorage(StorageBackend):
     def _ensure_dirs(self):
         self._data_dir.mkdir(parents=True, exist_ok=True)
         self._logs_dir.mkdir(parents=True, exist_ok=True)
+        self._log_stats_dir.mkdir(parents=True, exist_ok=True)
+        self._search_dir.mkdir(parents=True, exist_ok=True)
+        self._versions_dir.mkdir(parents=True, exist_ok=True)
         self._links_dir.mkdir(parents=True, exist_ok=True)
         self._link_lists_dir.mkdir(parents=True, exist_ok=True)
         self._presets_dir.mkdir(parents=True, exist_ok=True)
@@ -188,6 +313,56 @@ class JsonStorage(StorageBackend):
         log_path = self._logs_dir / f"{username}.json"
         self._save_json(log_path, log)
 
+    def get_read_log_stats(self, username: str) -> dict | None:
+        data = self._load_json(self._log_stats_dir / f"{username}.json", {})
+        return data if isinstance(data, dict) and data else None
+
+    def save_read_log_stats(self, username: str, stats: dict) -> None:
+        self._save_json(self._log_stats_dir / f"{username}.json", stats)
+
+    def get_search_postings(self, username: str, tokens: list[str]) -> dict[str, dict[str, float]]:
+        postings = self._load_json(self._search_dir / f"{username}.json", {}).get("postings", {})
+        return {t: postings[t] for t in tokens if t in postings}
+
+    def get_search_docs(self, username: str, doc_ids: list[str]) -> dict[str, dict]:
+        docs = self._load_json(self._search_dir / f"{username}.json", {}).get("docs", {})
+        return {d: docs[d] for d in doc_ids if d in docs}
+
+    def update_search_index(
+        self, username: str, removed: dict[str, list[str]], added: dict[str, tuple[dict, dict[str, float]]]
+    ) -> None:
+        path = self._search_dir / f"{username}.json"
+        index = self._load_json(path, {})
+        postings = index.setdefault("postings", {})
+        docs = index.setdefault("docs", {})
+        for doc_id, tokens in removed.items():
+            docs.pop(doc_id, None)
+            for token in tokens:
+                docs_with_token = postings.get(token)
+                if docs_with_token is not None:
+                    docs_with_token.pop(doc_id, None)
+                    if not docs_with_token:
+                        del postings[token]
+        for doc_id, (doc, weights) in added.items():
+            docs[doc_id] = doc
+            for token, weight in weights.items():
+                postings.setdefault(token, {})[doc_id] = weight
+        self._save_json(path, index)
+
+    def clear_search_index(self, username: str) -> None:
+        (self._search_dir / f"{username}.json").unlink(missing_ok=True)
+
+    def get_collection_versions(self, username: str) -> dict[str, int]:
+        data = self._load_json(self._versions_dir / f"{username}.json", {})
+        return data if isinstance(data, dict) else {}
+
+    def bump_collection_version(self, username: str, collection: str) -> int:
+        path = self._versions_dir / f"{username}.json"
+        versions = self.get_collection_versions(username)
+        versions[collection] = versions.get(collection, 0) + 1
+        self._save_json(path, versions)
+        return versions[collection]
+
     def get_user_links(self, username: str) -> list:
         links_path = self._links_dir / f"{username}.json"
         data = self._load_json(links_path, [])
@@ -295,6 +470,74 @@ class RedisUrlStorage(StorageBackend):
         key = f"wiki:log:{username}"
         self._redis.set(key, json.dumps(log))
 
+    def get_read_log_stats(self, username: str) -> dict | None:
+        val = self._redis.get(f"wiki:log_stats:{username}")
+        if not val:
+            return None
+        try:
+            data = json.loads(val)
+            return data if isinstance(data, dict) else None
+        except (json.JSONDecodeError, TypeError):
+            return None
+
+    def save_read_log_stats(self, username: str, stats: dict) -> None:
+        self._redis.set(f"wiki:log_stats:{username}", json.dumps(stats))
+
+    def get_search_postings(self, username: str, tokens: list[str]) -> dict[str, dict[str, float]]:
+        if not tokens:
+            return {}
+        pipe = self._redis.pipeline()
+        for token in tokens:
+            pipe.hgetall(f"wiki:search:{username}:t:{token}")
+        results = pipe.execute()
+        return {t: {d: float(w) for d, w in r.items()} for t, r in zip(tokens, results) if r}
+
+    def get_search_docs(self, username: str, doc_ids: list[str]) -> dict[str, dict]:
+        if not doc_ids:
+            return {}
+        values = self._redis.hmget(f"wiki:search:{username}:docs", *doc_ids)
+        return {d: json.loads(v) for d, v in zip(doc_ids, values) if v}
+
+    def update_search_index(
+        self, username: str, removed: dict[str, list[str]], added: dict[str, tuple[dict, dict[str, float]]]
+    ) -> None:
+        # One hash per token ({doc id: weight}) plus one of documents
+        unindex: dict[str, list[str]] = {}
+        for doc_id, tokens in removed.items():
+            for token in tokens:
+                unindex.setdefault(token, []).append(doc_id)
+        index: dict[str, dict[str, float]] = {}
+        for doc_id, (_, weights) in added.items():
+            for token, weight in weights.items():
+                index.setdefault(token, {})[doc_id] = weight
+        pipe = self._redis.pipeline()
+        docs_key = f"wiki:search:{username}:docs"
+        if removed:
+            pipe.hdel(docs_key, *removed)
+        for token, doc_ids in unindex.items():
+            pipe.hdel(f"wiki:search:{username}:t:{token}", *doc_ids)
+        if added:
+            pipe.hset(docs_key, mapping={d: json.dumps(doc) for d, (doc, _) in added.items()})
+        for token, weights in index.items():
+            pipe.hset(f"wiki:search:{username}:t:{token}", mapping=weights)
+        if removed or added:
+            pipe.execute()
+
+    def clear_search_index(self, username: str) -> None:
+        keys = [
+            key for key in self._redis.scan_iter(match=_search_keys_pattern(username), count=500)
+            if _is_search_key(key, username)
+        ]
+        for start in range(0, len(keys), 500):
+            self._redis.delete(*keys[start : start + 500])
+
+    def get_collection_versions(self, username: str) -> dict[str, int]:
+        raw = self._redis.hgetall(f"wiki:versions:{username}")
+        return {k: int(v) for k, v in (raw or {}).items()}
+
+    def bump_collection_version(self, username: str, collection: str) -> int:
+        return int(self._redis.hincrby(f"wiki:versions:{username}", collection, 1))
+
     def get_user_links(self, username: str) -> list:
         key = f"wiki:links:{username}"
         val = self._redis.get(key)
@@ -380,6 +623,49 @@ class RedisUrlStorage(StorageBackend):
         key = f"wiki:link_posts:{username}"
         self._redis.set(key, json.dumps(items))
 
+    def get_blob(self, key: str) -> str | None:
+        return self._redis.get(f"wiki:blob:{key}")
+
+    def set_blob(self, key: str, value: str, ttl_seconds: int) -> None:
+        self._redis.set(f"wiki:blob:{key}", value, ex=ttl_seconds)
+
+    def get_blobs(self, keys: list[str]) -> dict[str, str]:
+        if not keys:
+            return {}
+        values = self._redis.mget(*[f"wiki:blob:{key}" for key in keys])
+        return {k: v for k, v in zip(keys, values) if v is not None}
+
+    def set_blobs(self, items: dict[str, str], ttl_seconds: int) -> None:
+        if not items:
+            return
+        pipe = self._redis.pipeline()
+        for key, value in items.items():
+            pipe.set(f"wiki:blob:{key}", value, ex=ttl_seconds)
+        pipe.execute()
+
+    def incr_counter(self, key: str, ttl_seconds: int, amount: int = 1) -> int:
+        k = f"wiki:counter:{key}"
+        value = self._redis.incrby(k, amount)
+        if value == amount:
+            self._redis.expire(k, ttl_seconds)
+        return int(value)
+
+    def publish_event(self, channel: str, message: str) -> None:
+        self._redis.publish(f"wiki:events:{channel}", message)
+
+    def listen_events(self, channel: str) -> Iterator[str] | None:
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(f"wiki:events:{channel}")
+
+        def messages() -> Iterator[str]:
+            try:
+                for message in pubsub.listen():
+                    yield message["data"]
+            finally:
+                pubsub.close()
+
+        return messages()
+
 
 class RedisStorage(StorageBackend):
     """Upstash Redis storage for Vercel deployment."""
@@ -455,6 +741,76 @@ class RedisStorage(StorageBackend):
         key = f"wiki:log:{username}"
         self._redis.set(key, json.dumps(log))
 
+    def get_read_log_stats(self, username: str) -> dict | None:
+        val = self._redis.get(f"wiki:log_stats:{username}")
+        if not val:
+            return None
+        try:
+            data = json.loads(val)
+            return data if isinstance(data, dict) else None
+        except (json.JSONDecodeError, TypeError):
+            return None
+
+    def save_read_log_stats(self, username: str, stats: dict) -> None:
+        self._redis.set(f"wiki:log_stats:{username}", json.dumps(stats))
+
+    def get_search_postings(self, username: str, tokens: list[str]) -> dict[str, dict[str, float]]:
+        if not tokens:
+            return {}
+        pipe = self._redis.pipeline()
+        for token in tokens:
+            pipe.hgetall(f"wiki:search:{username}:t:{token}")
+        results = pipe.exec()
+        return {t: {d: float(w) for d, w in r.items()} for t, r in zip(tokens, results) if r}
+
+    def get_search_docs(self, username: str, doc_ids: list[str]) -> dict[str, dict]:
+        if not doc_ids:
+            return {}
+        values = self._redis.hmget(f"wiki:search:{username}:docs", *doc_ids)
+        return {d: json.loads(v) for d, v in zip(doc_ids, values) if v}
+
+    def update_search_index(
+        self, username: str, removed: dict[str, list[str]], added: dict[str, tuple[dict, dict[str, float]]]
+    ) -> None:
+        # One hash per token ({doc id: weight}) plus one of documents
+        unindex: dict[str, list[str]] = {}
+        for doc_id, tokens in removed.items():
+            for token in tokens:
+                unindex.setdefault(token, []).append(doc_id)
+        index: dict[str, dict[str, float]] = {}
+        for doc_id, (_, weights) in added.items():
+            for token, weight in weights.items():
+                index.setdefault(token, {})[doc_id] = weight
+        pipe = self._redis.pipeline()
+        docs_key = f"wiki:search:{username}:docs"
+        if removed:
+            pipe.hdel(docs_key, *removed)
+        for token, doc_ids in unindex.items():
+            pipe.hdel(f"wiki:search:{username}:t:{token}", *doc_ids)
+        if added:
+            pipe.hset(docs_key, values={d: json.dumps(doc) for d, (doc, _) in added.items()})
+        for token, weights in index.items():
+            pipe.hset(f"wiki:search:{username}:t:{token}", values=weights)
+        if removed or added:
+            pipe.exec()
+
+    def clear_search_index(self, username: str) -> None:
+        keys, cursor = [], 0
+        while True:
+            cursor, page = self._redis.scan(cursor, match=_search_keys_pattern(username), count=500)
+            keys.extend(key for key in page if _is_search_key(key, username))
+            if int(cursor) == 0:
+                break
+        for start in range(0, len(keys), 500):
+            self._redis.delete(*keys[start : start + 500])
+
+    def get_collection_versions(self, username: str) -> dict[str, int]:
+        raw = self._redis.hgetall(f"wiki:versions:{username}")
+        return {k: int(v) for k, v in (raw or {}).items()}
+
+    def bump_collection_version(self, username: str, collection: str) -> int:
+        return int(self._redis.hincrby(f"wiki:versions:{username}", collection, 1))
+
     def get_user_links(self, username: str) -> list:
         key = f"wiki:links:{username}"
         val = self._redis.get(key)
@@ -540,6 +896,33 @@ class RedisStorage(StorageBackend):
         key = f"wiki:link_posts:{username}"
         self._redis.set(key, json.dumps(items))
 
+    def get_blob(self, key: str) -> str | None:
+        return self._redis.get(f"wiki:blob:{key}")
+
+    def set_blob(self, key: str, value: str, ttl_seconds: int) -> None:
+        self._redis.set(f"wiki:blob:{key}", value, ex=ttl_seconds)
+
+    def get_blobs(self, keys: list[str]) -> dict[str, str]:
+        if not keys:
+            return {}
+        values = self._redis.mget(*[f"wiki:blob:{key}" for key in keys])
+        return {k: v for k, v in zip(keys, values) if v is not None}
+
+    def set_blobs(self, items: dict[str, str], ttl_seconds: int) -> None:
+        if not items:
+            return
+        pipe = self._redis.pipeline()
+        for key, value in items.items():
+            pipe.set(f"wiki:blob:{key}", value, ex=ttl_seconds)
+        pipe.exec()
+
+    def incr_counter(self, key: str, ttl_seconds: int, amount: int = 1) -> int:
+        k = f"wiki:counter:{key}"
+        value = self._redis.incrby(k, amount)
+        if value == amount:
+            self._redis.expire(k, ttl_seconds)
+        return int(value)
+
 
 def _get_storage() -> StorageBackend:
     """Return storage backend based on environment."""
@@ -577,6 +960,54 @@ def _get_storage() -> StorageBackend:
     return JsonStorage()
 
 
+STORAGE_SECONDS = metrics.histogram(
+    "storage_operation_seconds", "Storage backend call latency.", ("backend", "method")
+)
+STORAGE_ERRORS = metrics.counter(
+    "storage_operation_errors_total", "Storage backend calls that raised.", ("backend", "method")
+)
+
+
+class _InstrumentedStorage:
+    """Proxy that records latency and errors for every public backend method."""
+
+    def __init__(self, backend: StorageBackend):
+        self._backend = backend
+        self._name = type(backend).__name__
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._backend, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            except Exception:
+                STORAGE_ERRORS.inc(self._name, name)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                STORAGE_SECONDS.observe(elapsed, self._name, name)
+                timing.record("storage", elapsed)
+
+        return call
+
+
+_STORAGE: StorageBackend | None = None
+_STORAGE_LOCK = threading.Lock()
+
+
 def get_storage() -> StorageBackend:
-    """Return the configured storage backend."""
-    return _get_storage()
+    """
+    Return the configured storage backend. It is built on first use and then
+    reused, so a cold start pays for the client (and its import) only when a
+    route actually touches storage, and only once.
+    """
+    global _STORAGE
+    if _STORAGE is None:
+        with _STORAGE_LOCK:
+            if _STORAGE is None:
+                _STORAGE = _InstrumentedStorage(_get_storage())
+    return _STORAGE
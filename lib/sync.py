@@ -0,0 +1,244 @@
+"""
+Cross-device sync: every saved collection (read log, links, link lists, ...)
+gets a version number, bumped on each save, and /api/events streams a user's
+versions to their open clients over Server-Sent Events whenever one changes,
+so a client re-fetches only the collections that another device changed.
+
+A save wakes the streams of the same user in this process directly, and in
+other instances through the storage backend's pub/sub (Redis). Backends that
+cannot push (the Upstash REST API, JSON files) fall back to each stream
+re-reading the versions every EVENTS_POLL_SECONDS.
+"""
+
+import asyncio
+import json
+import os
+import secrets
+import threading
+import time
+from typing import AsyncIterator
+
+from lib import metrics
+
+# Collection names are the API paths they are served from (/api/<name>)
+COLLECTIONS = ("read-log", "user-links", "link-lists", "presets", "currently-reading", "link-posts")
+
+CHANNEL = "collections"
+
+# Seconds between keepalive comments, so proxies do not close an idle stream
+KEEPALIVE_SECONDS = float(os.environ.get("EVENTS_KEEPALIVE_SECONDS") or 15)
+# Seconds between version checks when the backend cannot push changes
+POLL_SECONDS = float(os.environ.get("EVENTS_POLL_SECONDS") or 5)
+# Streams end after this long and the client reconnects (serverless functions have a time limit)
+MAX_STREAM_SECONDS = float(os.environ.get("EVENTS_MAX_SECONDS") or 240)
+# How long clients wait before reconnecting, in milliseconds
+RETRY_MS = 3000
+
+EVENTS_SENT = metrics.counter("events_sent_total", "Version events sent to clients.")
+
+
+class _Subscriber:
+    """One open stream: an asyncio event set (from any thread) when its user's versions may have changed."""
+
+    __slots__ = ("loop", "event")
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def wake(self) -> None:
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout: float) -> bool:
+        """True if woken within timeout seconds."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self.event.clear()
+        return True
+
+
+class EventHub:
+    """
+    Fans change notifications out to the streams open in this process, and
+    relays them between instances through the storage backend's pub/sub.
+    """
+
+    def __init__(self):
+        self.instance_id = secrets.token_hex(8)
+        self.live = False  # True while subscribed to the backend's pub/sub
+        self._subscribers: dict[str, set[_Subscriber]] = {}
+        self._lock = threading.Lock()
+        self._listener: threading.Thread | None = None
+
+    def subscribe(self, username: str) -> _Subscriber:
+        subscriber = _Subscriber()
+        with self._lock:
+            self._subscribers.setdefault(username, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, username: str, subscriber: _Subscriber) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(username)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[username]
+
+    def stream_count(self) -> int:
+        with self._lock:
+            return sum(len(group) for group in self._subscribers.values())
+
+    def notify(self, username: str) -> None:
+        """Wake this process's streams for username."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(username, ()))
+        for subscriber in subscribers:
+            subscriber.wake()
+
+    def _notify_all(self) -> None:
+        with self._lock:
+            subscribers = [s for group in self._subscribers.values() for s in group]
+        for subscriber in subscribers:
+            subscriber.wake()
+
+    def publish(self, username: str) -> None:
+        """Wake username's streams here and in every other instance."""
+        self.notify(username)
+        from lib.storage import get_storage
+
+        try:
+            get_storage().publish_event(CHANNEL, json.dumps({"user": username, "origin": self.instance_id}))
+        except Exception as e:
+            print(f"Error publishing change for {username}: {e}")
+
+    def start(self) -> None:
+        """Start the pub/sub listener thread (once); blocks until the first subscribe attempt is made."""
+        with self._lock:
+            if self._listener is not None:
+                return
+            ready = threading.Event()
+            self._listener = threading.Thread(
+                target=self._listen, args=(ready,), name="event-listener", daemon=True
+            )
+            self._listener.start()
+        ready.wait(5)
+
+    def _listen(self, ready: threading.Event) -> None:
+        from lib.storage import get_storage
+
+        delay = 1.0
+        while True:
+            try:
+                messages = get_storage().listen_events(CHANNEL)
+                if messages is None:
+                    return  # backend cannot push: streams poll
+                self.live = True
+                delay = 1.0
+                ready.set()
+                # Changes published while we were not subscribed were missed
+                self._notify_all()
+                for raw in messages:
+                    try:
+                        message = json.loads(raw)
+                    except (TypeError, ValueError):
+                        continue
+                    if message.get("origin") != self.instance_id:
+                        self.notify(message.get("user"))
+            except Exception as e:
+                print(f"Change event subscription failed, polling until it is back: {e}")
+            finally:
+                self.live = False
+                ready.set()
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+
+
+_HUB: EventHub | None = None
+_HUB_LOCK = threading.Lock()
+
+
+def get_event_hub() -> EventHub:
+    """Return the process-wide event hub."""
+    global _HUB
+    with _HUB_LOCK:
+        if _HUB is None:
+            _HUB = EventHub()
+            metrics.gauge("event_streams", "Open /api/events streams in this process.", _HUB.stream_count)
+        return _HUB
+
+
+def collection_changed(username: str, collection: str) -> int | None:
+    """
+    Bump a collection's version after a save and tell the user's other
+    devices. Returns the new version, or None if it could not be recorded
+    (the save itself has already succeeded and is not undone).
+    """
+    from lib.storage import get_storage
+
+    try:
+        version = get_storage().bump_collection_version(username, collection)
+    except Exception as e:
+        print(f"Error recording {collection} version for {username}: {e}")
+        return None
+    get_event_hub().publish(username)
+    return version
+
+
+def get_versions(username: str) -> dict[str, int]:
+    """{collection: version} for every synced collection; 0 for ones never saved."""
+    from lib.storage import get_storage
+
+    stored = get_storage().get_collection_versions(username)
+    return {name: int(stored.get(name, 0)) for name in COLLECTIONS}
+
+
+def collection_version(username: str, collection: str) -> int | None:
+    """
+    A collection's current version, for its GET response; None if it cannot
+    be read. Read it before the collection, so a change saved in between is
+    announced as newer than what the client holds rather than missed.
+    """
+    try:
+        return get_versions(username)[collection]
+    except Exception as e:
+        print(f"Error reading {collection} version for {username}: {e}")
+        return None
+
+
+def _versions_event(versions: dict[str, int]) -> bytes:
+    EVENTS_SENT.inc()
+    return f"event: versions\ndata: {json.dumps(versions, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+async def event_stream(username: str) -> AsyncIterator[bytes]:
+    """
+    The body of a user's /api/events stream: a "versions" event with every
+    collection's version on connect and again whenever one changes, with
+    keepalive comments in between. Ends after MAX_STREAM_SECONDS; the
+    response is cancelled when the client goes away.
+    """
+    hub = get_event_hub()
+    await asyncio.to_thread(hub.start)
+    subscriber = hub.subscribe(username)
+    try:
+        versions = await asyncio.to_thread(get_versions, username)
+        yield f"retry: {RETRY_MS}\n".encode("utf-8") + _versions_event(versions)
+        now = time.monotonic()
+        deadline, last_sent = now + MAX_STREAM_SECONDS, now
+        while now < deadline:
+            timeout = KEEPALIVE_SECONDS if hub.live else min(POLL_SECONDS, KEEPALIVE_SECONDS)
+            woken = await subscriber.wait(timeout)
+            now = time.monotonic()
+            if woken or not hub.live:
+                current = await asyncio.to_thread(get_versions, username)
+                if current != versions:
+                    versions, last_sent = current, now
+                    yield _versions_event(versions)
+                    continue
+            if now - last_sent >= KEEPALIVE_SECONDS:
+                last_sent = now
+                yield b": keepalive\n\n"
+    finally:
+        hub.unsubscribe(username, subscriber)
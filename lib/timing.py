@@ -0,0 +1,204 @@
+"""
+Per-request timing breakdown and on-demand profiling.
+Code marks named phases (auth, storage, fetch, parse, render) with phase();
+ServerTimingMiddleware collects them for the current request through a
+context variable and reports them in a Server-Timing header, which browser
+dev tools show next to the request. Outside a request phase() only costs a
+context variable lookup.
+
+Admins can add ?profile=1 to any request to get a sampling profile of it
+instead of the response, as folded stacks (one "frame;frame;frame count"
+line per stack) that flamegraph.pl and speedscope read directly.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable
+
+from starlette.datastructures import MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Set SERVER_TIMING=0 to stop sending the header
+SERVER_TIMING_ENABLED = (os.environ.get("SERVER_TIMING") or "1").strip() != "0"
+# Seconds between profiler samples, and the longest a profiled request may run
+PROFILE_INTERVAL_SECONDS = float(os.environ.get("PROFILE_INTERVAL_SECONDS") or 0.002)
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS") or 60)
+
+
+class _Phases:
+    """Phase durations of one request; shared with the threads it hands work to."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def header(self, total: float) -> str:
+        with self._lock:
+            items = list(self.seconds.items())
+            counts = dict(self.counts)
+        parts = [f'{name};dur={s * 1000:.1f};desc="{counts[name]}x"' for name, s in items]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# asyncio.to_thread and Starlette's threadpool copy the context, so work a
+# request hands to threads still records into that request's _Phases.
+_CURRENT: ContextVar[_Phases | None] = ContextVar("request_phases", default=None)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add seconds to phase name of the current request, if any."""
+    phases = _CURRENT.get()
+    if phases is not None:
+        phases.add(name, seconds)
+
+
+class phase:
+    """Context manager timing its block as phase name of the current request."""
+
+    __slots__ = ("name", "_start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        record(self.name, time.perf_counter() - self._start)
+
+
+# Leaf frames in these files are idle pool threads, not work
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", os.path.join("concurrent", "futures", "thread.py"))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    """
+    Sample the stacks of running threads every interval until stopped. The
+    thread serving the request is always sampled (an idle event loop means
+    the request is waiting on I/O or a render process); other threads only
+    when busy. Under concurrent load, busy threads serving other requests
+    show up too, so profile on a quiet instance where possible.
+    """
+
+    def __init__(self, request_thread: int, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.request_thread = request_thread
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident != self.request_thread and frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> str:
+        """Stop sampling and return the folded stacks."""
+        self._stop_event.set()
+        self.join()
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ServerTimingMiddleware:
+    """
+    Add a Server-Timing header with the request's phases and total time.
+    Phases that run after the response starts (a streamed body) are not
+    included. can_profile(scope) decides who may use ?profile=1; without
+    it profiling is off.
+    """
+
+    def __init__(self, app: ASGIApp, can_profile: Callable[[Scope], bool] | None = None):
+        self.app = app
+        self.can_profile = can_profile
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.can_profile is not None and b"profile=" in scope.get("query_string", b""):
+            if QueryParams(scope["query_string"]).get("profile") == "1" and self.can_profile(scope):
+                await self._profile(scope, receive, send)
+                return
+        if not SERVER_TIMING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        phases = _Phases()
+        token = _CURRENT.set(phases)
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", phases.header(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _CURRENT.reset(token)
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Run the request under the sampler and answer with its profile instead of its response."""
+        phases = _Phases()
+        token = _CURRENT.set(phases)
+        status = 500
+        sampler = _Sampler(threading.get_ident(), PROFILE_INTERVAL_SECONDS)
+
+        async def discard(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await asyncio.wait_for(self.app(scope, receive, discard), PROFILE_MAX_SECONDS)
+        except asyncio.TimeoutError:
+            status = 504
+        finally:
+            elapsed = time.perf_counter() - start
+            folded = sampler.stop()
+            _CURRENT.reset(token)
+
+        body = folded.encode("utf-8")
+        headers = MutableHeaders()
+        headers["Content-Type"] = "text/plain; charset=utf-8"
+        headers["Content-Disposition"] = 'attachment; filename="profile.folded"'
+        headers["Content-Length"] = str(len(body))
+        headers["Cache-Control"] = "no-store"
+        headers["Server-Timing"] = phases.header(elapsed)
+        headers["X-Profiled-Status"] = str(status)
+        headers["X-Profile-Samples"] = str(sum(sampler.stacks.values()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
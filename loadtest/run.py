@@ -0,0 +1,225 @@
+"""
+End-to-end load test: starts the stub Wikipedia (loadtest/stub_wikipedia.py)
+and the app under uvicorn with JSON storage and caches in a temporary
+directory, then runs --users virtual users for --duration seconds. Each
+user logs in once and then loops over scenarios (loadtest/scenarios.py)
+picked by weight. Reports throughput, error counts and latency percentiles
+per step.
+
+With --target the app is not started: the scenarios run against that URL
+(which should already point at a stub through WIKIPEDIA_BASE_URL).
+
+Usage:
+    python loadtest/run.py [--app vital_article|app] [--users 20] [--duration 60]
+        [--ramp 5] [--workers 1] [--scenario NAME=WEIGHT ...] [--think-ms 0]
+        [--latency-ms 80] [--jitter-ms 40] [--error-rate 0] [--pages DIR]
+        [--target URL] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scenarios import DEFAULT_MIX, SCENARIOS, Sample, VirtualUser, login  # noqa: E402
+from stub_wikipedia import PageSource, StubWikipedia  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cleared for the app under test so it uses local JSON storage, not a real Redis
+_STORAGE_ENV = (
+    "REDIS_URL",
+    "storage_REDIS_URL",
+    "KV_REST_API_URL",
+    "storage_KV_REST_API_URL",
+    "UPSTASH_REDIS_REST_URL",
+    "KV_REST_API_TOKEN",
+    "storage_KV_REST_API_TOKEN",
+    "UPSTASH_REDIS_REST_TOKEN",
+    "VERCEL",
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(app: str, wikipedia_url: str, workdir: Path, workers: int) -> tuple[subprocess.Popen, str]:
+    """Start app under uvicorn on a free port with all state under workdir; return (process, base URL)."""
+    port = _free_port()
+    env = {k: v for k, v in os.environ.items() if k not in _STORAGE_ENV}
+    env.update(
+        WIKIPEDIA_BASE_URL=wikipedia_url,
+        JSON_STORAGE_DIR=str(workdir / "data"),
+        CATALOG_DIR=str(workdir / "catalog"),
+        RENDER_CACHE_DIR=str(workdir / "render_cache"),
+        ARTICLE_CACHE_DIR=str(workdir / "article_cache"),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{app}:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{app} exited with status {process.returncode}")
+        try:
+            requests.get(base_url + "/api/me", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{app} did not start within 30 seconds")
+
+
+def run_user(user: VirtualUser, mix: dict[str, int], deadline: float, think: float) -> None:
+    login(user)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    while time.monotonic() < deadline:
+        scenario, _ = SCENARIOS[random.choices(names, weights)[0]]
+        scenario(user)
+        if think:
+            time.sleep(random.uniform(0, 2 * think))
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[int(q) - 1]
+
+
+def summarize(samples: list[Sample], elapsed: float) -> dict:
+    by_step: dict[str, list[Sample]] = defaultdict(list)
+    for s in samples:
+        by_step[s.step].append(s)
+    steps = {}
+    for step, rows in sorted(by_step.items()):
+        ms = sorted(r.seconds * 1000 for r in rows)
+        statuses = Counter(r.status for r in rows)
+        steps[step] = {
+            "requests": len(rows),
+            "errors": sum(n for status, n in statuses.items() if status == 0 or status >= 500),
+            "per_second": round(len(rows) / elapsed, 2),
+            "p50_ms": round(percentile(ms, 50), 1),
+            "p90_ms": round(percentile(ms, 90), 1),
+            "p99_ms": round(percentile(ms, 99), 1),
+            "max_ms": round(ms[-1], 1),
+            "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        }
+    return {
+        "seconds": round(elapsed, 1),
+        "requests": len(samples),
+        "per_second": round(len(samples) / elapsed, 2),
+        "steps": steps,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=sorted(DEFAULT_MIX), default="vital_article")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load after ramp-up starts")
+    parser.add_argument("--ramp", type=float, default=5, help="seconds over which users start")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    parser.add_argument("--scenario", action="append", default=[], metavar="NAME=WEIGHT")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between scenarios")
+    parser.add_argument("--latency-ms", type=float, default=80, help="stub Wikipedia latency")
+    parser.add_argument("--jitter-ms", type=float, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub responses that fail")
+    parser.add_argument("--pages", type=Path, help="recorded pages for the stub (stub_wikipedia.py record)")
+    parser.add_argument("--target", help="run against this app URL instead of starting one")
+    parser.add_argument("--json", help="write the summary to this file")
+    args = parser.parse_args()
+
+    mix = dict(DEFAULT_MIX[args.app])
+    if args.scenario:
+        mix = {}
+        for item in args.scenario:
+            name, _, weight = item.partition("=")
+            if name not in SCENARIOS:
+                parser.error(f"unknown scenario {name}; choose from {', '.join(SCENARIOS)}")
+            if args.app not in SCENARIOS[name][1]:
+                parser.error(f"scenario {name} needs routes {args.app} does not serve")
+            mix[name] = float(weight or 1)
+
+    process = None
+    stub = None
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        try:
+            if args.target:
+                base_url = args.target.rstrip("/")
+            else:
+                stub = StubWikipedia(
+                    ("127.0.0.1", 0), PageSource(args.pages), args.latency_ms, args.jitter_ms, args.error_rate
+                )
+                wikipedia_url = stub.start()
+                process, base_url = start_app(args.app, wikipedia_url, Path(workdir), args.workers)
+                print(f"{args.app} on {base_url}, stub Wikipedia on {wikipedia_url}")
+
+            print(f"{args.users} users for {args.duration:g}s, mix {mix}")
+            samples: list[Sample] = []
+            start = time.monotonic()
+            deadline = start + args.duration
+            threads = []
+            for i in range(args.users):
+                user = VirtualUser(base_url, args.app, samples)
+                t = threading.Thread(
+                    target=run_user, args=(user, mix, deadline, args.think_ms / 1000), daemon=True
+                )
+                threads.append(t)
+                t.start()
+                time.sleep(args.ramp / args.users if args.users else 0)
+            for t in threads:
+                t.join()
+            elapsed = time.monotonic() - start
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+            if stub is not None:
+                stub.shutdown()
+
+    summary = summarize(samples, elapsed)
+    summary.update(app=args.app, users=args.users, mix=mix)
+    if stub is not None:
+        summary["wikipedia_requests"] = stub.requests
+    print(f"\n{summary['requests']} requests in {summary['seconds']}s ({summary['per_second']}/s)")
+    print(
+        f"{'step':14} {'count':>7} {'err':>5} {'req/s':>7}"
+        f" {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  (ms)"
+    )
+    for step, m in summary["steps"].items():
+        print(
+            f"{step:14} {m['requests']:7} {m['errors']:5} {m['per_second']:7.1f}"
+            f" {m['p50_ms']:8.1f} {m['p90_ms']:8.1f} {m['p99_ms']:8.1f} {m['max_ms']:8.1f}"
+        )
+    if stub is not None:
+        print(f"Stub Wikipedia served {stub.requests} requests")
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+        print(f"Saved {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Scripted user scenarios for loadtest/run.py. A scenario is a function of a
+VirtualUser that makes a few requests the way the web client does; each
+request is timed under a step name ("login", "random-pdf", ...).
+
+SCENARIOS maps names to (function, apps that serve its routes). DEFAULT_MIX
+gives each app's default scenario weights.
+"""
+
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import requests
+
+# Routes the client reads on login to sync its local state (see initAuth in public/js/app.js)
+SYNC_PATHS = {
+    "vital_article": ["/api/read-log"],
+    "app": [
+        "/api/read-log",
+        "/api/user-links",
+        "/api/link-lists",
+        "/api/presets",
+        "/api/currently-reading",
+        "/api/link-posts",
+    ],
+}
+CATEGORIES = ("physics", "technology", "economics")
+
+
+@dataclass
+class Sample:
+    step: str
+    seconds: float
+    status: int  # 0 when the request failed before a response
+
+
+@dataclass
+class VirtualUser:
+    base_url: str
+    app: str
+    samples: list[Sample]
+    session: requests.Session = field(default_factory=requests.Session)
+    username: str = field(default_factory=lambda: f"load-{uuid.uuid4().hex[:12]}")
+    seen_urls: list[str] = field(default_factory=list)
+    log: list[dict] = field(default_factory=list)
+
+    def request(self, step: str, method: str, path: str, **kwargs) -> requests.Response | None:
+        """Send a request, record its latency under step and return the response (None on failure)."""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=120, **kwargs)
+            # Downloads count until the last byte arrives
+            response.content
+        except requests.RequestException:
+            self.samples.append(Sample(step, time.perf_counter() - start, 0))
+            return None
+        self.samples.append(Sample(step, time.perf_counter() - start, response.status_code))
+        return response
+
+    def pick_url(self) -> str | None:
+        """An article URL this user has seen, asking /random for one if there is none yet."""
+        if not self.seen_urls:
+            random_article(self)
+        return random.choice(self.seen_urls) if self.seen_urls else None
+
+
+def login(user: VirtualUser) -> None:
+    """Register (first time only) and log in."""
+    credentials = {"username": user.username, "password": "load-test"}
+    user.request("register", "POST", "/api/register", json=credentials)
+    user.request("login", "POST", "/api/login", json=credentials)
+
+
+def bootstrap(user: VirtualUser) -> None:
+    """What the client does on page load: who am I, then fetch every synced collection."""
+    user.request("me", "GET", "/api/me")
+    for path in SYNC_PATHS[user.app]:
+        user.request("sync", "GET", path)
+
+
+def random_article(user: VirtualUser) -> None:
+    response = user.request("random", "GET", "/random", params={"category": random.choice(CATEGORIES)})
+    if response is not None and response.ok:
+        url = response.json().get("url")
+        if url:
+            user.seen_urls.append(url)
+
+
+def random_pdf(user: VirtualUser) -> None:
+    params = {"category": random.choice(CATEGORIES), "format": "pdf"}
+    user.request("random-pdf", "GET", "/random", params=params)
+
+
+def download_pdf(user: VirtualUser) -> None:
+    """Download an article the user has seen, so popular articles repeat like they do in practice."""
+    url = user.pick_url()
+    if url:
+        user.request("download-pdf", "GET", "/download", params={"url": url, "format": "pdf"})
+
+
+def download_txt(user: VirtualUser) -> None:
+    url = user.pick_url()
+    if url:
+        user.request("download-txt", "GET", "/download", params={"url": url, "format": "txt"})
+
+
+def save_log(user: VirtualUser) -> None:
+    """Mark an article read: the client keeps the log locally and saves it whole."""
+    if user.seen_urls:
+        url = random.choice(user.seen_urls)
+    else:
+        url = f"https://en.wikipedia.org/wiki/Load_test_{len(user.log)}"
+    entry = {
+        "title": url.rsplit("/", 1)[-1].replace("_", " "),
+        "url": url,
+        "category": "Physics",
+        "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "notes": "",
+    }
+    user.log.insert(0, entry)
+    user.request("save-log", "POST", "/api/read-log", json={"log": user.log})
+
+
+SCENARIOS = {
+    "bootstrap": (bootstrap, ("vital_article", "app")),
+    "random": (random_article, ("vital_article",)),
+    "random-pdf": (random_pdf, ("vital_article",)),
+    "download-pdf": (download_pdf, ("vital_article",)),
+    "download-txt": (download_txt, ("vital_article",)),
+    "save-log": (save_log, ("vital_article", "app")),
+}
+
+DEFAULT_MIX = {
+    "vital_article": {
+        "bootstrap": 2,
+        "random": 4,
+        "random-pdf": 1,
+        "download-pdf": 2,
+        "download-txt": 1,
+        "save-log": 2,
+    },
+    "app": {"bootstrap": 3, "save-log": 1},
+}
@@ -0,0 +1,293 @@
+"""
+Local stand-in for en.wikipedia.org, so load tests never touch Wikipedia.
+Serves the Vital Articles category pages, article pages and the two api.php
+queries the app makes (action=parse, prop=revisions and the link metadata
+query prop=info|description|pageimages): from recorded
+pages when --pages is given, otherwise synthetic ones generated from the
+title. Responses can be delayed (--latency-ms, --jitter-ms) and a fraction
+failed with 503 (--error-rate).
+
+Point the app at it with WIKIPEDIA_BASE_URL=http://127.0.0.1:PORT.
+
+Usage:
+    python loadtest/stub_wikipedia.py serve [--port 8090] [--pages DIR]
+        [--latency-ms 80] [--jitter-ms 40] [--error-rate 0.01]
+    python loadtest/stub_wikipedia.py record DIR [--articles 50]   (needs network)
+"""
+
+import argparse
+import html
+import json
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.catalog import SOURCES, is_article_href  # noqa: E402
+
+_WORDS = (
+    "the of and in a to is was for as by with on that from at an which are "
+    "energy field particle wave theory quantum relativity mass charge light "
+    "velocity momentum experiment observation equation market capital trade "
+    "engine circuit signal network material structure process system"
+).split()
+
+_REVISION_ID_RE = re.compile(rb'"wgRevisionId":(\d+)')
+_CONTENT_RE = re.compile(rb'<div id="mw-content-text"[^>]*>(.*)</div>\s*<div class="printfooter"', re.S)
+_TITLE_RE = re.compile(rb'<h1 id="firstHeading"[^>]*>(.*?)</h1>', re.S)
+
+
+def _page_name(title: str) -> str:
+    """File name for a title: underscores for spaces, anything unsafe percent-encoded."""
+    return quote(title.replace(" ", "_"), safe="") + ".html"
+
+
+def _revid(title: str) -> int:
+    return 100_000_000 + zlib.crc32(title.encode("utf-8")) % 900_000_000
+
+
+class PageSource:
+    """Vital category pages and article pages, recorded or synthetic."""
+
+    def __init__(self, pages_dir: Path | None = None, articles_per_category: int = 300):
+        self.pages_dir = pages_dir
+        self.articles_per_category = articles_per_category
+
+    def vital_page(self, category: str) -> bytes | None:
+        if category not in SOURCES:
+            return None
+        if self.pages_dir is not None:
+            path = self.pages_dir / "vital" / f"{category}.html"
+            return path.read_bytes() if path.exists() else None
+        links = "".join(
+            f'<li><a href="/wiki/{quote(t.replace(" ", "_"))}">{html.escape(t)}</a></li>'
+            for t in self.synthetic_titles(category)
+        )
+        return (
+            f'<html><body><h1 id="firstHeading">Vital articles: {category}</h1>'
+            f'<div id="mw-content-text"><ul>{links}</ul>'
+            f'<a href="/wiki/Main_Page">Main Page</a><a href="/wiki/Help:Contents">Help</a></div>'
+            f"</body></html>"
+        ).encode("utf-8")
+
+    def synthetic_titles(self, category: str) -> list[str]:
+        return [f"{category.capitalize()} topic {i}" for i in range(1, self.articles_per_category + 1)]
+
+    def article_page(self, title: str) -> bytes | None:
+        """The full article page (skin, title and content) for title, or None if unknown."""
+        if self.pages_dir is not None:
+            path = self.pages_dir / "wiki" / _page_name(title)
+            return path.read_bytes() if path.exists() else None
+        content = self._synthetic_content(title)
+        return (
+            f'<html><head><script>RLCONF={{"wgRevisionId":{_revid(title)}}};</script></head><body>'
+            f'<nav><a href="/wiki/Main_Page">Main page</a></nav>'
+            f'<h1 id="firstHeading"><span class="mw-page-title-main">{html.escape(title)}</span></h1>'
+            f'<div id="mw-content-text">{content}</div>\n<div class="printfooter">Retrieved</div>'
+            f"</body></html>"
+        ).encode("utf-8")
+
+    def parsed(self, title: str) -> dict | None:
+        """The action=parse result for title (content without the skin), or None if unknown."""
+        page = self.article_page(title)
+        if page is None:
+            return None
+        content = _CONTENT_RE.search(page)
+        heading = _TITLE_RE.search(page)
+        revid = _REVISION_ID_RE.search(page)
+        return {
+            "title": title,
+            "revid": int(revid.group(1)) if revid else _revid(title),
+            "displaytitle": heading.group(1).decode("utf-8") if heading else html.escape(title),
+            "text": content.group(1).decode("utf-8") if content else "",
+        }
+
+    def revid(self, title: str) -> int | None:
+        page = self.article_page(title)
+        if page is None:
+            return None
+        match = _REVISION_ID_RE.search(page)
+        return int(match.group(1)) if match else _revid(title)
+
+    @staticmethod
+    def _synthetic_content(title: str) -> str:
+        """Article HTML of a length (20 to 200 paragraphs) that is fixed per title."""
+        rng = random.Random(title)
+        paragraphs = rng.randint(20, 200)
+        references = rng.randint(5, paragraphs)
+        parts = ['<div class="mw-parser-output">', '<table class="infobox"><tr><td>Infobox</td></tr></table>']
+        for i in range(paragraphs):
+            if i % 8 == 0:
+                tag = "h2" if i % 24 == 0 else "h3"
+                parts.append(f"<{tag}>Section {i // 8}: {' '.join(rng.choices(_WORDS, k=3))}</{tag}>")
+            words = " ".join(rng.choices(_WORDS, k=rng.randint(30, 180)))
+            ref = rng.randint(1, references)
+            cite = f'<sup class="reference"><a href="#cite_note-{ref}">[{ref}]</a></sup>'
+            parts.append(f"<p>{words}{cite}.</p>")
+        parts.append('<h2>References</h2><ol class="references">')
+        for r in range(1, references + 1):
+            text = " ".join(rng.choices(_WORDS, k=rng.randint(5, 20)))
+            parts.append(
+                f'<li id="cite_note-{r}"><span class="mw-cite-backlink"><b><a href="#cite_ref-{r}">^</a></b>'
+                f"</span> Author {r} ({1950 + r % 70}). {text}.</li>"
+            )
+        parts.append("</ol></div>")
+        return "".join(parts)
+
+
+class StubWikipedia(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, source: PageSource, latency_ms: float, jitter_ms: float, error_rate: float):
+        super().__init__(address, _Handler)
+        self.source = source
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """Serve from a daemon thread and return the base URL."""
+        threading.Thread(target=self.serve_forever, name="stub-wikipedia", daemon=True).start()
+        return self.base_url
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubWikipedia
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        stub = self.server
+        with stub._lock:
+            stub.requests += 1
+        delay = random.gauss(stub.latency_ms, stub.jitter_ms) if stub.jitter_ms else stub.latency_ms
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if stub.error_rate and random.random() < stub.error_rate:
+            self._send(503, b"Service unavailable (injected)", "text/plain")
+            return
+
+        url = urlparse(self.path)
+        path = unquote(url.path)
+        if path == "/w/api.php":
+            self._api(parse_qs(url.query))
+            return
+        if path.startswith("/wiki/Wikipedia:Vital_articles/"):
+            category = next((c for c, u in SOURCES.items() if unquote(urlparse(u).path) == path), None)
+            body = stub.source.vital_page(category) if category else None
+        elif path.startswith("/wiki/"):
+            body = stub.source.article_page(path[len("/wiki/"):].replace("_", " "))
+        else:
+            body = None
+        if body is None:
+            self._send(404, b"Not found", "text/plain")
+        else:
+            self._send(200, body, "text/html; charset=UTF-8")
+
+    def _api(self, query: dict) -> None:
+        action = query.get("action", [""])[0]
+        source = self.server.source
+        if action == "parse":
+            title = query.get("page", [""])[0]
+            parsed = source.parsed(title)
+            if parsed is None:
+                data = {"error": {"code": "missingtitle", "info": "The page doesn't exist."}}
+            else:
+                data = {"parse": parsed}
+        elif action == "query":
+            titles = [t for t in query.get("titles", [""])[0].split("|") if t]
+            pages = []
+            for title in titles:
+                revid = source.revid(title)
+                if revid is None:
+                    pages.append({"title": title, "missing": True})
+                elif "revisions" in query.get("prop", [""])[0]:
+                    pages.append({"title": title, "revisions": [{"revid": revid}]})
+                else:
+                    thumb = f"{self.server.base_url}/thumb/{quote(title)}.png"
+                    pages.append({
+                        "title": title,
+                        "length": revid % 100000,
+                        "description": f"Synthetic article about {title}",
+                        "thumbnail": {"source": thumb, "width": 160, "height": 120},
+                    })
+            data = {"query": {"pages": pages}}
+        else:
+            data = {"error": {"code": "badvalue", "info": f"Unsupported action {action!r}"}}
+        self._send(200, json.dumps(data).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def record(directory: Path, articles: int) -> None:
+    """Save each Vital category page and a sample of the articles it links to."""
+    import requests
+
+    headers = {"User-Agent": "VitalArticleScraper/1.0 (science_fan@example.com)"}
+    (directory / "vital").mkdir(parents=True, exist_ok=True)
+    (directory / "wiki").mkdir(exist_ok=True)
+    for category, url in SOURCES.items():
+        page = requests.get(url, headers=headers, timeout=30)
+        page.raise_for_status()
+        (directory / "vital" / f"{category}.html").write_bytes(page.content)
+        hrefs = sorted(set(h for h in re.findall(r'href="(/wiki/[^"#]+)"', page.text) if is_article_href(h)))
+        for href in random.Random(category).sample(hrefs, min(articles, len(hrefs))):
+            title = unquote(href[len("/wiki/"):]).replace("_", " ")
+            article = requests.get("https://en.wikipedia.org" + href, headers=headers, timeout=30)
+            if article.ok:
+                (directory / "wiki" / _page_name(title)).write_bytes(article.content)
+        print(f"{category}: recorded {min(articles, len(hrefs))} of {len(hrefs)} articles")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8090)
+    serve.add_argument("--pages", type=Path, help="directory written by the record command")
+    serve.add_argument("--latency-ms", type=float, default=80)
+    serve.add_argument("--jitter-ms", type=float, default=40)
+    serve.add_argument("--error-rate", type=float, default=0.0)
+    rec = commands.add_parser("record")
+    rec.add_argument("directory", type=Path)
+    rec.add_argument("--articles", type=int, default=50, help="articles to record per category")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.directory, args.articles)
+        return 0
+    stub = StubWikipedia(
+        (args.host, args.port), PageSource(args.pages), args.latency_ms, args.jitter_ms, args.error_rate
+    )
+    print(f"Stub Wikipedia on {stub.base_url} ({'recorded' if args.pages else 'synthetic'} pages)")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,18 @@
 """
 Build a PDF from article title, structured body blocks, and references.
 Includes an interactive table of contents with clickable section headings.
+Two renderers produce the same layout: "platypus" (ReportLab flowables) and
+"fast", which draws lines straight onto the canvas.
 """
 
 from io import BytesIO
 import re
+from typing import BinaryIO, NamedTuple
+from reportlab.lib.colors import blue, black
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
 from reportlab.platypus import AnchorFlowable, SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.units import inch
 
@@ -41,21 +47,77 @@ def _unique_anchor_ids(body_blocks: list[BodyBlock]) -> list[tuple[BodyBlock, st
     return result
 
 
-def build_pdf(title: str, body_blocks: list[BodyBlock], references: list[str]) -> bytes:
+# Text (body and references) rendered at most, in characters. ReportLab holds
+# every finished page until the document is saved, so worker memory grows with
+# the text drawn; longer articles are cut short with a note instead. Far above
+# the longest Wikipedia articles (about 500,000 characters of prose).
+MAX_TEXT_CHARS = 2_000_000
+TRUNCATED_NOTE = "[The rest of this article is too long to include in the PDF.]"
+
+
+def _within_limit(body_blocks: list[BodyBlock], references: list[str]) -> tuple[list[BodyBlock], list[str]]:
+    """body_blocks and references cut down to MAX_TEXT_CHARS of text, ending in TRUNCATED_NOTE if cut."""
+    budget = MAX_TEXT_CHARS
+    if sum(len(b["text"]) for b in body_blocks) + sum(len(r) for r in references) <= budget:
+        return body_blocks, references
+    blocks: list[BodyBlock] = []
+    for b in body_blocks:
+        if len(b["text"]) > budget:
+            if budget:
+                blocks.append({"type": "p", "text": b["text"][:budget]})
+            blocks.append({"type": "p", "text": TRUNCATED_NOTE})
+            return blocks, []
+        budget -= len(b["text"])
+        blocks.append(b)
+    refs: list[str] = []
+    for ref in references:
+        if len(ref) > budget:
+            refs.append(TRUNCATED_NOTE)
+            break
+        budget -= len(ref)
+        refs.append(ref)
+    return blocks, refs
+
+
+_STYLES = None
+
+
+def _sample_styles():
+    """ReportLab's sample stylesheet, built once; the styles are never modified."""
+    global _STYLES
+    if _STYLES is None:
+        _STYLES = getSampleStyleSheet()
+    return _STYLES
+
+
+def build_pdf(
+    title: str, body_blocks: list[BodyBlock], references: list[str], renderer: str = "platypus"
+) -> bytes:
     """
     Build a PDF with title, interactive TOC (clickable section headings),
     body (with anchor targets at each heading), and references.
     """
     buf = BytesIO()
+    RENDERERS[renderer](buf, title, body_blocks, references)
+    return buf.getvalue()
+
+
+def build_pdf_to(
+    out: str | BinaryIO, title: str, body_blocks: list[BodyBlock], references: list[str]
+) -> None:
+    """Like build_pdf, but write the document to a path or binary file object."""
+    body_blocks, references = _within_limit(body_blocks, references)
     doc = SimpleDocTemplate(
-        buf,
+        out,
         pagesize=letter,
         rightMargin=inch,
         leftMargin=inch,
         topMargin=inch,
         bottomMargin=inch,
+        # Byte-identical output for identical input, so a render key is a valid strong ETag
+        invariant=True,
     )
-    styles = getSampleStyleSheet()
+    styles = _sample_styles()
     # Slightly smaller style for TOC entries
     toc_style = styles["Normal"]
     story = []
@@ -110,4 +172,202 @@ def build_pdf(title: str, body_blocks: list[BodyBlock], references: list[str]) -
             story.append(Spacer(1, 0.08 * inch))
 
     doc.build(story)
-    return buf.getvalue()
+
+
+class _LineStyle(NamedTuple):
+    font: str
+    size: float
+    leading: float
+    space_before: float
+    space_after: float
+
+
+# Same metrics as the sample stylesheet entries used by the platypus renderer
+_FAST_TITLE = _LineStyle("Helvetica-Bold", 18, 22, 0, 6)
+_FAST_H2 = _LineStyle("Helvetica-Bold", 14, 18, 12, 6)
+_FAST_H3 = _LineStyle("Helvetica-BoldOblique", 12, 14, 12, 6)
+_FAST_NORMAL = _LineStyle("Helvetica", 10, 12, 0, 0)
+_PAGE_WIDTH, _PAGE_HEIGHT = letter
+_FRAME_LEFT = inch
+_FRAME_WIDTH = _PAGE_WIDTH - 2 * inch
+_FRAME_TOP = _PAGE_HEIGHT - inch
+_FRAME_BOTTOM = inch
+# The platypus TOC indents h3 entries with four non-breaking spaces
+_TOC_INDENT = 4 * stringWidth(" ", _FAST_NORMAL.font, _FAST_NORMAL.size)
+
+
+class _FastLayout:
+    """
+    Top-to-bottom line placement on a canvas, starting a new page when full.
+    Word widths are measured once per font and document, since article text
+    repeats the same words constantly and measuring is the main cost.
+    """
+
+    def __init__(self, canvas: Canvas):
+        self.canvas = canvas
+        self.y = _FRAME_TOP
+        self.at_top = True
+        self._widths: dict[str, dict[str, float]] = {}
+
+    def space(self, points: float) -> None:
+        if not self.at_top:
+            self.y -= points
+
+    def ensure(self, height: float) -> None:
+        if self.y - height < _FRAME_BOTTOM and not self.at_top:
+            self.canvas.showPage()
+            self.y = _FRAME_TOP
+            self.at_top = True
+
+    def wrap(self, text: str, style: _LineStyle, width: float) -> list[tuple[str, float]]:
+        """
+        Greedy word wrap; returns (line, line width) pairs. A word wider than
+        the line (a long URL or chemical name) is broken across lines, as
+        Platypus does with splitLongWords.
+        """
+        widths = self._widths.setdefault(style.font, {})
+        scale = style.size / 1000
+        space = stringWidth(" ", style.font, 1000) * scale
+        lines: list[tuple[str, float]] = []
+        for part in text.split("\n"):
+            words: list[str] = []
+            used = 0.0
+            for word in part.split():
+                w = widths.get(word)
+                if w is None:
+                    w = widths[word] = stringWidth(word, style.font, 1000)
+                w *= scale
+                if w > width:
+                    room = width - used - space if words else width
+                    pieces = self._split_word(word, style.font, scale, room, width)
+                    word, w = pieces.pop()
+                    for piece, piece_width in pieces:
+                        if piece:
+                            used += piece_width + (space if words else 0)
+                            words.append(piece)
+                        lines.append((" ".join(words), used))
+                        words, used = [], 0.0
+                if words and used + space + w > width:
+                    lines.append((" ".join(words), used))
+                    words, used = [], 0.0
+                used += w + (space if words else 0)
+                words.append(word)
+            lines.append((" ".join(words), used))
+        return lines
+
+    def _split_word(
+        self, word: str, font: str, scale: float, room: float, width: float
+    ) -> list[tuple[str, float]]:
+        """
+        Break word into (piece, piece width) chunks: the first fills the room
+        left on the current line (and is empty if nothing fits there), the
+        others fill whole lines and the last is the remainder.
+        """
+        widths = self._widths.setdefault(font, {})
+        pieces: list[tuple[str, float]] = []
+        limit = room
+        start, used = 0, 0.0
+        for i, ch in enumerate(word):
+            w = widths.get(ch)
+            if w is None:
+                w = widths[ch] = stringWidth(ch, font, 1000)
+            w *= scale
+            # A character wider than a whole line still gets a line of its own
+            if used + w > limit and (i > start or limit < width):
+                pieces.append((word[start:i], used))
+                start, used, limit = i, 0.0, width
+            used += w
+        pieces.append((word[start:], used))
+        return pieces
+
+    def block(
+        self,
+        text: str,
+        style: _LineStyle,
+        indent: float = 0,
+        centred: bool = False,
+        link: str | None = None,
+        anchor: str | None = None,
+        keep_with_next: float = 0,
+    ) -> None:
+        """Wrap and draw text; optionally link each line to, or register, a named destination."""
+        lines = self.wrap(text, style, _FRAME_WIDTH - indent)
+        self.space(style.space_before)
+        self.ensure(style.leading + keep_with_next)
+        c = self.canvas
+        if anchor:
+            c.bookmarkPage(anchor, fit="XYZ", left=0, top=self.y + style.space_before)
+        c.setFont(style.font, style.size)
+        c.setFillColor(blue if link else black)
+        x = _FRAME_LEFT + indent
+        for line, width in lines:
+            if self.y - style.leading < _FRAME_BOTTOM and not self.at_top:
+                c.showPage()
+                self.y = _FRAME_TOP
+                c.setFont(style.font, style.size)
+                c.setFillColor(blue if link else black)
+            baseline = self.y - style.size
+            if centred:
+                c.drawString(_FRAME_LEFT + (_FRAME_WIDTH - width) / 2, baseline, line)
+            elif line:
+                c.drawString(x, baseline, line)
+            if link:
+                c.linkAbsolute("", link, (x, self.y - style.leading, x + width, self.y))
+            self.y -= style.leading
+            self.at_top = False
+        self.y -= style.space_after
+
+
+def build_pdf_fast_to(
+    out: str | BinaryIO, title: str, body_blocks: list[BodyBlock], references: list[str]
+) -> None:
+    """
+    Same document as build_pdf_to, drawn directly on a canvas: headings,
+    paragraphs and references need only line wrapping, so the flowable
+    machinery is skipped. TOC entries link to named destinations at each
+    heading exactly as in the platypus version.
+    """
+    body_blocks, references = _within_limit(body_blocks, references)
+    c = Canvas(out, pagesize=letter, invariant=1)
+    c.setTitle(title)
+    layout = _FastLayout(c)
+    layout.block(title, _FAST_TITLE, centred=True)
+    layout.y -= 0.15 * inch
+
+    toc_entries = _unique_anchor_ids(body_blocks)
+    if toc_entries or references:
+        layout.block("Table of Contents", _FAST_H2)
+        layout.y -= 0.12 * inch
+        for block, anchor_id in toc_entries:
+            indent = _TOC_INDENT if block["type"] == "h3" else 0
+            layout.block(block["text"], _FAST_NORMAL, indent=indent, link=anchor_id)
+            layout.y -= 0.06 * inch
+        if references:
+            layout.block("References", _FAST_NORMAL, link="references")
+            layout.y -= 0.06 * inch
+        layout.y -= 0.2 * inch
+
+    toc_index = 0
+    for b in body_blocks:
+        if b["type"] in ("h2", "h3"):
+            anchor_id = toc_entries[toc_index][1] if toc_index < len(toc_entries) else None
+            toc_index += 1
+            style = _FAST_H2 if b["type"] == "h2" else _FAST_H3
+            # Keep a heading on the same page as the first line after it
+            layout.block(b["text"], style, anchor=anchor_id, keep_with_next=_FAST_NORMAL.leading)
+        else:
+            layout.block(b["text"], _FAST_NORMAL)
+        layout.y -= 0.1 * inch
+
+    if references:
+        layout.y -= 0.25 * inch
+        layout.block("References", _FAST_H2, anchor="references", keep_with_next=_FAST_NORMAL.leading)
+        layout.y -= 0.15 * inch
+        for ref in references:
+            layout.block(ref.replace("\n", " "), _FAST_NORMAL)
+            layout.y -= 0.08 * inch
+
+    c.save()
+
+
+RENDERERS = {"platypus": build_pdf_to, "fast": build_pdf_fast_to}
@@ -102,6 +102,111 @@ async function apiFetch(path, options = {}) {
   return res;
 }
 
+// Cross-device sync: /api/events pushes the server's version of each collection
+// whenever one changes, and only the collections another device changed are
+// re-fetched. Each collection's GET returns the version it holds, so a change
+// made between loading it and connecting to the stream is still fetched.
+// Keys are the API paths the collections are served from.
+const SYNC_COLLECTIONS = {
+  "read-log": { key: "log", apply: (v) => { readLogCache = v; }, render: () => renderReadLog() },
+  "user-links": {
+    key: "links",
+    apply: (v) => { userLinksCache = v; },
+    render: () => { renderUserLinks(); renderCategoryPanelLinkLists(); }
+  },
+  "link-lists": {
+    key: "linkLists",
+    apply: (v) => { linkListsCache = v; },
+    render: () => { renderUserLinks(); renderCategoryPanelLinkLists(); updateCategoryLabel(); }
+  },
+  presets: { key: "presets", apply: (v) => { presetsCache = v; }, render: () => renderPresets() },
+  "currently-reading": {
+    key: "items",
+    apply: (v) => { currentlyReadingCache = v; },
+    render: () => renderCurrentlyReading()
+  },
+  "link-posts": { key: "items", apply: (v) => { linkPostsCache = v; }, render: () => renderLinkPosts() }
+};
+
+let syncSource = null;
+let syncVersions = {}; // version of each collection this client holds
+let syncLatest = {}; // latest version the server announced
+const syncPending = {}; // saves in flight, per collection
+const syncRefreshing = {};
+
+// Called with each collection's GET response: it carries the version it holds
+function holdVersion(name, data) {
+  if (typeof data.version === "number") {
+    syncVersions[name] = Math.max(syncVersions[name] || 0, data.version);
+  }
+}
+
+function startSync() {
+  if (syncSource) syncSource.close();
+  syncSource = null;
+  if (loggedInUser === null || typeof EventSource === "undefined") return;
+  syncSource = new EventSource("/api/events", { withCredentials: true });
+  syncSource.addEventListener("versions", (e) => {
+    let versions;
+    try {
+      versions = JSON.parse(e.data);
+    } catch {
+      return;
+    }
+    for (const [name, version] of Object.entries(versions)) {
+      if (!SYNC_COLLECTIONS[name]) continue;
+      syncLatest[name] = version;
+      refreshCollection(name);
+    }
+  });
+}
+
+function stopSync() {
+  if (syncSource) syncSource.close();
+  syncSource = null;
+  syncVersions = {};
+  syncLatest = {};
+}
+
+async function refreshCollection(name) {
+  const spec = SYNC_COLLECTIONS[name];
+  if (syncRefreshing[name]) return;
+  syncRefreshing[name] = true;
+  try {
+    // A local save in flight wins; its response carries the version to hold
+    while (loggedInUser !== null && !syncPending[name] && (syncLatest[name] || 0) > (syncVersions[name] || 0)) {
+      const version = syncLatest[name];
+      const res = await apiFetch("/api/" + name);
+      if (!res.ok) return;
+      const data = await res.json();
+      if (loggedInUser === null || syncPending[name]) return;
+      spec.apply(data[spec.key] || []);
+      syncVersions[name] = Math.max(syncVersions[name] || 0, typeof data.version === "number" ? data.version : version);
+      spec.render();
+    }
+  } catch (e) {
+    console.error(`Failed to refresh ${name}:`, e);
+  } finally {
+    syncRefreshing[name] = false;
+  }
+}
+
+function trackSave(name, request) {
+  syncPending[name] = (syncPending[name] || 0) + 1;
+  return request
+    .then(async (res) => {
+      const data = res.ok ? await res.clone().json().catch(() => ({})) : {};
+      if (typeof data.version === "number") {
+        syncVersions[name] = Math.max(syncVersions[name] || 0, data.version);
+      }
+      return res;
+    })
+    .finally(() => {
+      syncPending[name] -= 1;
+      if (!syncPending[name]) refreshCollection(name);
+    });
+}
+
 function getReadLog() {
   if (loggedInUser !== null && readLogCache !== null) {
     return readLogCache;
@@ -117,11 +222,11 @@ function getReadLog() {
 function saveReadLog(log) {
   if (loggedInUser !== null) {
     readLogCache = [...log];
-    apiFetch("/api/read-log", {
+    trackSave("read-log", apiFetch("/api/read-log", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ log })
-    }).catch((e) => console.error("Failed to sync read log:", e));
+    })).catch((e) => console.error("Failed to sync read log:", e));
     return;
   }
   try {
@@ -191,11 +296,11 @@ function getCurrentlyReading() {
 function saveCurrentlyReading(items) {
   if (loggedInUser !== null) {
     currentlyReadingCache = [...items];
-    apiFetch("/api/currently-reading", {
+    trackSave("currently-reading", apiFetch("/api/currently-reading", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ items })
-    }).catch((e) => console.error("Failed to sync currently reading:", e));
+    })).catch((e) => console.error("Failed to sync currently reading:", e));
     return;
   }
   try {
@@ -299,11 +404,11 @@ function getLinkPosts() {
 function saveLinkPosts(items) {
   if (loggedInUser !== null) {
     linkPostsCache = [...items];
-    apiFetch("/api/link-posts", {
+    trackSave("link-posts", apiFetch("/api/link-posts", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ items })
-    }).catch((e) => console.error("Failed to sync link posts:", e));
+    })).catch((e) => console.error("Failed to sync link posts:", e));
     return;
   }
   try {
@@ -449,11 +554,11 @@ function getUserLinks() {
 function saveUserLinks(links) {
   if (loggedInUser !== null) {
     userLinksCache = [...links];
-    apiFetch("/api/user-links", {
+    trackSave("user-links", apiFetch("/api/user-links", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ links })
-    }).catch((e) => console.error("Failed to sync user links:", e));
+    })).catch((e) => console.error("Failed to sync user links:", e));
     return;
   }
   try {
@@ -627,11 +732,11 @@ function getLinkLists() {
 function saveLinkLists(linkLists) {
   if (loggedInUser !== null) {
     linkListsCache = [...linkLists];
-    apiFetch("/api/link-lists", {
+    trackSave("link-lists", apiFetch("/api/link-lists", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ linkLists })
-    }).catch((e) => console.error("Failed to sync link lists:", e));
+    })).catch((e) => console.error("Failed to sync link lists:", e));
     return;
   }
   try {
@@ -721,11 +826,11 @@ function getPresets() {
 function savePresets(presets) {
   if (loggedInUser !== null) {
     presetsCache = [...presets];
-    apiFetch("/api/presets", {
+    trackSave("presets", apiFetch("/api/presets", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ presets })
-    }).catch((e) => console.error("Failed to sync presets:", e));
+    })).catch((e) => console.error("Failed to sync presets:", e));
     return;
   }
   try {
@@ -1100,6 +1205,9 @@ function renderUserLinks() {
   renderAddLinkLists();
 }
 
+// Groups by the reader's local month. /api/read-log/stats counts months in
+// UTC ("timezone" in its response), so reads near midnight at the turn of a
+// month can land in different months there.
 function groupLogByMonth(log) {
   const byMonth = new Map();
   for (let i = 0; i < log.length; i++) {
@@ -1516,10 +1624,12 @@ async function initAuth() {
     if (!res.ok) return;
     const data = await res.json();
     if (data.username) {
+      stopSync();
       loggedInUser = data.username;
       const logRes = await apiFetch("/api/read-log");
       if (logRes.ok) {
         const logData = await logRes.json();
+        holdVersion("read-log", logData);
         const serverLog = logData.log || [];
         const localLog = (() => {
           try {
@@ -1541,6 +1651,7 @@ async function initAuth() {
       const linksRes = await apiFetch("/api/user-links");
       if (linksRes.ok) {
         const linksData = await linksRes.json();
+        holdVersion("user-links", linksData);
         const serverLinks = linksData.links || [];
         const localLinks = (() => {
           try {
@@ -1562,6 +1673,7 @@ async function initAuth() {
       const linkListsRes = await apiFetch("/api/link-lists");
       if (linkListsRes.ok) {
         const linkListsData = await linkListsRes.json();
+        holdVersion("link-lists", linkListsData);
         const serverLists = linkListsData.linkLists || [];
         const localLists = (() => {
           try {
@@ -1583,6 +1695,7 @@ async function initAuth() {
       const presetsRes = await apiFetch("/api/presets");
       if (presetsRes.ok) {
         const presetsData = await presetsRes.json();
+        holdVersion("presets", presetsData);
         const serverPresets = presetsData.presets || [];
         const localPresets = (() => {
           try {
@@ -1604,6 +1717,7 @@ async function initAuth() {
       const currentlyReadingRes = await apiFetch("/api/currently-reading");
       if (currentlyReadingRes.ok) {
         const crData = await currentlyReadingRes.json();
+        holdVersion("currently-reading", crData);
         const serverCR = crData.items || [];
         const localCR = (() => {
           try {
@@ -1625,6 +1739,7 @@ async function initAuth() {
       const linkPostsRes = await apiFetch("/api/link-posts");
       if (linkPostsRes.ok) {
         const lpData = await linkPostsRes.json();
+        holdVersion("link-posts", lpData);
         const serverLP = lpData.items || [];
         const localLP = (() => {
           try {
@@ -1643,6 +1758,7 @@ async function initAuth() {
       } else {
         linkPostsCache = [];
       }
+      startSync();
     }
   } catch {
     // No backend (e.g. static serve)
@@ -1725,10 +1841,12 @@ async function handleAuthSubmit(e) {
         return;
       }
       const loginData = await loginRes.json();
+      stopSync();
       loggedInUser = loginData.username || username;
       const logRes = await apiFetch("/api/read-log");
       if (logRes.ok) {
         const logData = await logRes.json();
+        holdVersion("read-log", logData);
         readLogCache = logData.log || [];
       } else {
         readLogCache = [];
@@ -1736,6 +1854,7 @@ async function handleAuthSubmit(e) {
       const linksRes = await apiFetch("/api/user-links");
       if (linksRes.ok) {
         const linksData = await linksRes.json();
+        holdVersion("user-links", linksData);
         userLinksCache = linksData.links || [];
       } else {
         userLinksCache = [];
@@ -1743,6 +1862,7 @@ async function handleAuthSubmit(e) {
       const linkListsRes = await apiFetch("/api/link-lists");
       if (linkListsRes.ok) {
         const linkListsData = await linkListsRes.json();
+        holdVersion("link-lists", linkListsData);
         linkListsCache = linkListsData.linkLists || [];
       } else {
         linkListsCache = [];
@@ -1750,6 +1870,7 @@ async function handleAuthSubmit(e) {
       const presetsRes = await apiFetch("/api/presets");
       if (presetsRes.ok) {
         const presetsData = await presetsRes.json();
+        holdVersion("presets", presetsData);
         presetsCache = presetsData.presets || [];
       } else {
         presetsCache = [];
@@ -1757,6 +1878,7 @@ async function handleAuthSubmit(e) {
       const currentlyReadingRes = await apiFetch("/api/currently-reading");
       if (currentlyReadingRes.ok) {
         const crData = await currentlyReadingRes.json();
+        holdVersion("currently-reading", crData);
         currentlyReadingCache = crData.items || [];
       } else {
         currentlyReadingCache = [];
@@ -1764,10 +1886,12 @@ async function handleAuthSubmit(e) {
       const linkPostsRes = await apiFetch("/api/link-posts");
       if (linkPostsRes.ok) {
         const lpData = await linkPostsRes.json();
+        holdVersion("link-posts", lpData);
         linkPostsCache = lpData.items || [];
       } else {
         linkPostsCache = [];
       }
+      startSync();
       closeAuthModal();
       updateAuthUI();
       renderReadLog();
@@ -1785,10 +1909,12 @@ async function handleAuthSubmit(e) {
       errorEl.style.display = "block";
       return;
     }
+    stopSync();
     loggedInUser = data.username || username;
     const logRes = await apiFetch("/api/read-log");
     if (logRes.ok) {
       const logData = await logRes.json();
+      holdVersion("read-log", logData);
       readLogCache = logData.log || [];
     } else {
       readLogCache = [];
@@ -1796,6 +1922,7 @@ async function handleAuthSubmit(e) {
     const linksRes = await apiFetch("/api/user-links");
     if (linksRes.ok) {
       const linksData = await linksRes.json();
+      holdVersion("user-links", linksData);
       userLinksCache = linksData.links || [];
     } else {
       userLinksCache = [];
@@ -1803,6 +1930,7 @@ async function handleAuthSubmit(e) {
     const linkListsRes = await apiFetch("/api/link-lists");
     if (linkListsRes.ok) {
       const linkListsData = await linkListsRes.json();
+      holdVersion("link-lists", linkListsData);
       linkListsCache = linkListsData.linkLists || [];
     } else {
       linkListsCache = [];
@@ -1810,6 +1938,7 @@ async function handleAuthSubmit(e) {
     const presetsRes = await apiFetch("/api/presets");
     if (presetsRes.ok) {
       const presetsData = await presetsRes.json();
+      holdVersion("presets", presetsData);
       presetsCache = presetsData.presets || [];
     } else {
       presetsCache = [];
@@ -1817,6 +1946,7 @@ async function handleAuthSubmit(e) {
     const currentlyReadingRes = await apiFetch("/api/currently-reading");
     if (currentlyReadingRes.ok) {
       const crData = await currentlyReadingRes.json();
+      holdVersion("currently-reading", crData);
       currentlyReadingCache = crData.items || [];
     } else {
       currentlyReadingCache = [];
@@ -1824,10 +1954,12 @@ async function handleAuthSubmit(e) {
     const linkPostsRes = await apiFetch("/api/link-posts");
     if (linkPostsRes.ok) {
       const lpData = await linkPostsRes.json();
+      holdVersion("link-posts", lpData);
       linkPostsCache = lpData.items || [];
     } else {
       linkPostsCache = [];
     }
+    startSync();
     closeAuthModal();
     updateAuthUI();
     renderReadLog();
@@ -1849,6 +1981,7 @@ async function handleLogout() {
   } catch {
     // ignore
   }
+  stopSync();
   loggedInUser = null;
   readLogCache = null;
   userLinksCache = null;
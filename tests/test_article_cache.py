@@ -0,0 +1,55 @@
+import os
+
+from lib.article_cache import ArticleCache
+from lib.article_ir import Article
+
+
+def _article(title, size=2000):
+    return Article.from_blocks(title, [{"type": "p", "text": os.urandom(size // 2).hex()}], [], 42)
+
+
+def test_corrupt_disk_entry_is_discarded(tmp_path):
+    ArticleCache(1 << 20, disk_dir=tmp_path).put("Alan Turing", _article("Alan Turing"))
+    (path,) = tmp_path.glob("*.bin")
+    data = path.read_bytes()
+    path.write_bytes(data[:40] + b"\xff" * 40 + data[80:])
+    # A fresh process sees only the disk tier
+    cache = ArticleCache(1 << 20, disk_dir=tmp_path)
+    assert cache.get("Alan Turing") is None
+    assert not path.exists()
+
+
+def test_disk_entry_round_trips(tmp_path):
+    article = _article("Entropy")
+    ArticleCache(1 << 20, disk_dir=tmp_path).put("Entropy", article)
+    entry = ArticleCache(1 << 20, disk_dir=tmp_path).get("Entropy")
+    assert entry is not None and entry.revid == 42 and entry.article() == article
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    cache = ArticleCache(1 << 20, disk_dir=tmp_path, disk_max_bytes=10_000)
+    for i in range(20):
+        cache.put(f"Article {i}", _article(f"Article {i}"))
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.bin")) <= 10_000
+    # The newest entry is kept
+    assert ArticleCache(1 << 20, disk_dir=tmp_path).get("Article 19") is not None
+
+
+def test_stale_temp_files_are_removed(tmp_path):
+    leftover = tmp_path / "crashed.tmp"
+    leftover.write_bytes(b"partial")
+    os.utime(leftover, (0, 0))
+    cache = ArticleCache(1 << 20, disk_dir=tmp_path, disk_max_bytes=1000)
+    cache.put("A", _article("A"))
+    cache.put("B", _article("B"))
+    assert not leftover.exists()
+
+
+def test_rewriting_a_disk_entry_counts_its_bytes_once(tmp_path):
+    cache = ArticleCache(1 << 20, disk_dir=tmp_path)
+    for _ in range(3):
+        cache.put("Entropy", _article("Entropy"))
+    cache.put("Heat", _article("Heat"))
+    assert cache._disk_bytes == sum(p.stat().st_size for p in tmp_path.glob("*.bin"))
+    cache.discard("Heat")
+    assert cache._disk_bytes == sum(p.stat().st_size for p in tmp_path.glob("*.bin"))
@@ -0,0 +1,125 @@
+import struct
+import zlib
+
+import pytest
+
+from lib.article_ir import MAGIC, Article
+
+
+def _article(**overrides):
+    fields = {
+        "title": "Alan Turing",
+        "body_blocks": [
+            {"type": "p", "text": "Alan Mathison Turing was an English mathematician."},
+            {"type": "h2", "text": "Early life"},
+            {"type": "h3", "text": "Childhood"},
+            {"type": "p", "text": "Turing was born in Maida Vale, London."},
+        ],
+        "references": ["Hodges, Andrew (1983). Alan Turing: The Enigma.", "Copeland (2004)."],
+        "revid": 1234567890,
+    }
+    fields.update(overrides)
+    return Article.from_blocks(**fields)
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip(compress):
+    article = _article()
+    data = article.to_bytes(compress=compress)
+    decoded = Article.from_bytes(data)
+    assert decoded == article
+    assert decoded.body_blocks == article.body_blocks
+    assert Article.read_revid(data) == 1234567890
+
+
+def test_compressed_blob_is_smaller_for_repetitive_text():
+    article = _article(body_blocks=[{"type": "p", "text": "the quick brown fox " * 50}] * 20)
+    assert len(article.to_bytes(compress=True)) < len(article.to_bytes(compress=False)) / 10
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_empty_article(compress):
+    article = Article.from_blocks("", [], [], None)
+    data = article.to_bytes(compress=compress)
+    decoded = Article.from_bytes(data)
+    assert decoded == article
+    assert decoded.body_blocks == [] and decoded.references == () and decoded.title == ""
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_non_ascii_text(compress):
+    article = _article(
+        title="Schrödinger equation",
+        body_blocks=[
+            {"type": "p", "text": "iħ ∂Ψ/∂t = ĤΨ — Erwin Schrödinger, 1925"},
+            {"type": "h2", "text": "薛定谔方程"},
+            {"type": "p", "text": "Emoji survive too: 🐈‍⬛ ✓"},
+        ],
+        references=["Schrödinger, E. (1926). «Quantisierung als Eigenwertproblem»."],
+    )
+    assert Article.from_bytes(article.to_bytes(compress=compress)) == article
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_none_revid(compress):
+    data = _article(revid=None).to_bytes(compress=compress)
+    assert Article.read_revid(data) is None
+    assert Article.from_bytes(data).revid is None
+
+
+def test_revid_zero_is_kept():
+    data = _article(revid=0).to_bytes()
+    assert Article.read_revid(data) == 0
+    assert Article.from_bytes(data).revid == 0
+
+
+@pytest.mark.parametrize("compress", [True, False])
+@pytest.mark.parametrize("keep", [0, 10, 22, 30, -1])
+def test_truncated_blob(compress, keep):
+    data = _article().to_bytes(compress=compress)
+    with pytest.raises(ValueError):
+        Article.from_bytes(data[:keep])
+
+
+@pytest.mark.parametrize("keep", [0, 10])
+def test_truncated_header_in_read_revid(keep):
+    with pytest.raises(ValueError):
+        Article.read_revid(_article().to_bytes()[:keep])
+
+
+def test_bad_magic():
+    data = b"NOPE" + _article().to_bytes()[len(MAGIC):]
+    with pytest.raises(ValueError):
+        Article.read_revid(data)
+    with pytest.raises(ValueError):
+        Article.from_bytes(data)
+
+
+def test_unknown_version():
+    data = bytearray(_article().to_bytes())
+    data[len(MAGIC)] = 99
+    with pytest.raises(ValueError):
+        Article.from_bytes(bytes(data))
+
+
+def test_corrupt_compressed_body():
+    data = bytearray(_article().to_bytes(compress=True))
+    header_size = struct.calcsize("<4sBBqII")
+    data[header_size + 5:header_size + 25] = b"\xff" * 20
+    with pytest.raises(ValueError):
+        Article.from_bytes(bytes(data))
+
+
+def test_compressed_payload_with_wrong_lengths():
+    data = _article().to_bytes(compress=True)
+    header_size = struct.calcsize("<4sBBqII")
+    payload = zlib.decompress(data[header_size:])
+    with pytest.raises(ValueError):
+        Article.from_bytes(data[:header_size] + zlib.compress(payload[:-5]))
+
+
+def test_unknown_block_kind():
+    data = bytearray(_article().to_bytes(compress=False))
+    data[struct.calcsize("<4sBBqII")] = 7
+    with pytest.raises(ValueError):
+        Article.from_bytes(bytes(data))
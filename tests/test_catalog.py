@@ -0,0 +1,20 @@
+import vital_article
+
+
+def test_random_pick_survives_unwritable_catalog(monkeypatch, tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setenv("CATALOG_DIR", str(blocker / "catalog"))
+    monkeypatch.setattr(vital_article, "_SCRAPED_LINKS", {})
+    monkeypatch.setattr(vital_article, "is_offline", lambda: False)
+    scrapes = []
+
+    def scrape(category):
+        scrapes.append(category)
+        return ["/wiki/Entropy", "/wiki/Energy"]
+
+    monkeypatch.setattr(vital_article, "_scrape_category_links", scrape)
+    picks = {vital_article.get_random_vital_article("physics") for _ in range(20)}
+    assert picks <= {"https://en.wikipedia.org/wiki/Entropy", "https://en.wikipedia.org/wiki/Energy"}
+    assert None not in picks
+    assert scrapes == ["physics"]
@@ -0,0 +1,21 @@
+import statistics
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from bench_coldstart import BUDGETS_MS, LAZY_PACKAGES, _run, import_wall_ms  # noqa: E402
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS_MS))
+def test_entry_point_defers_heavy_packages(module):
+    code = f"import sys, {module}; print(' '.join(p for p in {LAZY_PACKAGES!r} if p in sys.modules))"
+    assert _run(code).stdout.split() == []
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS_MS))
+def test_entry_point_imports_within_budget(module):
+    median = statistics.median(import_wall_ms(module) for _ in range(3))
+    assert median <= BUDGETS_MS[module]
@@ -0,0 +1,83 @@
+import asyncio
+import io
+import json
+import zipfile
+from pathlib import Path
+
+from starlette.requests import Request
+
+import batch_export
+import vital_article
+from lib.article_ir import Article
+
+
+def test_evicted_cache_file_is_rendered_again(tmp_path):
+    missing = tmp_path / "gone.bin"
+    assert vital_article._cached_file_response(missing, "text/plain", {}) is None
+    present = tmp_path / "here.bin"
+    present.write_bytes(b"rendered")
+    response = vital_article._cached_file_response(present, "text/plain", {})
+    assert response is not None and Path(response.path) == present
+
+
+def _download(monkeypatch, format, renderer, env_renderer="platypus"):
+    monkeypatch.setattr(vital_article, "PDF_RENDERER", env_renderer)
+    monkeypatch.setattr(vital_article, "get_render_cache", lambda: (None, None))
+    article = Article.from_blocks("Entropy", [{"type": "p", "text": "Disorder."}], [], 7)
+    request = Request({"type": "http", "method": "GET", "headers": [], "query_string": b""})
+    return asyncio.run(vital_article._download_response(request, article, format, renderer))
+
+
+def test_text_download_ignores_renderer(monkeypatch):
+    assert _download(monkeypatch, "txt", "bogus").status_code == 200
+    assert _download(monkeypatch, "txt", None, env_renderer="bogus").status_code == 200
+
+
+def test_pdf_download_rejects_unknown_renderer(monkeypatch):
+    assert _download(monkeypatch, "pdf", "bogus").status_code == 400
+
+
+def _batch(monkeypatch, body):
+    monkeypatch.setattr(vital_article, "verify_session", lambda session_id: "ada")
+    monkeypatch.setattr(
+        vital_article,
+        "get_link_lists",
+        lambda username: [{"id": "l1", "urls": ["https://en.wikipedia.org/wiki/Entropy", "https://example.com/x"]}],
+    )
+    monkeypatch.setattr(
+        batch_export,
+        "fetch_article",
+        lambda url: Article.from_blocks("Entropy", [{"type": "p", "text": "Disorder."}], [], 7),
+    )
+    request = Request(
+        {"type": "http", "method": "POST", "headers": [], "query_string": b""},
+        receive=_receive(json.dumps(body).encode()),
+    )
+
+    async def run():
+        response = await vital_article.download_batch(request)
+        if response.status_code != 200:
+            return response.status_code, None
+        return 200, b"".join([chunk async for chunk in response.body_iterator])
+
+    return asyncio.run(run())
+
+
+def _receive(body):
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return receive
+
+
+def test_link_list_batch_skips_non_article_urls(monkeypatch):
+    status, data = _batch(monkeypatch, {"linkListId": "l1"})
+    assert status == 200
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert sorted(zf.namelist()) == ["Entropy.txt", "errors.txt"]
+        assert zf.read("errors.txt").decode() == "https://example.com/x: Not a Wikipedia article URL\n"
+
+
+def test_explicit_batch_rejects_non_article_urls(monkeypatch):
+    status, _ = _batch(monkeypatch, {"urls": ["https://en.wikipedia.org/wiki/Entropy", "https://example.com/x"]})
+    assert status == 400
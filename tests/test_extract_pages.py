@@ -0,0 +1,17 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from wiki_content import extract_article
+
+PAGES = sorted((Path(__file__).parent / "pages").glob("*.html"))
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda p: p.stem)
+def test_saved_page_extracts_as_expected(page):
+    title, blocks, refs = extract_article(page.read_text(encoding="utf-8"))
+    expected = json.loads(page.with_suffix(".json").read_text(encoding="utf-8"))
+    assert title == expected["title"]
+    assert blocks == expected["blocks"]
+    assert refs == expected["references"]
@@ -0,0 +1,88 @@
+import pytest
+
+from lib import link_metadata
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://en.wikipedia.org/wiki/Alan_Turing",
+        "http://en.wikipedia.org/wiki/Entropy",
+        "https://en.m.wikipedia.org/wiki/Entropy",
+        "https://EN.Wikipedia.org/wiki/Entropy",
+    ],
+)
+def test_english_wikipedia_articles_are_enriched(url):
+    assert link_metadata._is_article_url(url)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://de.wikipedia.org/wiki/Entropie",
+        "https://fr.m.wikipedia.org/wiki/Entropie",
+        "https://evilwikipedia.org/wiki/Entropy",
+        "https://en.wikipedia.org.evil.example/wiki/Entropy",
+        "https://en.wikipedia.org/w/index.php?title=Entropy",
+        "ftp://en.wikipedia.org/wiki/Entropy",
+        "not a url",
+    ],
+)
+def test_other_links_are_skipped(url):
+    assert not link_metadata._is_article_url(url)
+
+
+def test_enrich_skips_other_wikis(monkeypatch):
+    looked_up = []
+
+    def fake_fetch(titles):
+        looked_up.extend(titles)
+        return {t: {"title": t, "description": None, "thumbnail": None, "length": 1} for t in titles}
+
+    monkeypatch.setattr("wiki_content.fetch_page_metadata", fake_fetch)
+    monkeypatch.setattr(link_metadata, "_CACHE", link_metadata.MetadataCache(60, 100))
+    meta = link_metadata.enrich_urls(
+        ["https://en.wikipedia.org/wiki/Entropy", "https://de.wikipedia.org/wiki/Entropie"]
+    )
+    assert list(meta) == ["https://en.wikipedia.org/wiki/Entropy"]
+    assert looked_up == ["Entropy"]
+
+
+class _SharedBlobs:
+    def __init__(self):
+        self.blobs = {}
+
+    def get_blobs(self, keys):
+        return {k: self.blobs[k] for k in keys if k in self.blobs}
+
+    def set_blobs(self, items, ttl_seconds):
+        self.blobs.update(items)
+
+
+def test_cold_instance_reads_metadata_another_instance_fetched(monkeypatch):
+    storage = _SharedBlobs()
+    monkeypatch.setattr("lib.storage.get_storage", lambda: storage)
+    looked_up = []
+
+    def fake_fetch(titles):
+        looked_up.extend(titles)
+        return {t: {"title": t, "description": None, "thumbnail": None, "length": 1} for t in titles}
+
+    monkeypatch.setattr("wiki_content.fetch_page_metadata", fake_fetch)
+    urls = ["https://en.wikipedia.org/wiki/Entropy", "https://en.wikipedia.org/wiki/Alan_Turing"]
+    monkeypatch.setattr(link_metadata, "_CACHE", link_metadata.MetadataCache(60, 100, shared=True))
+    first = link_metadata.enrich_urls(urls)
+    # A second instance, starting with an empty LRU
+    monkeypatch.setattr(link_metadata, "_CACHE", link_metadata.MetadataCache(60, 100, shared=True))
+    assert link_metadata.enrich_urls(urls) == first
+    assert sorted(looked_up) == ["Alan Turing", "Entropy"]
+
+
+def test_expired_shared_metadata_is_ignored(monkeypatch):
+    storage = _SharedBlobs()
+    monkeypatch.setattr("lib.storage.get_storage", lambda: storage)
+    meta = {"title": "Entropy", "description": None, "thumbnail": None, "length": 1}
+    link_metadata.MetadataCache(60, 100, shared=True).put_many({"Entropy": meta})
+    assert link_metadata.MetadataCache(60, 100, shared=True).get_many(["Entropy"]) == {"Entropy": meta}
+    monkeypatch.setattr(link_metadata.time, "time", lambda: 1e12)
+    assert link_metadata.MetadataCache(60, 100, shared=True).get_many(["Entropy"]) == {}
@@ -0,0 +1,109 @@
+import io
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+
+import pdf_builder
+from pdf_builder import _FAST_NORMAL, _FRAME_WIDTH, _FastLayout
+
+
+@pytest.fixture
+def layout():
+    return _FastLayout(Canvas(io.BytesIO()))
+
+
+def _check(lines, text, width):
+    for line, line_width in lines:
+        assert line_width <= width + 1e-6
+        assert line_width == pytest.approx(stringWidth(line, _FAST_NORMAL.font, _FAST_NORMAL.size))
+    # Nothing is lost: the lines hold the same characters, in order
+    assert "".join(line.replace(" ", "") for line, _ in lines) == text.replace(" ", "")
+
+
+def test_plain_wrap(layout):
+    text = "The quick brown fox jumps over the lazy dog. " * 20
+    lines = layout.wrap(text, _FAST_NORMAL, _FRAME_WIDTH)
+    assert len(lines) > 1
+    _check(lines, text, _FRAME_WIDTH)
+
+
+def test_long_url_is_broken_across_lines(layout):
+    url = "https://example.org/" + "very-long-path-segment/" * 30
+    text = f"See {url} for details."
+    lines = layout.wrap(text, _FAST_NORMAL, _FRAME_WIDTH)
+    assert len(lines) >= 3
+    _check(lines, text, _FRAME_WIDTH)
+    # The URL starts on the first line, after "See", rather than leaving it short
+    assert lines[0][0].startswith("See https://")
+
+
+def test_long_chemical_name_in_narrow_column(layout):
+    name = "methionylthreonylthreonylglutaminylarginyltyrosylglutamylserylleucylphenylalanyl" * 3
+    lines = layout.wrap(name, _FAST_NORMAL, 100)
+    _check(lines, name, 100)
+
+
+def test_character_wider_than_the_line_gets_its_own_line(layout):
+    lines = layout.wrap("ab WWW cd", _FAST_NORMAL, 5)
+    assert [line for line, _ in lines] == ["a", "b", "W", "W", "W", "c", "d"]
+
+
+def test_fast_renderer_output_stays_in_frame():
+    blocks = [{"type": "p", "text": "x" * 2000}, {"type": "p", "text": "Normal words after it."}]
+    buffer = io.BytesIO()
+    pdf_builder.build_pdf_fast_to(buffer, "Long words", blocks, [])
+    assert buffer.getvalue().startswith(b"%PDF")
+
+
+def test_long_articles_are_cut_short(monkeypatch):
+    monkeypatch.setattr(pdf_builder, "MAX_TEXT_CHARS", 30)
+    blocks = [{"type": "h2", "text": "Intro"}, {"type": "p", "text": "x" * 15}, {"type": "p", "text": "y" * 15}]
+    assert pdf_builder._within_limit(blocks[:2], ["[1] Ref"]) == (blocks[:2], ["[1] Ref"])
+    cut, refs = pdf_builder._within_limit(blocks, ["[1] Ref"])
+    assert cut == blocks[:2] + [{"type": "p", "text": "y" * 10}, {"type": "p", "text": pdf_builder.TRUNCATED_NOTE}]
+    assert refs == []
+    assert pdf_builder._within_limit(blocks[:2], ["[1] Ref", "[2] Another"]) == (
+        blocks[:2],
+        ["[1] Ref", pdf_builder.TRUNCATED_NOTE],
+    )
+
+
+# Renders the same paragraph string chars times over (so the input itself costs
+# next to nothing) and prints how far rendering raised the peak RSS, in KiB.
+# VmHWM rather than ru_maxrss, which keeps the forking pytest process's peak
+_MEASURE = """
+import os, re, sys
+import pdf_builder
+pdf_builder.MAX_TEXT_CHARS = 400_000
+def peak():
+    with open("/proc/self/status") as f:
+        return int(re.search(r"VmHWM:\\s+(\\d+) kB", f.read()).group(1))
+renderer, chars = sys.argv[1], int(sys.argv[2])
+para = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 18)[:1000]
+blocks = [{"type": "p", "text": para}] * (chars // 1000)
+with open(os.devnull, "wb") as out:
+    pdf_builder.RENDERERS[renderer](out, "T", [], [])
+    before = peak()
+    pdf_builder.RENDERERS[renderer](out, "T", blocks, [])
+print(peak() - before)
+"""
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="reads peak RSS from /proc")
+@pytest.mark.parametrize("renderer", sorted(pdf_builder.RENDERERS))
+def test_render_memory_does_not_grow_with_article_length(renderer):
+    def peak_kib(chars):
+        result = subprocess.run(
+            [sys.executable, "-c", _MEASURE, renderer, str(chars)],
+            cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=True,
+        )
+        return int(result.stdout)
+
+    at_limit, far_over = peak_kib(400_000), peak_kib(4_000_000)
+    # Unbounded, ten times the text costs roughly 10 MiB more here
+    assert far_over - at_limit < 3 * 1024
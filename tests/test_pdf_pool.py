@@ -0,0 +1,57 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from lib.article_ir import Article
+from lib.pdf_pool import PdfRenderPool, RenderQueueFull, RenderTimeout
+
+
+def test_waiting_render_gets_the_next_free_slot(tmp_path):
+    pool = PdfRenderPool(workers=0, max_queue=0, timeout=30)
+    article = Article.from_blocks("Entropy", [{"type": "p", "text": "Disorder."}], [], 7)
+    pool._slots.acquire()  # another job holds the only slot
+    with pytest.raises(RenderQueueFull):
+        pool.render(article, tmp_path, "fast")
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(pool.render(article, tmp_path, "fast", wait=True)))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive() and not results
+    pool._slots.release()
+    waiter.join(10)
+    assert not waiter.is_alive()
+    assert results[0].read_bytes().startswith(b"%PDF")
+    assert pool.stats.rejected == 1
+
+
+def test_timed_out_render_frees_its_worker(tmp_path):
+    pool = PdfRenderPool(workers=1, max_queue=1, timeout=20)
+    small = Article.from_blocks("Entropy", [{"type": "p", "text": "Disorder."}], [], 7)
+    huge = Article.from_blocks("Long", [{"type": "p", "text": "Filler text. " * 200}] * 5000, [], 8)
+    try:
+        assert pool.render(small, tmp_path).exists()  # workers are up
+        stuck = pool._executor
+        workers = list(stuck._processes.values())
+        pool.timeout = 0.5
+        with pytest.raises(RenderTimeout):
+            pool.render(huge, tmp_path)
+        assert pool._executor is not stuck
+        for process in workers:
+            process.join(5)
+            assert not process.is_alive()
+        pool.timeout = 20
+        assert pool.render(small, tmp_path).exists()
+
+        # A job queued behind the stuck one is started again on the new workers
+        stuck_job = pool.submit(huge, tmp_path)
+        queued = pool.submit(small, tmp_path)
+        with pytest.raises(FutureTimeoutError):
+            stuck_job.result(timeout=0.5)
+        assert isinstance(pool._timed_out(stuck_job), RenderTimeout)
+        assert queued.result(timeout=20).exists()
+        assert pool.stats.timed_out == 2 and pool.stats.failed == 0
+        assert pool.in_flight == 0
+    finally:
+        pool.close()
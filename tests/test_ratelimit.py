@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from lib import ratelimit
+from lib.storage import JsonStorage
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setenv("JSON_STORAGE_DIR", str(tmp_path))
+    backend = JsonStorage()
+    monkeypatch.setattr("lib.storage.get_storage", lambda: backend)
+    return backend
+
+
+_GRANTED_LOCK = threading.Lock()
+
+
+def _hammer(limiter, background, granted, stop):
+    """A thread that acquires slots back to back until stop is set, counting grants."""
+
+    def run():
+        while not stop.is_set():
+            if background:
+                with ratelimit.background():
+                    limiter.acquire()
+            else:
+                limiter.acquire()
+            if not stop.is_set():
+                with _GRANTED_LOCK:
+                    granted[background] += 1
+
+    return threading.Thread(target=run, daemon=True)
+
+
+def test_background_waiters_do_not_starve_users(storage):
+    limiter = ratelimit.OutboundLimiter(
+        "test-starve", 10, background_share=0.5, max_wait=30, background_max_wait=30
+    )
+    granted = {True: 0, False: 0}
+    stop = threading.Event()
+    threads = [_hammer(limiter, True, granted, stop) for _ in range(12)]
+    threads += [_hammer(limiter, False, granted, stop) for _ in range(3)]
+    # Start on a window boundary so the run covers whole seconds
+    time.sleep(1 - time.time() % 1)
+    for t in threads:
+        t.start()
+    seconds = 4
+    time.sleep(seconds)
+    stop.set()
+    # Background never gets more than its share; users get the rest
+    assert granted[True] <= 5 * (seconds + 1)
+    assert granted[False] >= 5 * seconds
+    assert granted[True] + granted[False] <= 10 * (seconds + 1)
+
+
+def test_refused_background_attempts_leave_the_window_to_users(storage):
+    limiter = ratelimit.OutboundLimiter("test-refused", 10, background_share=0.5, max_wait=5, background_max_wait=5)
+    window = int(time.time()) + 100
+    background = [limiter._take(window, limiter.background_rate) for _ in range(12)]
+    assert background.count(True) == 5
+    # The seven refused background attempts did not use up the user-facing tokens
+    users = [limiter._take(window, limiter.rate) for _ in range(8)]
+    assert users == [True] * 5 + [False] * 3
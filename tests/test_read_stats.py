@@ -0,0 +1,53 @@
+from datetime import date
+
+import pytest
+
+import auth
+from lib.read_stats import build_stats, stats_view
+from lib.storage import JsonStorage
+
+
+def test_months_and_streaks_are_counted_in_utc():
+    log = [
+        {"date": "2026-01-31T23:30:00.000Z", "category": "physics"},
+        {"date": "2026-02-01T00:15:00.000Z", "category": "physics"},
+    ]
+    view = stats_view(build_stats(log), date(2026, 2, 1))
+    assert view["timezone"] == "UTC"
+    assert view["byMonth"] == {"2026-02": 1, "2026-01": 1}
+    assert view["currentStreak"] == 2
+
+
+def test_entries_without_a_valid_date_are_skipped():
+    stats = build_stats([{"date": "garbage-xx-yy"}, {"date": "2026-13-01"}, {"date": "2026-02-03T10:00:00Z"}])
+    assert stats["total"] == 1
+    assert stats["byMonth"] == {"2026-02": 1}
+    assert stats["firstRead"] == stats["lastRead"] == "2026-02-03"
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setenv("JSON_STORAGE_DIR", str(tmp_path))
+    backend = JsonStorage()
+    monkeypatch.setattr("lib.storage.get_storage", lambda: backend)
+    monkeypatch.setattr(auth, "get_storage", lambda: backend)
+    return backend
+
+
+def test_failed_stats_update_is_rebuilt_on_read(storage, monkeypatch):
+    auth.save_log("ada", [{"date": "2026-02-01T10:00:00Z", "category": "physics"}])
+    assert auth.get_log_stats("ada")["total"] == 1
+
+    save_stats = storage.save_read_log_stats
+    failing = True
+
+    def flaky_save(username, stats):
+        if failing:
+            raise OSError("storage unavailable")
+        save_stats(username, stats)
+
+    monkeypatch.setattr(storage, "save_read_log_stats", flaky_save)
+    log = [{"date": "2026-02-01T10:00:00Z", "category": "physics"}, {"date": "2026-02-02T10:00:00Z"}]
+    assert auth.save_log("ada", log) is not None
+    failing = False
+    assert auth.get_log_stats("ada")["total"] == 2
@@ -0,0 +1,50 @@
+import os
+import time
+
+from lib.render_cache import EVICT_GRACE_SECONDS, RenderCache
+
+
+def _age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(tmp_path, max_bytes=2500)
+    old = cache.put("aa" + "0" * 62, [b"x" * 1000])
+    newer = cache.put("bb" + "0" * 62, [b"x" * 1000])
+    _age(old, EVICT_GRACE_SECONDS + 20)
+    _age(newer, EVICT_GRACE_SECONDS + 10)
+    cache.put("cc" + "0" * 62, [b"x" * 1000])
+    assert not old.exists() and newer.exists()
+
+
+def test_recently_used_files_are_not_evicted(tmp_path):
+    cache = RenderCache(tmp_path, max_bytes=1500)
+    served = cache.put("aa" + "0" * 62, [b"x" * 1000])
+    # Over budget, but the first file was just handed out: it must survive
+    cache.put("bb" + "0" * 62, [b"x" * 1000])
+    assert served.exists()
+    _age(served, EVICT_GRACE_SECONDS + 10)
+    cache.put("cc" + "0" * 62, [b"x" * 1000])
+    assert not served.exists()
+
+
+def test_get_missing_file(tmp_path):
+    assert RenderCache(tmp_path, max_bytes=1000).get("dd" + "0" * 62) is None
+
+
+def test_stale_temp_files_are_removed(tmp_path):
+    cache = RenderCache(tmp_path, max_bytes=500)
+    crashed = tmp_path / "render.pdf.tmp"
+    crashed.write_bytes(b"partial")
+    _age(crashed, 2 * 3600)
+    (tmp_path / "ee").mkdir()
+    crashed_put = tmp_path / "ee" / "x.tmp"
+    crashed_put.write_bytes(b"partial")
+    _age(crashed_put, 2 * 3600)
+    in_progress = tmp_path / "other.pdf.tmp"
+    in_progress.write_bytes(b"rendering")
+    cache.put("ff" + "0" * 62, [b"x" * 1000])
+    assert not crashed.exists() and not crashed_put.exists()
+    assert in_progress.exists()
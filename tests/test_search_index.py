@@ -0,0 +1,53 @@
+import pytest
+
+import auth
+from lib import search_index
+from lib.storage import JsonStorage, _is_search_key, _search_keys_pattern
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setenv("JSON_STORAGE_DIR", str(tmp_path))
+    backend = JsonStorage()
+    monkeypatch.setattr("lib.storage.get_storage", lambda: backend)
+    monkeypatch.setattr(auth, "get_storage", lambda: backend)
+    return backend
+
+
+def _titles(result):
+    return sorted(r["title"] for r in result["results"])
+
+
+def test_index_missed_by_a_failed_save_is_rebuilt(storage, monkeypatch):
+    auth.save_user_links("ada", [{"url": "https://en.wikipedia.org/wiki/Entropy", "title": "Entropy"}])
+    assert _titles(auth.search("ada", "entropy")) == ["Entropy"]
+
+    update = storage.update_search_index
+
+    def unavailable(*args):
+        raise OSError("storage unavailable")
+
+    monkeypatch.setattr(storage, "update_search_index", unavailable)
+    auth.save_user_links("ada", [{"url": "https://en.wikipedia.org/wiki/Enthalpy", "title": "Enthalpy"}])
+    monkeypatch.setattr(storage, "update_search_index", update)
+
+    assert _titles(auth.search("ada", "enthalpy")) == ["Enthalpy"]
+    assert auth.search("ada", "entropy")["total"] == 0
+
+
+def test_index_from_another_format_is_rebuilt(storage):
+    auth.save_log("ada", [{"url": "https://en.wikipedia.org/wiki/Inflation", "date": "2026-02-01"}])
+    assert _titles(auth.search("ada", "inflation")) == ["Inflation"]
+    meta = storage.get_search_docs("ada", [search_index.META_ID])[search_index.META_ID]
+    storage.update_search_index("ada", {}, {search_index.META_ID: ({**meta, "version": 0}, {})})
+    assert _titles(auth.search("ada", "inflation")) == ["Inflation"]
+    meta = storage.get_search_docs("ada", [search_index.META_ID])[search_index.META_ID]
+    assert meta["version"] == search_index.INDEX_VERSION
+
+
+def test_search_keys_are_matched_per_user():
+    assert _search_keys_pattern("a*b") == r"wiki:search:a\*b:*"
+    assert _is_search_key("wiki:search:ada:docs", "ada")
+    assert _is_search_key("wiki:search:ada:t:entropy", "ada")
+    assert not _is_search_key("wiki:search:ada:t:x:docs", "ada")  # user "ada:t:x"
+    assert not _is_search_key("wiki:search:adam:docs", "ada")
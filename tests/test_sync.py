@@ -0,0 +1,26 @@
+import asyncio
+import json
+
+from starlette.requests import Request
+
+import auth
+import vital_article
+from lib.storage import JsonStorage
+
+
+def _get_read_log():
+    request = Request({"type": "http", "method": "GET", "headers": [], "query_string": b""})
+    return json.loads(asyncio.run(vital_article.api_get_read_log(request)).body)
+
+
+def test_collection_get_returns_the_version_it_holds(tmp_path, monkeypatch):
+    monkeypatch.setenv("JSON_STORAGE_DIR", str(tmp_path))
+    backend = JsonStorage()
+    monkeypatch.setattr("lib.storage.get_storage", lambda: backend)
+    monkeypatch.setattr(auth, "get_storage", lambda: backend)
+    monkeypatch.setattr(vital_article, "verify_session", lambda session_id: "ada")
+
+    assert _get_read_log() == {"log": [], "version": 0}
+    entry = {"url": "https://en.wikipedia.org/wiki/Entropy", "date": "2026-02-01T10:00:00Z"}
+    version = auth.save_log("ada", [entry])
+    assert _get_read_log() == {"log": [entry], "version": version}
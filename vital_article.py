@@ -1,94 +1,181 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-import requests
-from bs4 import BeautifulSoup
 import random
-import uvicorn
 
 from auth import (
     SESSION_COOKIE,
+    get_link_lists,
     get_log,
+    get_log_stats,
+    is_admin,
     login as auth_login,
     logout as auth_logout,
     register as auth_register,
     save_log,
+    search,
     verify_session,
 )
 from wiki_content import (
-    fetch_article_content,
-    format_plain_text_with_references,
+    fetch_article,
+    iter_plain_text_with_references,
     safe_filename,
+    start_revalidation_sweeper,
+    wikipedia_get,
 )
-from pdf_builder import build_pdf
+from batch_export import iter_article_zip
+from lib.catalog import SOURCES, get_catalog, is_article_href, publish_catalog
+from lib.article_store import is_offline
+from lib import metrics, search_index, timing
+from lib.http import JSONResponse, install as install_http, read_json
+from lib.link_metadata import enrich_urls
+from lib.pdf_pool import PDF_RENDERERS, RenderQueueFull, RenderTimeout, get_pdf_pool, shutdown_pdf_pool
+from lib.prefetch import Prefetcher
+from lib.render_cache import get_render_cache, render_key
+from lib.sync import collection_version, event_stream
 
-app = FastAPI()
 
-# Configuration: Map categories to their Vital Article URLs
-SOURCES = {
-    "physics": "https://en.wikipedia.org/wiki/Wikipedia:Vital_articles/Level/4/Physical_sciences",
-    "technology": "https://en.wikipedia.org/wiki/Wikipedia:Vital_articles/Level/4/Technology",
-    "economics": "https://en.wikipedia.org/wiki/Wikipedia:Vital_articles/Level/4/Society_and_social_sciences"
-}
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """Stop the PDF render workers when the server shuts down."""
+    yield
+    shutdown_pdf_pool()
+
+
+app = FastAPI(default_response_class=JSONResponse, lifespan=_lifespan)
+install_http(app)
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+def _can_profile(scope) -> bool:
+    """?profile=1 is honoured for users listed in ADMIN_USERS."""
+    return is_admin(verify_session(Request(scope).cookies.get(SESSION_COOKIE)))
+
+
+app.add_middleware(timing.ServerTimingMiddleware, can_profile=_can_profile)
+
+# Article lists live in compiled on-disk catalogs (see lib/catalog.py) that every
+# worker maps read-only, so a category is scraped once and shared by all workers.
+# Catalogs older than this are re-scraped and swapped in atomically.
+CATALOG_MAX_AGE_SECONDS = int(os.environ.get("CATALOG_MAX_AGE_SECONDS") or 7 * 24 * 60 * 60)
+
+
+CATALOG_LOOKUPS = metrics.counter(
+    "catalog_lookups_total", "Random picks by catalog state: hit, stale or miss.", ("category", "result")
+)
+CATALOG_SCRAPE_SECONDS = metrics.histogram(
+    "catalog_scrape_seconds", "Time to scrape a Vital Articles category page.", ("category",)
+)
+
+
+def _scrape_category_links(category: str) -> list[str]:
+    """Scrape a Vital Articles page and return the article hrefs it links to."""
+    # Imported on first scrape: most requests are served from the catalog
+    from bs4 import BeautifulSoup
+
+    url = SOURCES[category]
+    headers = {'User-Agent': 'VitalArticleScraper/1.0 (science_fan@example.com)'}
+
+    response = wikipedia_get(url, headers=headers)
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.content, 'html.parser')
+    content_div = soup.find(id="mw-content-text")
+
+    valid_links = []
+    for link in content_div.find_all('a', href=True):
+        href = link['href']
+        if is_article_href(href):
+            valid_links.append(href)
+    return valid_links
+
+
+# Scraped lists kept in this process when the catalog cannot be published
+# (e.g. a read-only filesystem): {category: (scraped at, hrefs)}
+_SCRAPED_LINKS: dict[str, tuple[float, list[str]]] = {}
 
-# Global cache: {'physics': [url1, url2...], 'technology': [...]}
-# We use a dict so we can lazy-load each category independently.
-ARTICLES_CACHE = {}
 
 def get_random_vital_article(category: str):
-    global ARTICLES_CACHE
-    
     # 1. Input Validation
     if category not in SOURCES:
         return None
 
-    # 2. Check Cache
-    if category in ARTICLES_CACHE and ARTICLES_CACHE[category]:
-        return f"https://en.wikipedia.org{random.choice(ARTICLES_CACHE[category])}"
+    # 2. Check the shared catalog (never stale when offline: dumps publish it)
+    catalog = get_catalog(category)
+    if catalog is not None and len(catalog) and (
+        is_offline() or catalog.age_seconds() < CATALOG_MAX_AGE_SECONDS
+    ):
+        CATALOG_LOOKUPS.inc(category, "hit")
+        return f"https://en.wikipedia.org/wiki/{catalog.random_title()}"
+    scraped = _SCRAPED_LINKS.get(category)
+    if scraped is not None and time.time() - scraped[0] < CATALOG_MAX_AGE_SECONDS:
+        CATALOG_LOOKUPS.inc(category, "hit")
+        return f"https://en.wikipedia.org{random.choice(scraped[1])}"
+    CATALOG_LOOKUPS.inc(category, "stale" if catalog is not None and len(catalog) else "miss")
+    if is_offline():
+        return None
 
-    # 3. Scrape if Cache Miss
-    url = SOURCES[category]
-    headers = {'User-Agent': 'VitalArticleScraper/1.0 (science_fan@example.com)'}
-    
+    # 3. Scrape if missing or stale
     try:
         print(f"Cache miss for '{category}'. Scraping Wikipedia...")
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        content_div = soup.find(id="mw-content-text")
-        
-        valid_links = []
-        for link in content_div.find_all('a', href=True):
-            href = link['href']
-            # Standard Wikipedia Filters
-            if (href.startswith("/wiki/") and 
-                ":" not in href and 
-                "Main_Page" not in href):
-                valid_links.append(href)
-
-        if not valid_links:
-            return None
-            
-        # Update Cache
-        ARTICLES_CACHE[category] = valid_links
-        print(f"Cache populated for '{category}' with {len(valid_links)} articles.")
-        
-        return f"https://en.wikipedia.org{random.choice(ARTICLES_CACHE[category])}"
-
+        with CATALOG_SCRAPE_SECONDS.time(category):
+            valid_links = _scrape_category_links(category)
     except Exception as e:
         print(f"Error scraping {category}: {e}")
+        # Keep serving a stale catalog rather than failing outright
+        if catalog is not None and len(catalog):
+            return f"https://en.wikipedia.org/wiki/{catalog.random_title()}"
+        if scraped is not None:
+            return f"https://en.wikipedia.org{random.choice(scraped[1])}"
         return None
 
+    if not valid_links:
+        return None
+
+    # Publish the catalog for all workers, or keep it in this process if we cannot
+    try:
+        publish_catalog(category, [href[len("/wiki/"):] for href in valid_links])
+        _SCRAPED_LINKS.pop(category, None)
+        print(f"Cache populated for '{category}' with {len(valid_links)} articles.")
+    except OSError as e:
+        print(f"Error publishing catalog for '{category}', keeping it in memory: {e}")
+        _SCRAPED_LINKS[category] = (time.time(), valid_links)
+
+    return f"https://en.wikipedia.org{random.choice(valid_links)}"
+
+
+# Upcoming picks are chosen per session and category and fetched in the
+# background, so the next /random?format=... is served from the article cache.
+PREFETCHER = (
+    Prefetcher(
+        get_random_vital_article,
+        fetch_article,
+        depth=int(os.environ.get("PREFETCH_DEPTH") or 2),
+        max_inflight=int(os.environ.get("PREFETCH_MAX_INFLIGHT") or 2),
+    )
+    if (os.environ.get("PREFETCH_ENABLED") or "1").strip() != "0"
+    else None
+)
+
+
+# Periodically re-check hot cached articles in batched revision lookups.
+REVALIDATE_INTERVAL_SECONDS = float(os.environ.get("REVALIDATE_INTERVAL_SECONDS") or 300)
+if REVALIDATE_INTERVAL_SECONDS > 0 and not is_offline():
+    start_revalidation_sweeper(REVALIDATE_INTERVAL_SECONDS)
+
 
 # --- Auth & read-log API ---
 
 
 @app.post("/api/register")
 async def api_register(request: Request):
-    body = await request.json()
+    body = await read_json(request)
     username = (body.get("username") or "").strip()
     password = body.get("password") or ""
     err = auth_register(username, password)
@@ -99,7 +186,7 @@ async def api_register(request: Request):
 
 @app.post("/api/login")
 async def api_login(request: Request):
-    body = await request.json()
+    body = await read_json(request)
     username = (body.get("username") or "").strip()
     password = body.get("password") or ""
     session_id = auth_login(username, password)
@@ -140,8 +227,9 @@ async def api_get_read_log(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
+    version = collection_version(username, "read-log")
     log = get_log(username)
-    return JSONResponse({"log": log})
+    return JSONResponse({"log": log, "version": version})
 
 
 @app.post("/api/read-log")
@@ -150,69 +238,291 @@ async def api_save_read_log(request: Request):
     username = verify_session(session_id)
     if not username:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
-    body = await request.json()
+    body = await read_json(request)
     log = body.get("log", [])
     if not isinstance(log, list):
         return JSONResponse({"error": "Invalid log"}, status_code=400)
-    save_log(username, log)
-    return JSONResponse({"ok": True})
+    version = save_log(username, log)
+    return JSONResponse({"ok": True, "version": version})
+
+
+@app.get("/api/read-log/stats")
+async def api_read_log_stats(request: Request):
+    """
+    Reads per month and category, streaks and totals, without the log itself.
+    Months, days and streaks are counted in UTC (the read log's ISO dates),
+    not in the reader's local time zone; the response says so in "timezone".
+    """
+    session_id = request.cookies.get(SESSION_COOKIE)
+    username = verify_session(session_id)
+    if not username:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    return JSONResponse(get_log_stats(username))
+
+
+SEARCH_MAX_LIMIT = 50
+
+
+@app.get("/api/search")
+async def api_search(request: Request, q: str = "", kind: str | None = None, offset: int = 0, limit: int = 20):
+    """Ranked matches for q in the user's links, link lists and read log; kind=link|list|log to filter."""
+    session_id = request.cookies.get(SESSION_COOKIE)
+    username = verify_session(session_id)
+    if not username:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    if kind is not None and kind not in search_index.KINDS:
+        return JSONResponse(
+            {"error": f"kind must be one of {', '.join(search_index.KINDS)}"}, status_code=400
+        )
+    offset = max(0, offset)
+    limit = min(max(1, limit), SEARCH_MAX_LIMIT)
+    result = search(username, q, kind, offset, limit)
+    return JSONResponse({"query": q, "offset": offset, "limit": limit, **result})
+
+
+@app.get("/api/events")
+async def api_events(request: Request):
+    """Server-Sent Events stream of the user's collection versions (see lib/sync.py)."""
+    session_id = request.cookies.get(SESSION_COOKIE)
+    username = verify_session(session_id)
+    if not username:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    return StreamingResponse(
+        event_stream(username),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Most URLs one /api/enrich request may ask about
+ENRICH_MAX_URLS = 500
+
+
+@app.post("/api/enrich")
+async def api_enrich(request: Request):
+    """Title, description and thumbnail for each Wikipedia article URL in {"urls": [...]}."""
+    session_id = request.cookies.get(SESSION_COOKIE)
+    username = verify_session(session_id)
+    if not username:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    body = await read_json(request)
+    urls = body.get("urls", [])
+    if not isinstance(urls, list) or len(urls) > ENRICH_MAX_URLS:
+        return JSONResponse({"error": f"urls must be a list of at most {ENRICH_MAX_URLS}"}, status_code=400)
+    return JSONResponse({"meta": await asyncio.to_thread(enrich_urls, urls)})
+
+
+# PDF renderer used when a request does not pick one (see pdf_builder.RENDERERS)
+PDF_RENDERER = (os.environ.get("PDF_RENDERER") or "platypus").strip()
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against etag."""
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _cached_file_response(path: Path, media_type: str, headers: dict) -> FileResponse | None:
+    """A response for a render cache file, or None if it was evicted since the lookup (render again)."""
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
+
+
+def _iter_text_bytes(article):
+    for chunk in iter_plain_text_with_references(article.title, article.iter_block_dicts(), article.references):
+        yield chunk.encode("utf-8")
+
+
+def _iter_file_then_delete(path: Path, chunk_size: int = 64 * 1024):
+    """Stream a temporary file, unlinking it up front so it cannot leak if the client goes away."""
+    f = open(path, "rb")
+    os.unlink(path)
+    with f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+async def _download_response(request: Request, article, format: str, renderer: str | None = None):
+    """
+    Serve article as a PDF or plain-text download. Renders are cached by
+    content (lib/render_cache.py) and served with a strong ETag, so repeat
+    requests get a 304 and partial requests are answered from the file.
+    PDF renders answer 503 when the render queue is full and 504 on timeout.
+    """
+    ext = "pdf" if format == "pdf" else "txt"
+    if ext == "pdf":
+        renderer = renderer or PDF_RENDERER
+        if renderer not in PDF_RENDERERS:
+            return JSONResponse(
+                {"error": f"Unknown renderer; use one of {', '.join(PDF_RENDERERS)}"}, status_code=400
+            )
+    variant = "pdf-fast" if ext == "pdf" and renderer == "fast" else ext
+    media_type = "application/pdf" if ext == "pdf" else "text/plain; charset=utf-8"
+    etag = f'"{render_key(article, variant)}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Content-Disposition": f'attachment; filename="{safe_filename(article.title)}.{ext}"',
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={k: headers[k] for k in ("ETag", "Cache-Control")})
+
+    key = etag.strip('"')
+    cache, shared = get_render_cache()
+    path = await asyncio.to_thread(cache.get, key) if cache is not None else None
+    if path is not None:
+        response = await asyncio.to_thread(_cached_file_response, path, media_type, headers)
+        if response is not None:
+            return response
+
+    data = await asyncio.to_thread(shared.get, key) if shared is not None else None
+    if data is not None:
+        if cache is not None:
+            path = await asyncio.to_thread(cache.put, key, [data])
+            return FileResponse(path, media_type=media_type, headers=headers)
+        return Response(content=data, media_type=media_type, headers=headers)
+
+    if ext == "pdf":
+        try:
+            with timing.phase("render"):
+                path = await get_pdf_pool().render_async(
+                    article, cache.temp_dir if cache is not None else None, renderer
+                )
+        except RenderQueueFull:
+            return JSONResponse(
+                {"error": "PDF renderer is busy, try again shortly"},
+                status_code=503,
+                headers={"Retry-After": "5"},
+            )
+        except RenderTimeout:
+            return JSONResponse({"error": "PDF rendering timed out"}, status_code=504)
+        if shared is not None:
+            await asyncio.to_thread(shared.put_file, key, path)
+        if cache is not None:
+            path = await asyncio.to_thread(cache.adopt, key, path)
+            return FileResponse(path, media_type=media_type, headers=headers)
+        return StreamingResponse(_iter_file_then_delete(path), media_type=media_type, headers=headers)
+
+    if shared is not None:
+        with timing.phase("render"):
+            data = b"".join(_iter_text_bytes(article))
+        await asyncio.to_thread(shared.put, key, data)
+    chunks = [data] if data is not None else _iter_text_bytes(article)
+    if cache is not None:
+        with timing.phase("render"):
+            path = await asyncio.to_thread(cache.put, key, chunks)
+        return FileResponse(path, media_type=media_type, headers=headers)
+    return StreamingResponse(iter(chunks), media_type=media_type, headers=headers)
+
+
+@app.get("/metrics")
+async def metrics_endpoint(request: Request):
+    """Prometheus metrics for this worker process (bearer METRICS_TOKEN if set)."""
+    if not metrics.metrics_authorized(request.headers.get("authorization")):
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    get_pdf_pool()  # registers the queue depth gauge
+    return Response(metrics.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/pdf/stats")
+async def pdf_stats():
+    """Render pool queue depth plus queue-wait and render-time counters."""
+    pool = get_pdf_pool()
+    return {"workers": pool.workers, "inFlight": pool.in_flight, **pool.stats.as_dict()}
 
 
 # --- Legacy routes (for backward compatibility) ---
 
 
 @app.get("/random")
-async def random_article(category: str = "physics", format: str | None = None):
-    url = get_random_vital_article(category)
+async def random_article(
+    request: Request, category: str = "physics", format: str | None = None, renderer: str | None = None
+):
+    if PREFETCHER is not None:
+        session_key = request.cookies.get(SESSION_COOKIE) or "anonymous"
+        url = await asyncio.to_thread(PREFETCHER.next_pick, session_key, category)
+    else:
+        url = await asyncio.to_thread(get_random_vital_article, category)
     if not url:
         return {"url": None}
 
     if format == "txt" or format == "plaintext":
-        title, body_blocks, references = fetch_article_content(url)
-        if title is None:
+        article = await asyncio.to_thread(fetch_article, url)
+        if article is None:
             return {"url": url, "error": "Failed to fetch article content"}
-        content = format_plain_text_with_references(title, body_blocks, references)
-        return PlainTextResponse(
-            content,
-            media_type="text/plain; charset=utf-8",
-            headers={"Content-Disposition": f'attachment; filename="{safe_filename(title)}.txt"'},
-        )
+        return await _download_response(request, article, "txt")
 
     if format == "pdf":
-        title, body_blocks, references = fetch_article_content(url)
-        if title is None:
+        article = await asyncio.to_thread(fetch_article, url)
+        if article is None:
             return {"url": url, "error": "Failed to fetch article content"}
-        pdf_bytes = build_pdf(title, body_blocks, references)
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f'attachment; filename="{safe_filename(title)}.pdf"'},
-        )
+        return await _download_response(request, article, "pdf", renderer)
 
     return {"url": url}
 
 
 @app.get("/download")
-async def download_article(url: str, format: str = "txt"):
-    """Download a specific Wikipedia article as plaintext or PDF. Use url=...&format=txt or format=pdf."""
+async def download_article(request: Request, url: str, format: str = "txt", renderer: str | None = None):
+    """
+    Download a specific Wikipedia article as plaintext or PDF. Use url=...&format=txt or format=pdf,
+    optionally with renderer=platypus|fast for PDFs.
+    """
     if not url.startswith("https://en.wikipedia.org/wiki/"):
         return {"error": "Invalid Wikipedia URL"}
-    title, body_blocks, references = fetch_article_content(url)
-    if title is None:
+    article = await asyncio.to_thread(fetch_article, url)
+    if article is None:
         return {"error": "Failed to fetch article content"}
 
-    if format == "pdf":
-        pdf_bytes = build_pdf(title, body_blocks, references)
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f'attachment; filename="{safe_filename(title)}.pdf"'},
-        )
-    content = format_plain_text_with_references(title, body_blocks, references)
-    return PlainTextResponse(
-        content,
-        media_type="text/plain; charset=utf-8",
-        headers={"Content-Disposition": f'attachment; filename="{safe_filename(title)}.txt"'},
+    return await _download_response(request, article, "pdf" if format == "pdf" else "txt", renderer)
+
+
+BATCH_MAX_URLS = int(os.environ.get("BATCH_MAX_URLS") or 100)
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY") or 4)
+
+
+@app.post("/download/batch")
+async def download_batch(request: Request):
+    """
+    Download many articles as one ZIP, streamed as entries finish.
+    Body: {"urls": [...]} or {"linkListId": "..."} (logged in), plus "format": "txt"|"pdf".
+    A list's URLs that are not Wikipedia articles are skipped and listed in
+    errors.txt; in "urls" they are rejected.
+    """
+    body = await read_json(request)
+    format = body.get("format") or "txt"
+    if format not in ("txt", "pdf"):
+        return JSONResponse({"error": "Invalid format"}, status_code=400)
+    urls = body.get("urls")
+    list_id = body.get("linkListId")
+    skipped: list[str] = []
+    if list_id:
+        username = verify_session(request.cookies.get(SESSION_COOKIE))
+        if not username:
+            return JSONResponse({"error": "Not logged in"}, status_code=401)
+        link_list = next((l for l in get_link_lists(username) if l.get("id") == list_id), None)
+        if link_list is None:
+            return JSONResponse({"error": "Link list not found"}, status_code=404)
+        urls = link_list.get("urls") or []
+    if not isinstance(urls, list) or not urls:
+        return JSONResponse({"error": "Invalid urls"}, status_code=400)
+    urls = list(dict.fromkeys(u for u in urls if isinstance(u, str)))
+    invalid = [u for u in urls if not u.startswith("https://en.wikipedia.org/wiki/")]
+    if invalid:
+        if not list_id:
+            return JSONResponse({"error": "Invalid Wikipedia URL"}, status_code=400)
+        skipped = [f"{u}: Not a Wikipedia article URL" for u in invalid]
+        urls = [u for u in urls if u.startswith("https://en.wikipedia.org/wiki/")]
+    if len(urls) > BATCH_MAX_URLS:
+        return JSONResponse({"error": f"At most {BATCH_MAX_URLS} articles per batch"}, status_code=400)
+    return StreamingResponse(
+        iter_article_zip(urls, format, BATCH_CONCURRENCY, skipped),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="articles.zip"'},
     )
 
 
@@ -221,4 +531,6 @@ public_path = Path(__file__).resolve().parent / "public"
 app.mount("/", StaticFiles(directory=str(public_path), html=True))
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="127.0.0.1", port=8001)
\ No newline at end of file
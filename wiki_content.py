@@ -2,10 +2,71 @@
 Fetch Wikipedia article content and extract body text and references.
 """
 
-import requests
-from bs4 import BeautifulSoup
+import html
+import os
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from itertools import chain
+from typing import Iterable, Iterator
+from urllib.parse import quote, unquote, urlparse
+
+from lib import metrics, timing
+from lib.article_cache import get_article_cache
+from lib.article_ir import Article
+from lib.article_store import get_article_store, is_offline
+from lib.ratelimit import background, get_wikipedia_limiter
 
 DEFAULT_HEADERS = {"User-Agent": "VitalArticleScraper/1.0 (science_fan@example.com)"}
+API_URL = "https://en.wikipedia.org/w/api.php"
+# Article URLs always name en.wikipedia.org; fetches go to WIKIPEDIA_BASE_URL,
+# e.g. the local stand-in in loadtest/stub_wikipedia.py.
+WIKIPEDIA_ORIGIN = "https://en.wikipedia.org"
+WIKIPEDIA_BASE_URL = (os.environ.get("WIKIPEDIA_BASE_URL") or WIKIPEDIA_ORIGIN).rstrip("/")
+# Most titles one prop=revisions query accepts
+REVISION_BATCH_SIZE = 50
+# Most titles one prop=info|description|pageimages query accepts
+METADATA_BATCH_SIZE = 50
+# Thumbnail width for link metadata, in pixels
+METADATA_THUMB_SIZE = 160
+
+# Where article content comes from: "page" downloads the rendered page,
+# "parse" asks action=parse for just the article HTML and revision id
+# (falling back to the page if the API call fails).
+CONTENT_SOURCE = (os.environ.get("WIKI_CONTENT_SOURCE") or "page").strip().lower()
+
+FETCH_SECONDS = metrics.histogram(
+    "article_fetch_seconds", "Time to download an article, by content source.", ("source",)
+)
+PARSE_SECONDS = metrics.histogram("article_parse_seconds", "Time to extract an article from its HTML.")
+ARTICLE_LOOKUPS = metrics.counter(
+    "article_lookups_total", "fetch_article outcomes: store, cache_hit, cache_revalidated, ...", ("result",)
+)
+
+# The rendered page embeds its revision id in the mw.config block.
+_REVISION_ID_RE = re.compile(rb'"wgRevisionId":(\d+)')
+_BACKLINK_LABELS = re.compile(r"[a-z ]*")
+
+
+def wikipedia_get(url: str, **kwargs):
+    """
+    requests.get for en.wikipedia.org URLs, sent to WIKIPEDIA_BASE_URL instead
+    when set, within the shared outbound rate limit (lib/ratelimit.py; raises
+    RateLimited). requests is imported on first use so cold starts that never
+    fetch skip it.
+    """
+    import requests
+
+    if WIKIPEDIA_BASE_URL != WIKIPEDIA_ORIGIN and url.startswith(WIKIPEDIA_ORIGIN):
+        url = WIKIPEDIA_BASE_URL + url[len(WIKIPEDIA_ORIGIN):]
+    limiter = get_wikipedia_limiter()
+    if limiter is not None:
+        limiter.acquire()
+    response = requests.get(url, **kwargs)
+    if response.status_code == 429 and limiter is not None:
+        limiter.throttled(response.headers.get("Retry-After"))
+    return response
 
 
 def _clean_reference_text(raw: str) -> str:
@@ -14,34 +75,26 @@ def _clean_reference_text(raw: str) -> str:
     # Strip leading "^" and following "a b c" backlink labels
     if text.startswith("^"):
         text = text[1:].lstrip()
-    # Remove leading run of single letters and spaces (backlink labels)
-    while text:
-        i = 0
-        while i < len(text) and text[i] in "abcdefghijklmnopqrstuvwxyz ":
-            i += 1
-        if i > 0 and (i == len(text) or text[i] == ">" or (text[i:i+1].strip() == "" and ">" in text[:20])):
-            text = text[i:].strip().lstrip(">").strip()
-        else:
+    # Remove leading runs of single letters and spaces (backlink labels). Works on an
+    # index into text instead of re-slicing, so it stays linear in the text length.
+    pos, n = 0, len(text)
+    while pos < n:
+        end = _BACKLINK_LABELS.match(text, pos).end()
+        if end == pos:
             break
-    return text
-
-
-def _extract_references_from_soup(soup: BeautifulSoup) -> list[str]:
-    """
-    Extract the References section as a list of "[n] reference_text" strings.
-    Finds all citation <li> elements in document order within #mw-content-text.
-    """
-    refs: list[str] = []
-    content = soup.find(id="mw-content-text")
-    if not content:
-        return refs
-
-    for li in content.find_all("li", id=lambda x: x and x.startswith("cite_note-")):
-        text = li.get_text(separator=" ", strip=True)
-        text = _clean_reference_text(text)
-        if text:
-            refs.append(f"[{len(refs) + 1}] {text}")
-    return refs
+        if end == n:
+            return ""
+        nxt = text[end]
+        if not (nxt == ">" or (nxt.isspace() and ">" in text[pos:pos + 20])):
+            break
+        while end < n and text[end].isspace():
+            end += 1
+        while end < n and text[end] == ">":
+            end += 1
+        while end < n and text[end].isspace():
+            end += 1
+        pos = end
+    return text[pos:]
 
 
 def _body_stops_at_heading(heading_text: str) -> bool:
@@ -53,71 +106,552 @@ def _body_stops_at_heading(heading_text: str) -> bool:
 # Type for one block of body content: heading (h2/h3) or paragraph (p).
 BodyBlock = dict  # {"type": "h2"|"h3"|"p", "text": str}
 
+# Subtrees dropped from the article content before extracting text.
+_SKIPPED_TAGS = frozenset(["script", "style", "nav", "table", "figure"])
+# Elements whose own strings never count as text (BeautifulSoup's get_text skips them).
+_NON_TEXT_TAGS = frozenset(["script", "style", "template", "rt", "rp"])
+_VOID_TAGS = frozenset(
+    [
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+        "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound",
+        "command", "frame", "image", "isindex", "nextid", "spacer",
+    ]
+)
 
-def fetch_article_content(article_url: str) -> tuple[str | None, list[BodyBlock], list[str]]:
+
+class _Capture:
+    """Text collected for one element; strings are stripped and joined like get_text()."""
+
+    __slots__ = ("kind", "strings", "in_content", "text")
+
+    def __init__(self, kind: str, in_content: bool):
+        self.kind = kind
+        self.strings: list[str] = []
+        self.in_content = in_content
+        self.text: str | None = None
+
+
+class _ArticleExtractor(HTMLParser):
     """
-    Fetch a Wikipedia article and return (title, body_blocks, references).
-    body_blocks: list of {"type": "h2"|"h3"|"p", "text": str} for TOC and PDF structure.
-    Body stops at "See also", "References", "Further reading", or "External links".
-    On failure returns (None, [], []).
+    Single-pass extractor for the title, body blocks and references of an article page.
+    Keeps only a stack of open element names and the handful of elements being
+    captured, so the page is never materialized as a tree.
+    With content_id=None the whole document is treated as article content
+    (used for API responses that contain only the parsed article HTML).
     """
-    try:
-        response = requests.get(article_url, headers=DEFAULT_HEADERS)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        title_el = soup.find(id="firstHeading")
-        title = title_el.get_text(strip=True) if title_el else "Untitled"
-
-        content_div = soup.find(id="mw-content-text")
-        if not content_div:
-            return title, [], []
-
-        # Remove non-content elements but keep structure for references extraction
-        for tag in content_div.find_all(["script", "style", "nav", "table", "figure"]):
-            tag.decompose()
-
-        body_blocks: list[BodyBlock] = []
-        for el in content_div.find_all(["h2", "h3", "p"]):
-            if el.name in ("h2", "h3"):
-                text = el.get_text(separator=" ", strip=True)
-                if text and _body_stops_at_heading(text):
-                    break
-                if text:
-                    body_blocks.append({"type": el.name, "text": text})
+
+    # Roles an open element plays, stored as bit flags on the stack
+    _CONTENT, _SKIP, _NON_TEXT = 1, 2, 4
+
+    def __init__(self, content_id: str | None = "mw-content-text"):
+        super().__init__(convert_charrefs=True)
+        self._content_id = content_id
+        # Open elements: (tag, flags, number of captures the element opened)
+        self._stack: list[tuple[str, int, int]] = []
+        self._pending: list[str] = []
+        self._captures: list[_Capture] = []
+        self._content_depth = 0 if content_id else 1
+        self._content_seen = content_id is None
+        self._title_seen = False
+        self._skip_depth = 0
+        self._non_text_depth = 0
+        self._body_done = False
+        self.title: _Capture | None = None
+        self.body: list[_Capture] = []
+        self.refs: list[_Capture] = []
+
+    @property
+    def has_content(self) -> bool:
+        return self._content_seen
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        s = "".join(self._pending)
+        self._pending.clear()
+        if not self._non_text_depth:
+            self._add_string(s)
+
+    def _add_string(self, s: str) -> None:
+        s = s.strip()
+        if not s:
+            return
+        for cap in self._captures:
+            if cap.in_content and self._skip_depth:
                 continue
-            text = el.get_text(separator=" ", strip=True)
+            cap.strings.append(s)
+
+    def handle_data(self, data: str) -> None:
+        self._pending.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        self._flush()
+
+    def handle_decl(self, decl: str) -> None:
+        self._flush()
+
+    def unknown_decl(self, data: str) -> None:
+        self._flush()
+        # BeautifulSoup keeps CDATA sections as text of their own, even inside
+        # elements whose other strings are not text
+        if data.upper().startswith("CDATA["):
+            self._add_string(data[len("CDATA["):])
+
+    def handle_pi(self, data: str) -> None:
+        self._flush()
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        self._flush()
+        if tag in _VOID_TAGS:
+            return
+        flags = 0
+        captures = 0
+        el_id = None
+        for name, value in attrs:
+            if name == "id":
+                el_id = value
+                break
+        in_content = self._content_depth > 0
+        if el_id is not None:
+            if not self._content_seen and el_id == self._content_id:
+                self._content_seen = True
+                flags |= self._CONTENT
+                self._content_depth += 1
+            elif not self._title_seen and el_id == "firstHeading":
+                self._title_seen = True
+                self.title = _Capture("title", False)
+                self._captures.append(self.title)
+                captures += 1
+        if in_content:
+            if tag in _SKIPPED_TAGS:
+                flags |= self._SKIP
+                self._skip_depth += 1
+            elif not self._skip_depth:
+                kind = None
+                if tag in ("h2", "h3", "p") and not self._body_done:
+                    kind = tag
+                elif tag == "li" and el_id and el_id.startswith("cite_note-"):
+                    kind = "ref"
+                if kind is not None:
+                    cap = _Capture(kind, True)
+                    (self.refs if kind == "ref" else self.body).append(cap)
+                    self._captures.append(cap)
+                    captures += 1
+        if tag in _NON_TEXT_TAGS:
+            flags |= self._NON_TEXT
+            self._non_text_depth += 1
+        self._stack.append((tag, flags, captures))
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush()
+        if tag in _VOID_TAGS:
+            return
+        # Like BeautifulSoup, an end tag closes everything up to the most recent
+        # open element with that name and is ignored if there is none.
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                while len(self._stack) > i:
+                    self._pop()
+                return
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+        while self._stack:
+            self._pop()
+
+    def _pop(self) -> None:
+        _, flags, captures = self._stack.pop()
+        if flags & self._CONTENT:
+            self._content_depth -= 1
+        if flags & self._SKIP:
+            self._skip_depth -= 1
+        if flags & self._NON_TEXT:
+            self._non_text_depth -= 1
+        for _ in range(captures):
+            cap = self._captures.pop()
+            sep = "" if cap.kind == "title" else " "
+            cap.text = sep.join(cap.strings)
+            cap.strings = []
+            if cap.kind in ("h2", "h3") and cap.text and _body_stops_at_heading(cap.text):
+                self._body_done = True
+
+    def body_blocks(self) -> list[BodyBlock]:
+        blocks: list[BodyBlock] = []
+        for cap in self.body:
+            if cap.kind in ("h2", "h3") and cap.text and _body_stops_at_heading(cap.text):
+                break
+            if cap.text:
+                blocks.append({"type": cap.kind, "text": cap.text})
+        return blocks
+
+    def references(self) -> list[str]:
+        refs: list[str] = []
+        for cap in self.refs:
+            text = _clean_reference_text(cap.text or "")
             if text:
-                body_blocks.append({"type": "p", "text": text})
+                refs.append(f"[{len(refs) + 1}] {text}")
+        return refs
+
+
+def extract_article(
+    html: str, content_id: str | None = "mw-content-text"
+) -> tuple[str, list[BodyBlock], list[str]]:
+    """
+    Extract (title, body_blocks, references) from article HTML in a single pass.
+    Scripts, styles, navs, tables and figures inside the content are skipped.
+    """
+    parser = _ArticleExtractor(content_id)
+    parser.feed(html)
+    parser.close()
+    title = parser.title.text if parser.title is not None else "Untitled"
+    if not parser.has_content:
+        return title, [], []
+    return title, parser.body_blocks(), parser.references()
+
+
+def canonical_title(article_url: str) -> str:
+    """Return the MediaWiki-style title (spaces, capitalized first letter) for an article URL."""
+    path = unquote(urlparse(article_url).path)
+    title = path[len("/wiki/"):] if path.startswith("/wiki/") else path.rsplit("/", 1)[-1]
+    title = title.replace("_", " ").strip()
+    return title[:1].upper() + title[1:]
+
+
+def article_url_for_title(title: str) -> str:
+    """Inverse of canonical_title: the en.wikipedia.org URL for a title."""
+    return "https://en.wikipedia.org/wiki/" + quote(title.replace(" ", "_"), safe="/:;@$!*(),~'")
+
+
+def _fetch_article_page(article_url: str) -> Article:
+    """Download the rendered article page and extract it; raises on failure."""
+    with FETCH_SECONDS.time("page"), timing.phase("fetch"):
+        response = wikipedia_get(article_url, headers=DEFAULT_HEADERS)
+        response.raise_for_status()
+    match = _REVISION_ID_RE.search(response.content)
+    revid = int(match.group(1)) if match else None
+    with PARSE_SECONDS.time(), timing.phase("parse"):
+        title, body_blocks, references = extract_article(
+            response.content.decode("utf-8", errors="replace")
+        )
+    return Article.from_blocks(title, body_blocks, references, revid)
 
-        references = _extract_references_from_soup(soup)
-        return title, body_blocks, references
 
+def _fetch_article_parsed(article_url: str) -> Article:
+    """
+    Fetch only the article content via action=parse and extract it; raises on failure.
+    The parser output is the same HTML the page wraps in #mw-content-text, without
+    the skin, so extraction yields the same blocks for a fraction of the transfer.
+    """
+    params = {
+        "action": "parse",
+        "page": canonical_title(article_url),
+        "prop": "text|revid|displaytitle",
+        "redirects": 1,
+        "disabletoc": 1,
+        "disablelimitreport": 1,
+        "format": "json",
+        "formatversion": 2,
+    }
+    with FETCH_SECONDS.time("parse"), timing.phase("fetch"):
+        response = wikipedia_get(API_URL, params=params, headers=DEFAULT_HEADERS, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+    if "error" in data:
+        raise ValueError(data["error"].get("info") or data["error"].get("code"))
+    parsed = data["parse"]
+    display_title = parsed.get("displaytitle") or html.escape(parsed["title"])
+    # The display title is the same markup the skin puts in #firstHeading
+    with PARSE_SECONDS.time(), timing.phase("parse"):
+        title, body_blocks, references = extract_article(
+            f'<h1 id="firstHeading">{display_title}</h1>{parsed["text"]}', content_id=None
+        )
+    revid = parsed.get("revid")
+    return Article.from_blocks(title, body_blocks, references, int(revid) if revid else None)
+
+
+def _fetch_article_uncached(article_url: str) -> Article | None:
+    """
+    Download and parse a Wikipedia article.
+    Uses the source chosen by WIKI_CONTENT_SOURCE, falling back to the full page.
+    On failure returns None.
+    """
+    if CONTENT_SOURCE == "parse":
+        try:
+            return _fetch_article_parsed(article_url)
+        except Exception as e:
+            print(f"Parse API failed for {article_url}, falling back to page: {e}")
+    try:
+        return _fetch_article_page(article_url)
     except Exception as e:
         print(f"Error fetching article {article_url}: {e}")
+        return None
+
+
+def fetch_revision_ids(titles: list[str]) -> dict[str, int]:
+    """
+    Look up current revision ids for many titles, 50 per API call (the
+    prop=revisions&rvprop=ids limit), following normalization and redirects.
+    Returns {requested title: revid}; titles that are missing or whose batch
+    failed are left out.
+    """
+    result: dict[str, int] = {}
+    for i in range(0, len(titles), REVISION_BATCH_SIZE):
+        batch = titles[i:i + REVISION_BATCH_SIZE]
+        params = {
+            "action": "query",
+            "prop": "revisions",
+            "rvprop": "ids",
+            "titles": "|".join(batch),
+            "redirects": 1,
+            "format": "json",
+            "formatversion": 2,
+        }
+        try:
+            response = wikipedia_get(API_URL, params=params, headers=DEFAULT_HEADERS, timeout=10)
+            response.raise_for_status()
+            query = response.json().get("query", {})
+        except Exception as e:
+            print(f"Error checking revisions for {len(batch)} titles: {e}")
+            continue
+        pages = {page["title"]: page for page in query.get("pages", []) if page.get("revisions")}
+        for title, page in _pages_for_titles(query, batch, pages).items():
+            result[title] = int(page["revisions"][0]["revid"])
+    return result
+
+
+def _pages_for_titles(query: dict, titles: list[str], pages: dict[str, dict]) -> dict[str, dict]:
+    """Map requested titles to their entries in pages (keyed by final title), following normalization and redirects."""
+    normalized = {n["from"]: n["to"] for n in query.get("normalized", [])}
+    redirects = {r["from"]: r["to"] for r in query.get("redirects", [])}
+    result = {}
+    for title in titles:
+        name = normalized.get(title, title)
+        name = redirects.get(name, name)
+        if name in pages:
+            result[title] = pages[name]
+    return result
+
+
+def fetch_page_metadata(titles: list[str]) -> dict[str, dict]:
+    """
+    Look up display title, short description, thumbnail and size for many
+    titles, METADATA_BATCH_SIZE per API call, following normalization and
+    redirects. Returns {requested title: metadata}; pages that do not exist
+    map to {"missing": True}, and titles whose batch failed are left out.
+    """
+    result: dict[str, dict] = {}
+    for i in range(0, len(titles), METADATA_BATCH_SIZE):
+        batch = titles[i:i + METADATA_BATCH_SIZE]
+        params = {
+            "action": "query",
+            "prop": "info|description|pageimages",
+            "piprop": "thumbnail",
+            "pithumbsize": METADATA_THUMB_SIZE,
+            "pilimit": METADATA_BATCH_SIZE,
+            "titles": "|".join(batch),
+            "redirects": 1,
+            "format": "json",
+            "formatversion": 2,
+        }
+        try:
+            response = wikipedia_get(API_URL, params=params, headers=DEFAULT_HEADERS, timeout=10)
+            response.raise_for_status()
+            query = response.json().get("query", {})
+        except Exception as e:
+            print(f"Error fetching metadata for {len(batch)} titles: {e}")
+            continue
+        pages = {page["title"]: page for page in query.get("pages", [])}
+        found = _pages_for_titles(query, batch, pages)
+        for title in batch:
+            page = found.get(title)
+            if page is None or page.get("missing") or page.get("invalid"):
+                result[title] = {"missing": True}
+                continue
+            thumb = page.get("thumbnail")
+            result[title] = {
+                "title": page["title"],
+                "description": page.get("description"),
+                "thumbnail": (
+                    {"url": thumb["source"], "width": thumb.get("width"), "height": thumb.get("height")}
+                    if thumb
+                    else None
+                ),
+                "length": page.get("length"),
+            }
+    return result
+
+
+def fetch_revision_id(title: str) -> int | None:
+    """Return the current revision id for title (following redirects), or None if unknown."""
+    return fetch_revision_ids([title]).get(title)
+
+
+def revalidate_cached_articles(limit: int = 500) -> int:
+    """
+    Check the hottest cache entries due for revalidation in batched revision
+    lookups, re-downloading only the articles whose revision changed.
+    Returns the number of articles refreshed.
+    """
+    cache = get_article_cache()
+    entries = cache.stale_entries(limit)
+    if not entries:
+        return 0
+    current = fetch_revision_ids([key for key, _ in entries])
+    refreshed = 0
+    for key, revid in entries:
+        latest = current.get(key)
+        if latest is None or latest == revid:
+            cache.mark_checked(key)
+            continue
+        article = _fetch_article_uncached(article_url_for_title(key))
+        if article is not None:
+            cache.put(key, article)
+            refreshed += 1
+    return refreshed
+
+
+def start_revalidation_sweeper(interval: float, limit: int = 500) -> threading.Thread:
+    """Run revalidate_cached_articles every `interval` seconds on a daemon thread."""
+
+    def sweep() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                with background():
+                    refreshed = revalidate_cached_articles(limit)
+                if refreshed:
+                    print(f"Revalidation refreshed {refreshed} cached articles.")
+            except Exception as e:
+                print(f"Revalidation sweep failed: {e}")
+
+    thread = threading.Thread(target=sweep, name="article-revalidation", daemon=True)
+    thread.start()
+    return thread
+
+
+def fetch_article(article_url: str) -> Article | None:
+    """
+    Fetch a Wikipedia article as a parsed Article, or None on failure.
+    Body stops at "See also", "References", "Further reading", or "External links".
+    Articles in the local dump store (LOCAL_ARTICLE_STORE) are served from it;
+    with WIKI_OFFLINE set nothing else is consulted.
+    Parsed results are cached per canonical title and revision id; cached entries
+    older than the revalidation window are checked against the current revision
+    and only re-downloaded when it changed.
+    """
+    key = canonical_title(article_url)
+    store = get_article_store()
+    article = store.get(key) if store is not None else None
+    if article is not None or is_offline():
+        ARTICLE_LOOKUPS.inc("store" if article is not None else "offline_miss")
+        return article
+
+    cache = get_article_cache()
+    entry = cache.get(key)
+    if entry is not None:
+        if cache.is_fresh(entry):
+            ARTICLE_LOOKUPS.inc("cache_hit")
+            return entry.article()
+        current = fetch_revision_id(key)
+        if current is None or current == entry.revid:
+            ARTICLE_LOOKUPS.inc("cache_revalidated")
+            cache.mark_checked(key)
+            return entry.article()
+    ARTICLE_LOOKUPS.inc("cache_changed" if entry is not None else "cache_miss")
+
+    article = _fetch_article_uncached(article_url)
+    if article is None:
+        # Serve the stale copy rather than failing outright
+        return entry.article() if entry is not None else None
+    cache.put(key, article)
+    return article
+
+
+def fetch_article_content(article_url: str) -> tuple[str | None, list[BodyBlock], list[str]]:
+    """
+    Fetch a Wikipedia article and return (title, body_blocks, references).
+    body_blocks: list of {"type": "h2"|"h3"|"p", "text": str} for TOC and PDF structure.
+    On failure returns (None, [], []).
+    """
+    article = fetch_article(article_url)
+    if article is None:
         return None, [], []
+    return article.title, article.body_blocks, list(article.references)
+
+
+def _iter_body_text(body_blocks: Iterable[BodyBlock]) -> Iterator[str]:
+    """
+    Yield the body text piece by piece. Equivalent to joining headings
+    ("\n\n" + text + "\n") and paragraphs with newlines and stripping the
+    result; trailing whitespace is held back until more text follows.
+    """
+    started = False
+    pending = ""
+    for i, b in enumerate(body_blocks):
+        part = "\n\n" + b["text"] + "\n" if b["type"] in ("h2", "h3") else b["text"]
+        if i:
+            part = "\n" + part
+        if not started:
+            part = part.lstrip()
+            if not part:
+                continue
+            started = True
+        stripped = part.rstrip()
+        if stripped:
+            yield pending + stripped
+            pending = part[len(stripped):]
+        else:
+            pending += part
+
+
+def _iter_references_text(references: Iterable[str]) -> Iterator[str]:
+    """Yield the References section (empty when there are no references)."""
+    for i, ref in enumerate(references):
+        yield ("\n\n" if i else "\n\nReferences\n\n") + ref
 
 
 def body_blocks_to_plain_text(body_blocks: list[BodyBlock]) -> str:
     """Convert body_blocks to a single plain-text string (headings and paragraphs)."""
-    parts: list[str] = []
-    for b in body_blocks:
-        if b["type"] in ("h2", "h3"):
-            parts.append("\n\n" + b["text"] + "\n")
-        else:
-            parts.append(b["text"])
-    return "\n".join(parts).strip() if parts else ""
+    return "".join(_iter_body_text(body_blocks))
+
+
+def iter_plain_text_with_references(
+    title: str,
+    body_blocks: Iterable[BodyBlock],
+    references: Iterable[str],
+    chunk_size: int = 64 * 1024,
+) -> Iterator[str]:
+    """
+    Yield the text of format_plain_text_with_references incrementally.
+    The title is yielded immediately; the body and references follow in
+    chunks of roughly chunk_size characters, so the full document is never
+    held as one string.
+    """
+    yield f"{title}\n{'=' * len(title)}\n\n"
+    buf: list[str] = []
+    size = 0
+    for piece in chain(_iter_body_text(body_blocks), _iter_references_text(references)):
+        buf.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buf)
+            buf.clear()
+            size = 0
+    if buf:
+        yield "".join(buf)
 
 
 def format_plain_text_with_references(
     title: str, body_blocks: list[BodyBlock], references: list[str]
 ) -> str:
     """Build full plain text: title, body, then References section."""
-    body = body_blocks_to_plain_text(body_blocks)
-    sections = [title, "=" * len(title), "", body]
-    if references:
-        sections.extend(["", "References", "", "\n\n".join(references)])
-    return "\n".join(sections)
+    return "".join(iter_plain_text_with_references(title, body_blocks, references))
 
 
 def safe_filename(title: str, max_len: int = 80) -> str: